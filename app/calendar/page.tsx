@@ -3,7 +3,7 @@
 "use client";
 
 import { useState, useEffect } from "react";
-import { api } from "../lib/api";
+import { api, apiAllRows } from "../lib/api";
 import { ChevronLeft, ChevronRight, Plus, X, Trash2, Calendar as CalendarIcon } from "lucide-react";
 
 interface Event {
@@ -34,13 +34,19 @@ export default function EventsPage() {
     if (storedClearance) {
       setClearance(parseInt(storedClearance));
     }
+  }, []);
 
+  useEffect(() => {
     fetchEvents();
-  }, []);
+  }, [currentDate]);
 
+  // Only the month on screen, in pages of up to 1000 events until X-Next-Cursor runs out
   const fetchEvents = async () => {
+    const from = new Date(currentDate.getFullYear(), currentDate.getMonth(), 1);
+    const to = new Date(currentDate.getFullYear(), currentDate.getMonth() + 1, 1);
+    const range = `from=${encodeURIComponent(from.toISOString())}&to=${encodeURIComponent(to.toISOString())}`;
     try {
-      const data = await api<Event[]>("events");
+      const data = await apiAllRows<Event>(`events?${range}&limit=1000`);
       setEvents(data);
     } catch (err) {
       console.error("Failed to fetch events:", err);
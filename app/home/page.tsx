@@ -21,6 +21,7 @@ interface KanbanColumn {
   color: string;
   events: string[];
   created_at: string;
+  version?: number;
   maxSize?: number; // Client-side only for UI limits
 }
 
@@ -268,6 +269,36 @@ export default function KanbanPage() {
     }
   };
 
+  // Put a card in targetColumn with one versioned call: a move when it already sits
+  // in another column, otherwise an add plus the column tag on the event
+  const placeCard = async (event: Event, targetColumn: KanbanColumn) => {
+    const sourceColumn = columns.find(c => c.events.includes(event.event_id));
+    if (sourceColumn) {
+      if (sourceColumn.column_id === targetColumn.column_id) return;
+      await api(`kanban/${sourceColumn.column_id}/cards/${event.event_id}/move`, {
+        method: "POST",
+        body: JSON.stringify({
+          to_column_id: targetColumn.column_id,
+          version: sourceColumn.version,
+          to_version: targetColumn.version
+        })
+      });
+      return;
+    }
+
+    await api(`kanban/${targetColumn.column_id}/cards`, {
+      method: "POST",
+      body: JSON.stringify({ event_id: event.event_id, version: targetColumn.version })
+    });
+    const nonColumnTags = (event.tags || []).filter(t =>
+      !columns.some(c => c.column_id === t)
+    );
+    await api(`events/${event.event_id}`, {
+      method: "PATCH",
+      body: JSON.stringify({ tags: [...nonColumnTags, targetColumn.column_id] })
+    });
+  };
+
   const handleAddExistingEvent = async (columnId: string) => {
     if (!selectedExistingEvent) return;
     
@@ -285,45 +316,14 @@ export default function KanbanPage() {
         return;
       }
       
-      // Remove from all other columns first
-      for (const column of columns) {
-        if (column.events.includes(selectedExistingEvent)) {
-          await api(`kanban/${column.column_id}`, {
-            method: "PATCH",
-            body: JSON.stringify({
-              events: column.events.filter(e => e !== selectedExistingEvent)
-            })
-          });
-        }
-      }
-      
-      // Add to target column
-      if (!targetColumn.events.includes(selectedExistingEvent)) {
-        await api(`kanban/${columnId}`, {
-          method: "PATCH",
-          body: JSON.stringify({
-            events: [...targetColumn.events, selectedExistingEvent]
-          })
-        });
-      }
-      
-      // Update event tags
-      const currentTags = event.tags || [];
-      const nonColumnTags = currentTags.filter(t => 
-        !columns.some(c => c.column_id === t)
-      );
-      const newTags = [...nonColumnTags, columnId];
-      
-      await api(`events/${selectedExistingEvent}`, {
-        method: "PATCH",
-        body: JSON.stringify({ tags: newTags })
-      });
+      await placeCard(event, targetColumn);
       
       await fetchData();
       setSelectedExistingEvent("");
     } catch (err) {
       console.error("Failed to add existing event:", err);
       alert("Failed to add event: " + (err as Error).message);
+      await fetchData();
     }
   };
 
@@ -390,8 +390,6 @@ export default function KanbanPage() {
     if (!event) return;
     
     try {
-      // Find which column the event is currently in
-      const sourceColumn = columns.find(c => c.events.includes(draggedEvent));
       const targetColumn = columns.find(c => c.column_id === targetColumnId);
       
       if (!targetColumn) return;
@@ -406,41 +404,13 @@ export default function KanbanPage() {
         }
       }
       
-      // Remove from source column if it exists
-      if (sourceColumn && sourceColumn.column_id !== targetColumnId) {
-        await api(`kanban/${sourceColumn.column_id}`, {
-          method: "PATCH",
-          body: JSON.stringify({
-            events: sourceColumn.events.filter(e => e !== draggedEvent)
-          })
-        });
-      }
-      
-      // Add to target column if not already there
-      if (!targetColumn.events.includes(draggedEvent)) {
-        await api(`kanban/${targetColumnId}`, {
-          method: "PATCH",
-          body: JSON.stringify({
-            events: [...targetColumn.events, draggedEvent]
-          })
-        });
-      }
-      
-      // Update event tags
-      const currentTags = event.tags || [];
-      const nonColumnTags = currentTags.filter(t => 
-        !columns.some(c => c.column_id === t)
-      );
-      const newTags = [...nonColumnTags, targetColumnId];
-      
-      await api(`events/${draggedEvent}`, {
-        method: "PATCH",
-        body: JSON.stringify({ tags: newTags })
-      });
+      await placeCard(event, targetColumn);
       
       await fetchData();
     } catch (err) {
+      // A 409 means someone else changed the column first; show the current board
       console.error("Failed to move event:", err);
+      await fetchData();
     }
     
     setDraggedEvent(null);
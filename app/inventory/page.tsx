@@ -2,6 +2,7 @@
 
 import { useEffect, useState } from "react";
 import { api } from "../lib/api";
+import { syncInventory } from "../lib/inventorySync";
 import { InventoryItem } from "../types";
 import { useCart } from "../context/CartContext";
 import { useRouter } from "next/navigation";
@@ -21,9 +22,12 @@ interface Project {
   project_name: string;
 }
 
+const SEARCH_DEBOUNCE_MS = 150;
+
 export default function InventoryPage() {
   const [items, setItems] = useState<InventoryItem[]>([]);
   const [searchQuery, setSearchQuery] = useState("");
+  const [searchResults, setSearchResults] = useState<InventoryItem[] | null>(null);
   const [selectedItem, setSelectedItem] = useState<ItemDetailsExtended | null>(null);
   const [quantity, setQuantity] = useState(1);
   const [projectId, setProjectId] = useState("");
@@ -34,58 +38,34 @@ export default function InventoryPage() {
   const router = useRouter();
 
   useEffect(() => {
-    api<InventoryItem[]>("registry").then(setItems);
+    syncInventory().then(setItems);
     api<Project[]>("projects").then(setProjects);
   }, []);
 
-  // Fuzzy search function
-  const fuzzyMatch = (str: string, query: string): number => {
-    if (!query) return 1;
-    
-    str = str.toLowerCase();
-    query = query.toLowerCase();
-    
-    if (str.includes(query)) return 1;
-    
-    let score = 0;
-    let queryIndex = 0;
-    let lastMatchIndex = -1;
-    
-    for (let i = 0; i < str.length && queryIndex < query.length; i++) {
-      if (str[i] === query[queryIndex]) {
-        score += 1;
-        if (lastMatchIndex === i - 1) {
-          score += 0.5;
-        }
-        lastMatchIndex = i;
-        queryIndex++;
-      }
-    }
-    
-    if (queryIndex === query.length) {
-      return score / (query.length * 1.5);
+  // Server-side ranked search; the full list is shown while the box is empty
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchResults(null);
+      return;
     }
-    
-    return 0;
-  };
 
-  const filteredItems = items
-    .map(item => {
-      const query = searchQuery.toLowerCase();
-      const name = item.name?.toLowerCase() || "";
-      const location = item.location?.toLowerCase() || "";
-      
-      const nameScore = fuzzyMatch(name, query);
-      const locationScore = fuzzyMatch(location, query);
-      const maxScore = Math.max(nameScore, locationScore);
-      
-      return {
-        ...item,
-        searchScore: maxScore
-      };
-    })
-    .filter(item => item.searchScore > 0.3)
-    .sort((a, b) => b.searchScore - a.searchScore);
+    let cancelled = false;
+    const timer = setTimeout(() => {
+      api<InventoryItem[]>(`registry/search?q=${encodeURIComponent(query)}&limit=50`)
+        .then(results => {
+          if (!cancelled) setSearchResults(results);
+        })
+        .catch(err => console.error("Search failed:", err));
+    }, SEARCH_DEBOUNCE_MS);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery]);
+
+  const filteredItems = searchResults ?? items;
 
   const openItemModal = async (item: InventoryItem) => {
     setLoadingItem(true);
@@ -162,8 +142,7 @@ export default function InventoryPage() {
       alert("Item issued successfully!");
       closeModal();
       // Refresh inventory
-      const updatedItems = await api<InventoryItem[]>("registry");
-      setItems(updatedItems);
+      setItems(await syncInventory());
     } catch (err) {
       alert("Failed to issue item: " + (err as Error).message);
     }
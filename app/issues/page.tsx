@@ -3,28 +3,10 @@
 "use client";
 
 import { useState, useEffect } from "react";
-import { api } from "../lib/api";
+import { api, apiRows } from "../lib/api";
 import { useCart } from "../context/CartContext";
 import { useRouter } from "next/navigation";
 
-interface IssueItemRaw {
-  id: string;
-  issue_id: string;
-  item_no: string;
-  quantity: number;
-  member_id: string;
-  project_id: string;
-  issued_date: string;
-  return_date: string | null;
-  returned: boolean;
-  returned_quantity: number;
-}
-
-interface ItemDetails {
-  item_no: string;
-  name: string;
-}
-
 interface GroupedIssue {
   issue_id: string;
   project_id: string;
@@ -35,7 +17,8 @@ interface GroupedIssue {
     item_no: string;
     quantity: number;
     returned_quantity: number;
-    name?: string;
+    name?: string | null;
+    location?: string | null;
   }[];
 }
 
@@ -48,81 +31,11 @@ export default function IssuesPage() {
   const { addToCart } = useCart();
   const router = useRouter();
 
-  function groupIssues(raw: IssueItemRaw[]): GroupedIssue[] {
-    const map = new Map<string, GroupedIssue>();
-
-    raw.forEach(item => {
-      if (!map.has(item.issue_id)) {
-        map.set(item.issue_id, {
-          issue_id: item.issue_id,
-          project_id: item.project_id,
-          issued_date: item.issued_date,
-          return_date: item.return_date,
-          returned: item.returned,
-          items: [],
-        });
-      }
-
-      const issue = map.get(item.issue_id)!;
-      issue.items.push({
-        item_no: item.item_no,
-        quantity: item.quantity,
-        returned_quantity: item.returned_quantity,
-      });
-    });
-
-    return Array.from(map.values());
-  }
-
-  useEffect(() => {
-    async function fetchIssues() {
-      try {
-        const data = await api<IssueItemRaw[]>("my-issues");
-        console.log("Raw issues data:", data);
-        
-        const grouped = groupIssues(data);
-        console.log("Grouped issues:", grouped);
-        
-        // Sort: active issues first, then inactive, both in ascending order of issue date
-        const sorted = grouped.sort((a, b) => {
-          if (a.returned !== b.returned) {
-            return a.returned ? 1 : -1; // Active (not returned) first
-          }
-          return new Date(a.issued_date).getTime() - new Date(b.issued_date).getTime();
-        });
-        
-        setIssues(sorted);
-
-        const uniqueItemNos = new Set<string>();
-        data.forEach(item => uniqueItemNos.add(item.item_no));
-        
-        for (const item_no of uniqueItemNos) {
-          try {
-            const itemData = await api<ItemDetails[]>(`registry?item_no=eq.${item_no}`);
-            if (itemData && itemData.length > 0) {
-              setItemNames(prev => ({
-                ...prev,
-                [item_no]: itemData[0].name,
-              }));
-            }
-          } catch (err) {
-            console.error(`Failed to fetch name for item ${item_no}:`, err);
-          }
-        }
-      } catch (err) {
-        console.error("Failed to load issues:", err);
-        setIssues([]);
-      }
-    }
-    
-    fetchIssues();
-  }, []);
-
   async function loadIssues() {
     try {
-      const data = await api<IssueItemRaw[]>("my-issues");
-      const grouped = groupIssues(data);
-      
+      // Issues come back grouped by issue_id with item names embedded server-side
+      const grouped = await apiRows<GroupedIssue>("my-issues?view=grouped");
+
       // Sort: active issues first, then inactive, both in ascending order of issue date
       const sorted = grouped.sort((a, b) => {
         if (a.returned !== b.returned) {
@@ -130,14 +43,26 @@ export default function IssuesPage() {
         }
         return new Date(a.issued_date).getTime() - new Date(b.issued_date).getTime();
       });
-      
+
       setIssues(sorted);
+
+      const names: { [key: string]: string } = {};
+      grouped.forEach(issue => {
+        issue.items.forEach(item => {
+          if (item.name) names[item.item_no] = item.name;
+        });
+      });
+      setItemNames(names);
     } catch (err) {
       console.error("Failed to load issues:", err);
       setIssues([]);
     }
   }
 
+  useEffect(() => {
+    loadIssues();
+  }, []);
+
   async function handleFullReturn(issue_id: string) {
     if (!confirm("Return this entire issue?")) return;
 
@@ -4,10 +4,11 @@ export function getToken(): string | null {
   return localStorage.getItem("token");
 }
 
-export async function api<T>(
+// Raw authenticated request, for callers that need the response headers
+export async function apiResponse(
   path: string,
   options: RequestInit = {}
-): Promise<T> {
+): Promise<Response> {
   const token = getToken();
 
   const res = await fetch(`${API_BASE}/${path}`, {
@@ -23,5 +24,88 @@ export async function api<T>(
     throw new Error(await res.text());
   }
 
+  return res;
+}
+
+export async function api<T>(
+  path: string,
+  options: RequestInit = {}
+): Promise<T> {
+  const res = await apiResponse(path, options);
   return res.json() as Promise<T>;
 }
+
+export interface BatchRequest {
+  method?: string;
+  path: string;
+  body?: unknown;
+  headers?: Record<string, string>;
+  idempotency_key?: string;
+}
+
+export interface BatchResponse {
+  status: number;
+  body: unknown;
+  headers?: Record<string, string>;
+}
+
+// Runs several API calls in one round trip. Consecutive GETs run concurrently on
+// the worker; writes run in order. Each entry carries its own status.
+export async function apiBatch(requests: BatchRequest[]): Promise<BatchResponse[]> {
+  const { responses } = await api<{ responses: BatchResponse[] }>("batch", {
+    method: "POST",
+    body: JSON.stringify({ requests }),
+  });
+  return responses;
+}
+
+export function batchBody<T>(response: BatchResponse): T {
+  if (response.status >= 400) {
+    throw new Error(
+      typeof response.body === "string" ? response.body : JSON.stringify(response.body)
+    );
+  }
+  return response.body as T;
+}
+
+export interface ColumnarBody {
+  columns: string[];
+  rows: unknown[][];
+}
+
+export function fromColumnar<T>(body: ColumnarBody): T[] {
+  return body.rows.map(values => {
+    const row: Record<string, unknown> = {};
+    body.columns.forEach((column, i) => {
+      row[column] = values[i];
+    });
+    return row as T;
+  });
+}
+
+// List GETs (registry, members, my-issues, events) in the compact columnar format,
+// decoded back into ordinary row objects
+export async function apiRows<T>(path: string, options: RequestInit = {}): Promise<T[]> {
+  const separator = path.includes("?") ? "&" : "?";
+  const body = await api<ColumnarBody>(`${path}${separator}format=columnar`, options);
+  return fromColumnar<T>(body);
+}
+
+// Every page of a cursor-paged list GET (registry, my-issues, events), following
+// X-Next-Cursor until the server stops sending one
+export async function apiAllRows<T>(path: string, options: RequestInit = {}): Promise<T[]> {
+  const separator = path.includes("?") ? "&" : "?";
+  const rows: T[] = [];
+  let cursor: string | null = null;
+
+  do {
+    const page: string = cursor
+      ? `${path}${separator}format=columnar&cursor=${encodeURIComponent(cursor)}`
+      : `${path}${separator}format=columnar`;
+    const res = await apiResponse(page, options);
+    rows.push(...fromColumnar<T>((await res.json()) as ColumnarBody));
+    cursor = res.headers.get("X-Next-Cursor");
+  } while (cursor);
+
+  return rows;
+}
@@ -0,0 +1,80 @@
+import { api } from "./api";
+import { InventoryItem } from "../types";
+
+// Local inventory copy kept in Cache Storage alongside the service worker's caches
+const CACHE_NAME = "robodex-inventory";
+const SNAPSHOT_KEY = "/inventory-snapshot.json";
+
+interface InventorySnapshot {
+  version: number;
+  items: InventoryItem[];
+}
+
+interface InventoryChanges {
+  items: InventoryItem[];
+  deleted: string[];
+  version: number;
+  has_more: boolean;
+  reset: boolean;
+}
+
+const EMPTY_SNAPSHOT: InventorySnapshot = { version: 0, items: [] };
+
+async function readSnapshot(): Promise<InventorySnapshot> {
+  if (typeof caches === "undefined") return EMPTY_SNAPSHOT;
+  try {
+    const cache = await caches.open(CACHE_NAME);
+    const res = await cache.match(SNAPSHOT_KEY);
+    return res ? ((await res.json()) as InventorySnapshot) : EMPTY_SNAPSHOT;
+  } catch {
+    return EMPTY_SNAPSHOT;
+  }
+}
+
+async function writeSnapshot(snapshot: InventorySnapshot): Promise<void> {
+  if (typeof caches === "undefined") return;
+  try {
+    const cache = await caches.open(CACHE_NAME);
+    await cache.put(SNAPSHOT_KEY, new Response(JSON.stringify(snapshot), {
+      headers: { "Content-Type": "application/json" }
+    }));
+  } catch (err) {
+    console.error("Failed to store inventory snapshot:", err);
+  }
+}
+
+/**
+ * Bring the local inventory copy up to date via `registry/changes` and return it.
+ * Only rows changed since the stored version are downloaded.
+ */
+export async function syncInventory(): Promise<InventoryItem[]> {
+  const snapshot = await readSnapshot();
+  const items = new Map(snapshot.items.map(item => [item.item_no, item]));
+  let version = snapshot.version;
+  let changed = false;
+
+  for (;;) {
+    const delta = await api<InventoryChanges>(`registry/changes?since=${version}`);
+
+    if (delta.reset) {
+      // The server no longer knows our version (e.g. database restored); start over
+      items.clear();
+      version = 0;
+      changed = true;
+      continue;
+    }
+
+    for (const item of delta.items) items.set(item.item_no, item);
+    for (const itemNo of delta.deleted) items.delete(itemNo);
+    changed = changed || delta.version !== version;
+    version = delta.version;
+
+    if (!delta.has_more) break;
+  }
+
+  const result = Array.from(items.values());
+  if (changed) {
+    await writeSnapshot({ version, items: result });
+  }
+  return result;
+}
@@ -3,7 +3,7 @@
 "use client";
 
 import { use, useState, useEffect, useCallback } from "react";
-import { api } from "@/app/lib/api";
+import { api, apiRows } from "@/app/lib/api";
 import { FileChartColumn, NotebookPen, Github, FolderOpen, Settings } from "lucide-react";
 
 interface Props {
@@ -79,6 +79,19 @@ interface GitHubContributor {
   avatar_url: string;
 }
 
+interface ProjectDashboard {
+  project: Project;
+  analytics: ProjectItem[] | null;
+  pool: Pool | null;
+  members: Member[];
+  github: {
+    issues: GitHubIssue[] | null;
+    pulls: GitHubPR[] | null;
+    contributors: GitHubContributor[] | null;
+  } | null;
+  errors: Record<string, string>;
+}
+
 type TabType = "overview" | "notion" | "github" | "docs" | "settings";
 
 // Toast notification component
@@ -175,46 +188,44 @@ export default function ProjectPage({ params }: Props) {
   useEffect(() => {
     async function fetchProjectData() {
       try {
-        const projectData = await api<Project>(`projects/${project_id}`);
+        // One dashboard call gathers project, analytics, pool, people and GitHub;
+        // the full member list is only needed for the settings picker
+        const [dashboard, allMembersData] = await Promise.all([
+          api<ProjectDashboard>(`projects/${project_id}/dashboard`),
+          apiRows<Member>("members").catch((err) => {
+            console.error("Failed to fetch all members:", err);
+            return [] as Member[];
+          })
+        ]);
+
+        const projectData = dashboard.project;
         setProject(projectData);
         setEditedProject(projectData);
+        setAllMembers(allMembersData);
 
-        // Fetch analytics
-        const analyticsData = await api<ProjectItem[]>(`projects/${project_id}/analytics`);
-        setAnalytics(analyticsData);
-
-        // Fetch ALL members from the system first
-        try {
-          const allMembersData = await api<Member[]>(`members`);
-          setAllMembers(allMembersData);
-          
-          // Filter to get only project members from allMembers (this includes department)
-          if (projectData.members && projectData.members.length > 0) {
-            const allMemberIds = [
-              ...(projectData.managers || []),
-              ...(projectData.members || [])
-            ];
-            const uniqueMemberIds = new Set(allMemberIds);
-            const projectMembers = allMembersData.filter(m => uniqueMemberIds.has(m.member_id));
-            setMembers(projectMembers);
-          }
-        } catch (err) {
-          console.error("Failed to fetch all members:", err);
+        if (dashboard.analytics) {
+          setAnalytics(dashboard.analytics);
+        }
+        if (dashboard.members.length > 0) {
+          setMembers(dashboard.members);
+        }
+        if (dashboard.pool) {
+          setPoolInfo(dashboard.pool);
         }
 
-        // Fetch pool info if pool ID is available
-        if (projectData.pool) {
-          try {
-            const poolData = await api<Pool>(`pool/${projectData.pool}`);
-            setPoolInfo(poolData);
-          } catch (err) {
-            console.error("Failed to fetch pool:", err);
+        if (dashboard.github) {
+          const githubErrors = Object.keys(dashboard.errors).filter(part => part.startsWith("github."));
+          if (githubErrors.length > 0) {
+            setGithubError(`Failed to load GitHub data: ${githubErrors.map(part => dashboard.errors[part]).join(", ")}`);
           }
+          setGithubIssues((dashboard.github.issues || []).filter(issue => !issue.pull_request));
+          setGithubPRs(dashboard.github.pulls || []);
+          setGithubContributors(dashboard.github.contributors || []);
         }
 
-        // Fetch GitHub data if repo is configured
-        if (projectData.github_repo) {
-          await fetchGitHubData(projectData.github_repo);
+        const failedParts = Object.keys(dashboard.errors);
+        if (failedParts.length > 0) {
+          console.error("Dashboard partially failed:", dashboard.errors);
         }
       } catch (err) {
         console.error("Failed to load project:", err);
@@ -225,7 +236,7 @@ export default function ProjectPage({ params }: Props) {
     }
 
     fetchProjectData();
-  }, [project_id, fetchGitHubData, showToast]);
+  }, [project_id, showToast]);
 
   const handleSaveSettings = async () => {
     if (!editedProject) return;
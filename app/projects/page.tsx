@@ -3,7 +3,7 @@
 "use client";
 
 import { useState, useEffect } from "react";
-import { api } from "../lib/api";
+import { api, apiBatch, batchBody } from "../lib/api";
 import { useRouter } from "next/navigation";
 import { Trash2, Settings } from "lucide-react";
 
@@ -66,14 +66,14 @@ export default function ProjectsPage() {
 
     async function fetchData() {
       try {
-        const [projectsData, poolsData, membersData] = await Promise.all([
-          api<Project[]>("projects"),
-          api<Pool[]>("pools"),
-          api<Member[]>("members")
+        const [projectsRes, poolsRes, membersRes] = await apiBatch([
+          { path: "projects" },
+          { path: "pools" },
+          { path: "members" }
         ]);
-        setProjects(projectsData);
-        setPools(poolsData);
-        setAllMembers(membersData);
+        setProjects(batchBody<Project[]>(projectsRes));
+        setPools(batchBody<Pool[]>(poolsRes));
+        setAllMembers(batchBody<Member[]>(membersRes));
       } catch (err) {
         console.error("Failed to load data:", err);
       } finally {
@@ -92,7 +92,7 @@ export default function ProjectsPage() {
           try {
             const details = await api<Member[]>("members/batch", {
               method: "POST",
-              body: JSON.stringify({ member_id: pool.managers })
+              body: JSON.stringify({ member_ids: pool.managers })
             });
             setManagerDetails(details);
           } catch (err) {
@@ -132,18 +132,21 @@ export default function ProjectsPage() {
   const handleCreatePool = async (e: React.FormEvent) => {
     e.preventDefault();
     try {
-      await api("pool", {
-        method: "POST",
-        body: JSON.stringify({
-          name: poolName,
-          description: poolDescription,
-          managers: selectedManagers
-        })
-      });
-      
-      // Refresh pools
-      const poolsData = await api<Pool[]>("pools");
-      setPools(poolsData);
+      // Create and refresh pools in one round trip
+      const [created, poolsRes] = await apiBatch([
+        {
+          method: "POST",
+          path: "pool",
+          body: {
+            name: poolName,
+            description: poolDescription,
+            managers: selectedManagers
+          }
+        },
+        { path: "pools" }
+      ]);
+      batchBody(created);
+      setPools(batchBody<Pool[]>(poolsRes));
       
       // Reset form
       setPoolName("");
@@ -163,18 +166,21 @@ export default function ProjectsPage() {
     if (!currentPool) return;
     
     try {
-      await api(`pool/${currentPool.pool_id}`, {
-        method: "PATCH",
-        body: JSON.stringify({
-          name: poolName,
-          description: poolDescription,
-          managers: selectedManagers
-        })
-      });
-      
-      // Refresh pools
-      const poolsData = await api<Pool[]>("pools");
-      setPools(poolsData);
+      // Update and refresh pools in one round trip
+      const [updated, poolsRes] = await apiBatch([
+        {
+          method: "PATCH",
+          path: `pool/${currentPool.pool_id}`,
+          body: {
+            name: poolName,
+            description: poolDescription,
+            managers: selectedManagers
+          }
+        },
+        { path: "pools" }
+      ]);
+      batchBody(updated);
+      setPools(batchBody<Pool[]>(poolsRes));
       
       // Reset form
       setPoolName("");
@@ -196,13 +202,13 @@ export default function ProjectsPage() {
     }
     
     try {
-      await api(`pool/${poolId}`, {
-        method: "DELETE"
-      });
-      
-      // Refresh pools
-      const poolsData = await api<Pool[]>("pools");
-      setPools(poolsData);
+      // Delete and refresh pools in one round trip
+      const [deleted, poolsRes] = await apiBatch([
+        { method: "DELETE", path: `pool/${poolId}` },
+        { path: "pools" }
+      ]);
+      batchBody(deleted);
+      setPools(batchBody<Pool[]>(poolsRes));
       
       setShowPoolSettings(false);
       setCurrentPool(null);
@@ -217,17 +223,20 @@ export default function ProjectsPage() {
   const handleCreateProject = async (e: React.FormEvent) => {
     e.preventDefault();
     try {
-      await api("projects", {
-        method: "POST",
-        body: JSON.stringify({
-          project_name: projectName,
-          pool: selectedPool
-        })
-      });
-      
-      // Refresh projects
-      const projectsData = await api<Project[]>("projects");
-      setProjects(projectsData);
+      // Create and refresh projects in one round trip
+      const [created, projectsRes] = await apiBatch([
+        {
+          method: "POST",
+          path: "projects",
+          body: {
+            project_name: projectName,
+            pool: selectedPool
+          }
+        },
+        { path: "projects" }
+      ]);
+      batchBody(created);
+      setProjects(batchBody<Project[]>(projectsRes));
       
       // Reset form
       setProjectName("");
@@ -247,13 +256,13 @@ export default function ProjectsPage() {
     }
     
     try {
-      await api(`projects/${projectId}`, {
-        method: "DELETE"
-      });
-      
-      // Refresh projects
-      const projectsData = await api<Project[]>("projects");
-      setProjects(projectsData);
+      // Delete and refresh projects in one round trip
+      const [deleted, projectsRes] = await apiBatch([
+        { method: "DELETE", path: `projects/${projectId}` },
+        { path: "projects" }
+      ]);
+      batchBody(deleted);
+      setProjects(batchBody<Project[]>(projectsRes));
     } catch (err) {
       console.error("Failed to delete project:", err);
       alert("Failed to delete project");
@@ -0,0 +1,157 @@
+"""
+Memory and time of the streaming bulk routes at different file sizes.
+
+Runs `GET /registry/export`, `GET /issues/export` and `POST /registry/import`
+against a fake database that generates inventory and issue rows on demand
+and throws upserted rows away, so the only rows held in memory are the ones
+the worker itself holds. Peak traced memory per run should stay flat as the
+row count grows; wall time grows linearly.
+
+Usage:
+    python bench/bench_bulk.py
+    python bench/bench_bulk.py --rows 10000,100000 --latency-ms 20 --output /tmp/bulk.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+from fakes import Env, ExecutionContext, FakeUpstream, FetchResponse, Request, seed_tables
+
+import bench_worker
+
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "bulk_results.json"
+
+# Lines per chunk of the generated upload
+UPLOAD_CHUNK_LINES = 1000
+
+class SyntheticUpstream(FakeUpstream):
+    """FakeUpstream whose inventory and issues tables are generated, not stored"""
+
+    KEYS = {"inventory": ("item_no", "IT"), "issues": ("id", "row")}
+
+    def __init__(self, rows: int, **kwargs):
+        super().__init__(seed_tables(items=0, issues=0), **kwargs)
+        self.rows = rows
+        self.upserted = 0
+
+    def _row(self, table: str, i: int) -> dict:
+        if table == "inventory":
+            return {"item_no": f"IT{i:07d}", "name": f"Servo {i}", "quantity": 50, "available": i % 51,
+                    "price": 12.5, "location": f"Rack {i % 20}", "resources": None, "change_version": i + 1}
+        return {"id": f"row{i:07d}", "issue_id": f"iss{i // 3:07d}", "item_no": f"IT{i % 2000:07d}",
+                "quantity": 1, "member_id": "m00000", "project_id": "p0001",
+                "issued_date": "2025-01-01T10:00:00+00:00", "return_date": None, "returned": False,
+                "returned_quantity": 0}
+
+    def _postgrest(self, method: str, parsed, headers: dict, body) -> FetchResponse:
+        table = parsed.path.split("/rest/v1/", 1)[1]
+        if table not in self.KEYS:
+            return super()._postgrest(method, parsed, headers, body)
+        if method == "POST":
+            self.upserted += len(body)
+            return FetchResponse(None, 201)
+
+        query = dict(parse_qsl(parsed.query))
+        key, prefix = self.KEYS[table]
+        start = int(query[key].removeprefix(f"gt.{prefix}")) + 1 if key in query else 0
+        end = min(self.rows, start + int(query.get("limit", self.rows)))
+        page = [self._row(table, i) for i in range(start, end)]
+        return FetchResponse(self._select(table, page, query.get("select", "*")), 200)
+
+def csv_upload(rows: int):
+    """The import body, generated a chunk at a time"""
+    yield "item_no,name,quantity,available,price,location\n"
+    for start in range(0, rows, UPLOAD_CHUNK_LINES):
+        yield "".join(f"IT{i:07d},Servo {i},50,{i % 51},12.5,Rack {i % 20}\n"
+                      for i in range(start, min(rows, start + UPLOAD_CHUNK_LINES)))
+
+async def drain_stream(stream) -> tuple:
+    """(bytes, ms to first chunk) of a streamed body, discarding it as it arrives"""
+    started = time.perf_counter()
+    reader, size, first_ms = stream.getReader(), 0, None
+    while not (result := await reader.read()).done:
+        if first_ms is None:
+            first_ms = (time.perf_counter() - started) * 1000
+        size += len(result.value)
+    return size, first_ms
+
+async def run(operation: str, rows: int, args) -> dict:
+    entry = bench_worker.load_worker()
+    upstream = SyntheticUpstream(rows, latency_ms=args.latency_ms, jitter_ms=0, github_latency_ms=0)
+    upstream.install(entry)
+    exec_ctx = ExecutionContext()
+    worker = entry.Default(exec_ctx, Env())
+    token = entry.sign_jwt({"member_id": "m00000", "name": "member0"}, Env.JWT_SECRET)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    if operation == "import":
+        request = Request("POST", "registry/import", csv_upload(rows), {**headers, "Content-Type": "text/csv"})
+    else:
+        request = Request("GET", f"{operation}/export?format={args.format}", None, headers)
+
+    # Warm the lazy import and member lookup outside the measurement
+    warmup = await worker.fetch(Request("GET", "registry/export?fields=name", None, headers))
+    await drain_stream(warmup.body)
+    await bench_worker.drain(exec_ctx)
+    upstream.reset_counters()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    res = await worker.fetch(request)
+    if isinstance(res.body, (str, bytes)):
+        size, first_ms, summary = len(res.body), None, json.loads(res.body) if res.status == 200 else res.body
+    else:
+        (size, first_ms), summary = await drain_stream(res.body), None
+    await bench_worker.drain(exec_ctx)
+    wall_ms = (time.perf_counter() - started) * 1000
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    if operation == "import" and (res.status != 200 or summary["upserted"] != rows):
+        raise SystemExit(f"import failed: {res.status} {summary}")
+    return {
+        "status": res.status,
+        "rows": rows,
+        "wall_ms": round(wall_ms, 1),
+        "first_byte_ms": round(first_ms, 1) if first_ms is not None else None,
+        "bytes": size,
+        "upstream_calls": upstream.calls,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10000,100000", help="Comma-separated row counts")
+    parser.add_argument("--operations", default="registry,issues,import",
+                        help="registry and issues export; import uploads a CSV")
+    parser.add_argument("--format", default="csv", choices=("csv", "ndjson"), help="Export format")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated Supabase round trip")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    sizes = [int(n) for n in args.rows.split(",") if n.strip()]
+    operations = [op.strip() for op in args.operations.split(",") if op.strip()]
+    unknown = [op for op in operations if op not in ("registry", "issues", "import")]
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(unknown)}")
+
+    results = {op: [asyncio.run(run(op, rows, args)) for rows in sizes] for op in operations}
+
+    print(f"{'operation':<10} {'rows':>8} {'status':>6} {'wall ms':>9} {'first ms':>9} {'MB':>7} {'calls':>6} {'peak KiB':>9}")
+    for op, runs in results.items():
+        for r in runs:
+            first = r["first_byte_ms"] if r["first_byte_ms"] is not None else "-"
+            print(f"{op:<10} {r['rows']:>8} {r['status']:>6} {r['wall_ms']:>9} {first:>9} "
+                  f"{r['bytes'] / 1e6:>7.2f} {r['upstream_calls']:>6} {r['peak_kib']:>9}")
+
+    args.output.write_text(json.dumps({"python": sys.version.split()[0], "results": results}, indent=2) + "\n")
+    print(f"\nWrote {args.output}")
+
+if __name__ == "__main__":
+    main()
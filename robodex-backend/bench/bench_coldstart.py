@@ -0,0 +1,195 @@
+"""
+Cold-start cost of the worker: module import time and first-request latency.
+
+Every sample runs in a fresh interpreter with bytecode caching disabled, so
+`entry.py` (and any module it imports lazily) is compiled from source the way
+a new Pyodide isolate does. The standard library and the fakes are imported
+before the clock starts, since the Workers runtime already has those loaded.
+Upstreams answer instantly, so "first" is the worker's own first-request
+overhead (lazy imports, cache setup) and "warm" is the same request repeated.
+
+Usage:
+    python bench/bench_coldstart.py
+    python bench/bench_coldstart.py --compare bench/coldstart_baseline.json
+    python bench/bench_coldstart.py --runs 9 --output /tmp/cold.json --compare bench/coldstart_baseline.json --strict-latency
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fakes import Env, ExecutionContext, FakeUpstream, Request, install_runtime, seed_tables
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "coldstart_results.json"
+
+# Standard library the worker imports; preloaded so only our own code is timed
+PRELOAD = ("asyncio", "base64", "collections", "contextvars", "hashlib", "hmac", "importlib", "json",
+           "operator", "random", "urllib.parse")
+
+# name -> (method, path, body)
+ROUTES = {
+    "login": ("POST", "login", {"name": "member0", "password": "bench"}),
+    "registry": ("GET", "registry", None),
+    "my_issues": ("GET", "my-issues", None),
+    "github_issues": ("GET", "github/bench/repo1", None),
+    "create_pool": ("POST", "pool", {"name": "Cold start", "managers": []}),
+    "metrics": ("GET", "metrics", None),
+}
+
+# ============================================================================
+# CHILD: one cold isolate
+# ============================================================================
+
+def own_modules() -> list:
+    return sorted(
+        name for name, module in sys.modules.items()
+        if str(getattr(module, "__file__", "") or "").startswith(str(SRC))
+    )
+
+async def first_request(entry, route: str) -> dict:
+    method, path, body = ROUTES[route]
+    upstream = FakeUpstream(seed_tables(items=200), latency_ms=0, jitter_ms=0, github_latency_ms=0)
+    upstream.install(entry)
+    worker = entry.Default(ExecutionContext(), Env())
+    # Minted directly so no earlier request warms anything up
+    token = entry.sign_jwt({"member_id": "m00000", "name": "member0"}, Env.JWT_SECRET)
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+
+    loaded = set(own_modules())
+    timings = []
+    for _ in range(2):
+        started = time.perf_counter()
+        res = await worker.fetch(Request(method, path, body, headers))
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "status": res.status,
+        "first_ms": timings[0],
+        "warm_ms": timings[1],
+        "lazy_modules": sorted(set(own_modules()) - loaded),
+    }
+
+def child(route: str):
+    for name in PRELOAD:
+        __import__(name)
+    install_runtime()
+    sys.dont_write_bytecode = True
+    sys.pycache_prefix = tempfile.mkdtemp(prefix="robodex-cold-")
+    sys.path.insert(0, str(SRC))
+
+    started = time.perf_counter()
+    import entry
+    import_ms = (time.perf_counter() - started) * 1000
+    modules = own_modules()
+
+    result = asyncio.run(first_request(entry, route))
+    print(json.dumps({"import_ms": import_ms, "modules": modules, **result}))
+
+# ============================================================================
+# PARENT
+# ============================================================================
+
+def sample(route: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", route],
+        capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parent,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def measure(route: str, runs: int) -> dict:
+    samples = [sample(route) for _ in range(runs)]
+    return {
+        "runs": runs,
+        "status": samples[-1]["status"],
+        "import_ms": round(statistics.median(s["import_ms"] for s in samples), 2),
+        "first_request_ms": round(statistics.median(s["first_ms"] for s in samples), 2),
+        "warm_request_ms": round(statistics.median(s["warm_ms"] for s in samples), 2),
+        "modules_at_import": samples[-1]["modules"],
+        "lazy_modules": samples[-1]["lazy_modules"],
+    }
+
+COMPARED_METRICS = ("import_ms", "first_request_ms")
+# Which of our modules a route pulls in is deterministic, so any addition fails
+COMPARED_MODULES = ("modules_at_import", "lazy_modules")
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta_ms: float, strict_latency: bool) -> list:
+    """Print per-metric changes and return the regressions
+
+    A module newly imported at startup or on a route's first request always
+    fails. Import and first-request times swing by more than the threshold
+    between identical runs on a shared machine; they are flagged with "?" and
+    only fail under strict_latency.
+    """
+    regressions = []
+    print(f"\n{'route':<16} {'metric':<18} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = before[metric], current[metric]
+            change = (new - old) / old if old else 0.0
+            flag = ""
+            if change > threshold and new - old >= min_delta_ms:
+                flag = " !" if strict_latency else " ?"
+            if flag == " !":
+                regressions.append((name, metric, old, new))
+            print(f"{name:<16} {metric:<18} {old:>10} {new:>10} {change:>+7.0%}{flag}")
+        for key in COMPARED_MODULES:
+            added = sorted(set(current[key]) - set(before.get(key, [])))
+            if added:
+                regressions.append((name, key, before.get(key, []), current[key]))
+                print(f"{name:<16} {key:<18} new: {', '.join(added)} !")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", default=",".join(ROUTES), help="Comma-separated route names")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per route (median reported)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", type=Path, help="Earlier results file to diff against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative increase reported as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore increases smaller than this")
+    parser.add_argument("--strict-latency", "--strict", action="store_true",
+                        help="Fail on import and first-request time regressions too (use on a quiet, dedicated machine)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    names = [n.strip() for n in args.routes.split(",") if n.strip()]
+    unknown = [n for n in names if n not in ROUTES]
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(unknown)}")
+
+    results = {name: measure(name, args.runs) for name in names}
+
+    print(f"{'route':<16} {'status':>6} {'import':>8} {'first':>8} {'warm':>8}  lazy modules")
+    for name, r in results.items():
+        print(f"{name:<16} {r['status']:>6} {r['import_ms']:>8} {r['first_request_ms']:>8} "
+              f"{r['warm_request_ms']:>8}  {', '.join(r['lazy_modules']) or '-'}")
+
+    args.output.write_text(json.dumps({"python": sys.version.split()[0], "routes": results}, indent=2) + "\n")
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["routes"]
+        recorded_runs = sorted({r["runs"] for r in baseline.values()} - {args.runs})
+        if recorded_runs:
+            print(f"\nwarning: baseline was recorded with --runs {', '.join(map(str, recorded_runs))} "
+                  f"(now {args.runs})")
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms, args.strict_latency)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s)")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Tokens/sec for JWT signing and verification, before and after TokenVerifier.
+
+"legacy" is the per-call implementation entry.py used to have: new HMAC object
+from the encoded secret, base64/JSON decode and a plain `!=` compare on every
+request. "cold" cycles through more distinct tokens than the verifier caches,
+so every call misses and pays for the full check plus the cache insert; "warm"
+repeats one token, which is what a client's follow-up requests look like.
+Cases are measured in interleaved rounds and the median rate is reported, so
+drift on a busy machine hits both implementations alike.
+
+Usage:
+    python bench/bench_jwt.py
+    python bench/bench_jwt.py --seconds 2 --rounds 7 --output /tmp/jwt.json
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import statistics
+import time
+from pathlib import Path
+
+from bench_worker import load_worker
+
+SECRET = "bench-jwt-secret"
+PAYLOAD = {"member_id": "0b8f6a3e-55a1-4c8e-9d1e-2f7a9c4b1d20", "name": "member0"}
+
+def legacy_b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def legacy_sign(payload: dict, secret: str, exp_seconds=3600):
+    payload["exp"] = int(time.time()) + exp_seconds
+    h = legacy_b64url(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+    p = legacy_b64url(json.dumps(payload).encode())
+    sig = hmac.new(secret.encode(), f"{h}.{p}".encode(), hashlib.sha256).digest()
+    return f"{h}.{p}.{legacy_b64url(sig)}"
+
+def legacy_verify(token: str, secret: str):
+    try:
+        h, p, s = token.split(".")
+    except ValueError:
+        return None
+    sig = hmac.new(secret.encode(), f"{h}.{p}".encode(), hashlib.sha256).digest()
+    if legacy_b64url(sig) != s:
+        return None
+    payload = json.loads(base64.urlsafe_b64decode(p + "=="))
+    if payload["exp"] < time.time():
+        return None
+    return payload
+
+def rate(fn, seconds: float) -> float:
+    """Calls per second of fn() over roughly `seconds`"""
+    calls = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while True:
+        for _ in range(500):
+            fn()
+        calls += 500
+        now = time.perf_counter()
+        if now >= deadline:
+            return calls / (now - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time spent on each case")
+    parser.add_argument("--tokens", type=int, default=5000, help="Distinct tokens for the cold cases")
+    parser.add_argument("--rounds", type=int, default=5, help="Interleaved measurements per case (median reported)")
+    parser.add_argument("--output", type=Path, help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    entry = load_worker()
+    tokens = [legacy_sign({**PAYLOAD, "n": i}, SECRET) for i in range(args.tokens)]
+    token = tokens[0]
+
+    def cycling(verify):
+        state = {"i": 0}
+
+        def call():
+            state["i"] = (state["i"] + 1) % len(tokens)
+            verify(tokens[state["i"]], SECRET)
+        return call
+
+    assert entry.verify_jwt(token, SECRET) == legacy_verify(token, SECRET)
+    if args.tokens <= entry.TOKEN_CACHE_MAX:
+        parser.error(f"--tokens must exceed the verifier cache ({entry.TOKEN_CACHE_MAX}) for cold cases to miss")
+    assert entry.sign_jwt(dict(PAYLOAD), SECRET).count(".") == 2
+
+    cases = {
+        "sign/legacy": lambda: legacy_sign(dict(PAYLOAD), SECRET),
+        "sign/verifier": lambda: entry.sign_jwt(dict(PAYLOAD), SECRET),
+        "verify_cold/legacy": cycling(legacy_verify),
+        "verify_cold/verifier": cycling(entry.verify_jwt),
+        "verify_warm/legacy": lambda: legacy_verify(token, SECRET),
+        "verify_warm/verifier": lambda: entry.verify_jwt(token, SECRET),
+    }
+
+    rates = {name: [] for name in cases}
+    for _ in range(args.rounds):
+        for name, fn in cases.items():
+            rates[name].append(rate(fn, args.seconds))
+
+    results = {}
+    print(f"{'case':<24} {'tokens/sec':>12} {'speedup':>8}")
+    for name in cases:
+        results[name] = round(statistics.median(rates[name]))
+        op, impl = name.split("/")
+        baseline = results.get(f"{op}/legacy")
+        speedup = f"{results[name] / baseline:.2f}x" if impl != "legacy" and baseline else ""
+        print(f"{name:<24} {results[name]:>12,} {speedup:>8}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+How the worker behaves while an upstream is down, slow, and recovering.
+
+Runs one route through four phases against the fakes: healthy, upstream
+down (every call answers 503), upstream hanging past the request deadline,
+and healthy again. Reports status counts and latency per phase, plus the
+circuit breaker state at the end of each one. While the breaker is open,
+requests come back 200 with `X-Cache: STALE` from a cached copy, or, with
+--cold, fail with 503 in well under a millisecond.
+
+Usage:
+    python bench/bench_outage.py
+    python bench/bench_outage.py --cold
+    python bench/bench_outage.py --path github/bench/repo1 --upstream github
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from bench_worker import LOGIN, drain, load_worker, percentile
+from fakes import Env, ExecutionContext, FakeUpstream, Request, seed_tables
+
+async def run(args) -> dict:
+    entry = load_worker()
+    upstream = FakeUpstream(seed_tables(items=200), latency_ms=args.latency_ms, jitter_ms=0,
+                            github_latency_ms=args.latency_ms)
+    upstream.install(entry)
+    for breaker in entry._breakers.values():
+        breaker.reset_timeout = args.reset_timeout
+    exec_ctx = ExecutionContext()
+    env = Env()
+    env.REQUEST_DEADLINE = str(args.deadline)
+    worker = entry.Default(exec_ctx, env)
+
+    res = await worker.fetch(Request("POST", "login", LOGIN))
+    headers = {"Authorization": f"Bearer {json.loads(res.body)['token']}"}
+
+    def expire_caches():
+        """Make the next request go upstream; --cold drops cached copies altogether"""
+        github = entry.load_module("github_routes")
+        if args.cold:
+            entry._list_cache.clear()
+            github._github_cache._entries.clear()
+            return
+        for key, (expires_at, (version, cached_at, *rest)) in list(entry._list_cache._data.items()):
+            entry._list_cache._data[key] = (expires_at, (version, cached_at - entry.LIST_CACHE_TTL, *rest))
+        for cached in github._github_cache._entries.values():
+            cached["fetched_at"] -= github.GITHUB_STALE_TTL
+
+    async def phase(fault):
+        upstream.faults = {args.upstream: fault} if fault is not None else {}
+        expire_caches()
+        latencies, statuses = [], {}
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            res = await worker.fetch(Request("GET", args.path, None, headers))
+            latencies.append((time.perf_counter() - started) * 1000)
+            label = f"{res.status} {res.headers.get('X-Cache', '')}".strip()
+            statuses[label] = statuses.get(label, 0) + 1
+        await drain(exec_ctx)
+        return {
+            "statuses": statuses,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "breaker": entry._breakers[args.upstream].snapshot(),
+        }
+
+    results = {"healthy": await phase(None)}
+    results["down"] = await phase("down")
+    await asyncio.sleep(args.reset_timeout)
+    results["hanging"] = await phase(args.deadline * 2000)
+    await asyncio.sleep(args.reset_timeout)
+    results["recovered"] = await phase(None)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="pools", help="Route to request in every phase")
+    parser.add_argument("--upstream", choices=("db", "github"), default="db", help="Upstream to break")
+    parser.add_argument("--requests", type=int, default=20, help="Sequential requests per phase")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--deadline", type=float, default=1.0, help="REQUEST_DEADLINE for the worker")
+    parser.add_argument("--reset-timeout", type=float, default=1.0, help="Breaker open -> half-open delay")
+    parser.add_argument("--cold", action="store_true", help="No cached copies to fall back on (expect 503s)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"{'phase':<10} {'p50':>8} {'p95':>8} {'breaker':<10} statuses")
+    for name, r in results.items():
+        print(f"{name:<10} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['breaker']['state']:<10} {r['statuses']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Benchmark the set-based issue_items / return_items RPCs against the old per-item loops.
+
+Runs against a local Postgres, never Supabase. Everything lives in a scratch schema
+that is dropped afterwards. For statement counts the server needs pg_stat_statements:
+
+    shared_preload_libraries = 'pg_stat_statements'
+
+Usage:
+    pip install "psycopg[binary]"
+    BENCH_DSN=postgresql://postgres@localhost/postgres python bench/bench_rpc.py
+    python bench/bench_rpc.py --sizes 1,10,50,100 --rounds 30
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+import uuid
+from pathlib import Path
+
+import psycopg
+
+SCHEMA = "robodex_bench_rpc"
+SUPABASE_SQL = Path(__file__).resolve().parents[2] / "supabase.sql"
+
+TABLES = """
+CREATE TABLE members (
+  member_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  name TEXT NOT NULL,
+  phone TEXT,
+  password TEXT NOT NULL
+);
+
+CREATE TABLE projects (
+  project_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  project_name TEXT NOT NULL
+);
+
+CREATE TABLE inventory (
+  item_no TEXT PRIMARY KEY,
+  name TEXT NOT NULL,
+  quantity INT NOT NULL,
+  available INT NOT NULL,
+  price NUMERIC,
+  location TEXT,
+  CHECK (available >= 0 AND available <= quantity)
+);
+
+CREATE TABLE issues (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  issue_id UUID NOT NULL,
+  item_no TEXT NOT NULL REFERENCES inventory(item_no),
+  quantity INT NOT NULL CHECK (quantity > 0),
+  member_id UUID NOT NULL REFERENCES members(member_id),
+  project_id UUID NOT NULL REFERENCES projects(project_id),
+  issued_date TIMESTAMPTZ DEFAULT NOW(),
+  return_date TIMESTAMPTZ,
+  returned BOOLEAN DEFAULT FALSE,
+  returned_quantity INT DEFAULT 0 CHECK (returned_quantity <= quantity)
+);
+
+CREATE INDEX idx_issues_issue_id ON issues(issue_id);
+CREATE INDEX idx_issues_item_no ON issues(item_no);
+"""
+
+# The loop versions as deployed before the rewrite, kept here for comparison
+LEGACY_FUNCTIONS = """
+CREATE FUNCTION legacy_issue_items(p_member_id UUID, p_project_id UUID, p_items JSONB, p_return_date TIMESTAMPTZ DEFAULT NULL)
+RETURNS UUID LANGUAGE plpgsql AS $$
+DECLARE
+  new_issue_id UUID := gen_random_uuid();
+  rec JSONB;
+  v_qty INT;
+  v_item_no TEXT;
+  v_available INT;
+BEGIN
+  IF NOT EXISTS(SELECT 1 FROM members WHERE member_id = p_member_id) THEN
+    RAISE EXCEPTION 'Invalid member_id: %', p_member_id;
+  END IF;
+  IF NOT EXISTS(SELECT 1 FROM projects WHERE project_id = p_project_id) THEN
+    RAISE EXCEPTION 'Invalid project_id: %', p_project_id;
+  END IF;
+  FOR rec IN SELECT * FROM jsonb_array_elements(p_items)
+  LOOP
+    v_item_no := rec->>'item_no';
+    v_qty := (rec->>'quantity')::INT;
+    SELECT available INTO v_available FROM inventory WHERE item_no = v_item_no;
+    IF NOT FOUND THEN
+      RAISE EXCEPTION 'Item not found: %', v_item_no;
+    END IF;
+    IF v_available < v_qty THEN
+      RAISE EXCEPTION 'Insufficient inventory for item %. Available: %, Requested: %', v_item_no, v_available, v_qty;
+    END IF;
+    UPDATE inventory SET available = available - v_qty WHERE item_no = v_item_no;
+    INSERT INTO issues (issue_id, item_no, quantity, member_id, project_id, issued_date, return_date, returned)
+    VALUES (new_issue_id, v_item_no, v_qty, p_member_id, p_project_id, NOW(), p_return_date, false);
+  END LOOP;
+  RETURN new_issue_id;
+END;
+$$;
+
+CREATE FUNCTION legacy_return_items(p_issue_id UUID, p_items JSONB)
+RETURNS VOID LANGUAGE plpgsql AS $$
+DECLARE
+  rec JSONB;
+  v_qty INT;
+  v_item_no TEXT;
+  v_current_returned INT;
+  v_total_quantity INT;
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM issues WHERE issue_id = p_issue_id AND returned = false) THEN
+    RAISE EXCEPTION 'Issue not found or already fully returned: %', p_issue_id;
+  END IF;
+  FOR rec IN SELECT * FROM jsonb_array_elements(p_items)
+  LOOP
+    v_item_no := rec->>'item_no';
+    v_qty := (rec->>'quantity')::INT;
+    SELECT returned_quantity, quantity INTO v_current_returned, v_total_quantity
+    FROM issues WHERE issue_id = p_issue_id AND item_no = v_item_no AND returned = false;
+    IF NOT FOUND THEN
+      RAISE EXCEPTION 'Item % not found in issue % or already returned', v_item_no, p_issue_id;
+    END IF;
+    IF v_current_returned + v_qty > v_total_quantity THEN
+      RAISE EXCEPTION 'Cannot return % units of item %. Issued: %, Already returned: %, Attempting to return: %',
+        v_qty, v_item_no, v_total_quantity, v_current_returned, v_qty;
+    END IF;
+    UPDATE issues SET returned_quantity = returned_quantity + v_qty
+    WHERE issue_id = p_issue_id AND item_no = v_item_no AND returned = false;
+    UPDATE inventory SET available = available + v_qty WHERE item_no = v_item_no;
+    IF NOT FOUND THEN
+      RAISE EXCEPTION 'Item % not found in inventory', v_item_no;
+    END IF;
+  END LOOP;
+  UPDATE issues SET returned = true, return_date = NOW()
+  WHERE issue_id = p_issue_id AND returned_quantity = quantity AND returned = false;
+END;
+$$;
+"""
+
+IMPLEMENTATIONS = {
+    "loop": ("legacy_issue_items", "legacy_return_items"),
+    "set": ("issue_items", "return_items"),
+}
+
+
+def set_based_functions() -> str:
+    """Pull the SET-BASED ISSUE / RETURN section out of supabase.sql."""
+    sql = SUPABASE_SQL.read_text()
+    start = sql.index("-- SET-BASED ISSUE / RETURN")
+    start = sql.index("CREATE OR REPLACE FUNCTION issue_items", start)
+    end = sql.find("\n-- ====", start)
+    return sql[start:] if end == -1 else sql[start:end]
+
+
+def setup(conn, item_count: int):
+    conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    conn.execute(f"CREATE SCHEMA {SCHEMA}")
+    conn.execute(f"SET search_path TO {SCHEMA}, public")
+    conn.execute(TABLES)
+    conn.execute(LEGACY_FUNCTIONS)
+    conn.execute(set_based_functions())
+
+    member_id, project_id = uuid.uuid4(), uuid.uuid4()
+    conn.execute("INSERT INTO members (member_id, name, password) VALUES (%s, 'bench', 'x')", (member_id,))
+    conn.execute("INSERT INTO projects (project_id, project_name) VALUES (%s, 'bench')", (project_id,))
+    with conn.cursor() as cur:
+        cur.executemany(
+            "INSERT INTO inventory (item_no, name, quantity, available) VALUES (%s, %s, 1000000, 1000000)",
+            [(f"B{i:05d}", f"Bench item {i}") for i in range(item_count)],
+        )
+    return member_id, project_id
+
+
+def stat_statements_available(conn) -> bool:
+    try:
+        conn.execute("CREATE EXTENSION IF NOT EXISTS pg_stat_statements WITH SCHEMA public")
+        conn.execute("SET pg_stat_statements.track = 'all'")
+        conn.execute("SELECT pg_stat_statements_reset()")
+        return True
+    except psycopg.Error:
+        return False
+
+
+def count_statements(conn) -> int:
+    """Statements run inside the RPCs since the last reset (top-level calls excluded)."""
+    row = conn.execute(
+        """
+        SELECT COALESCE(SUM(calls), 0)
+        FROM pg_stat_statements
+        WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+          AND toplevel = false
+        """
+    ).fetchone()
+    return int(row[0])
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_size(conn, impl: str, size: int, rounds: int, member_id, project_id, track: bool) -> dict:
+    issue_fn, return_fn = IMPLEMENTATIONS[impl]
+    cart = json.dumps([{"item_no": f"B{i:05d}", "quantity": 1} for i in range(size)])
+    issue_ms, return_ms, statements = [], [], []
+
+    for _ in range(rounds):
+        if track:
+            conn.execute("SELECT pg_stat_statements_reset()")
+
+        started = time.perf_counter()
+        issue_id = conn.execute(
+            f"SELECT {issue_fn}(%s, %s, %s::jsonb)", (member_id, project_id, cart)
+        ).fetchone()[0]
+        issue_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        conn.execute(f"SELECT {return_fn}(%s, %s::jsonb)", (issue_id, cart))
+        return_ms.append((time.perf_counter() - started) * 1000)
+
+        if track:
+            statements.append(count_statements(conn))
+
+    return {
+        "impl": impl,
+        "cart_size": size,
+        "issue_p50_ms": round(statistics.median(issue_ms), 3),
+        "issue_p95_ms": round(percentile(issue_ms, 95), 3),
+        "return_p50_ms": round(statistics.median(return_ms), 3),
+        "return_p95_ms": round(percentile(return_ms, 95), 3),
+        "statements_per_cycle": round(statistics.median(statements)) if statements else None,
+    }
+
+
+def check_errors(conn, member_id, project_id):
+    """Both implementations must fail the same way on the same bad input."""
+    cases = [
+        ("missing item", [{"item_no": "NOPE", "quantity": 1}]),
+        ("insufficient stock", [{"item_no": "B00000", "quantity": 2000000}]),
+    ]
+    for label, cart in cases:
+        messages = {}
+        for impl, (issue_fn, _) in IMPLEMENTATIONS.items():
+            try:
+                with conn.transaction():
+                    conn.execute(f"SELECT {issue_fn}(%s, %s, %s::jsonb)", (member_id, project_id, json.dumps(cart)))
+                messages[impl] = None
+            except psycopg.Error as e:
+                messages[impl] = e.diag.message_primary
+        status = "ok" if messages["loop"] == messages["set"] and messages["set"] else "MISMATCH"
+        print(f"  {label:<20} {status}: {messages['set']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=os.environ.get("BENCH_DSN", "postgresql://postgres@localhost/postgres"))
+    parser.add_argument("--sizes", default="1,5,10,25,50,100")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = []
+
+    with psycopg.connect(args.dsn, autocommit=True) as conn:
+        member_id, project_id = setup(conn, max(sizes))
+        track = stat_statements_available(conn)
+        if not track:
+            print("pg_stat_statements unavailable; statement counts will be skipped")
+
+        print("Error semantics:")
+        check_errors(conn, member_id, project_id)
+
+        print(f"\n{'impl':<5} {'cart':>5} {'issue p50':>10} {'issue p95':>10} {'return p50':>11} {'return p95':>11} {'stmts':>6}")
+        try:
+            for size in sizes:
+                for impl in IMPLEMENTATIONS:
+                    r = run_size(conn, impl, size, args.rounds, member_id, project_id, track)
+                    results.append(r)
+                    print(
+                        f"{r['impl']:<5} {r['cart_size']:>5} {r['issue_p50_ms']:>10} {r['issue_p95_ms']:>10} "
+                        f"{r['return_p50_ms']:>11} {r['return_p95_ms']:>11} {str(r['statements_per_cycle']):>6}"
+                    )
+        finally:
+            conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
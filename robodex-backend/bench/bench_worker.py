@@ -0,0 +1,308 @@
+"""
+Offline benchmark for the worker's routes.
+
+Loads `src/entry.py` under CPython with the stand-ins from `fakes.py`: a fake
+`env`, and `pyfetch` answering from in-memory PostgREST/GitHub tables after a
+simulated network delay. Each scenario runs against a fresh isolate at a fixed
+concurrency and reports latency percentiles, upstream calls per request and
+bytes in/out. Results are written as JSON; `--compare` diffs them against an
+earlier run and exits non-zero on regressions.
+
+Usage:
+    python bench/bench_worker.py
+    python bench/bench_worker.py --requests 500 --concurrency 32 --latency-ms 30
+    python bench/bench_worker.py --scenarios registry,members --output /tmp/after.json \\
+        --compare bench/baseline.json
+    python bench/bench_worker.py --requests 50 --runs 3 --output bench/baseline.json
+"""
+
+import argparse
+import asyncio
+import copy
+import gzip
+import importlib
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fakes import Env, ExecutionContext, FakeUpstream, Request, install_runtime, read_body, seed_tables
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "results.json"
+
+LOGIN = {"name": "member0", "password": "bench"}
+
+# name -> (method, path, body[, extra headers]); member0 has clearance 5 so every route is reachable
+SCENARIOS = {
+    "login": ("POST", "login", LOGIN),
+    "me": ("GET", "me", None),
+    "registry": ("GET", "registry", None),
+    "registry_page": ("GET", "registry?limit=100&fields=item_no,name,available", None),
+    "registry_columnar": ("GET", "registry?format=columnar", None),
+    "registry_gzip": ("GET", "registry", None, {"Accept-Encoding": "gzip"}),
+    "registry_columnar_gzip": ("GET", "registry?format=columnar", None, {"Accept-Encoding": "gzip"}),
+    "registry_search": ("GET", "registry/search?q=servo", None),
+    # A client 20 changes behind, against the default 2000-row inventory
+    "registry_changes": ("GET", "registry/changes?since=1980", None),
+    "registry_export": ("GET", "registry/export", None),
+    "projects": ("GET", "projects", None),
+    "project": ("GET", "projects/p0001", None),
+    "project_analytics": ("GET", "projects/p0001/analytics", None),
+    "project_dashboard": ("GET", "projects/p0001/dashboard", None),
+    "members": ("GET", "members", None),
+    "members_columnar": ("GET", "members?format=columnar", None),
+    "members_batch": ("POST", "members/batch", {"member_ids": [f"m{i:05d}" for i in range(0, 40, 4)]}),
+    "pools": ("GET", "pools", None),
+    "pool": ("GET", "pool/pl000", None),
+    "my_issues": ("GET", "my-issues", None),
+    "my_issues_grouped": ("GET", "my-issues?view=grouped", None),
+    "outstanding_by_member": ("GET", "reports/outstanding?group_by=member", None),
+    "events": ("GET", "events", None),
+    "events_month": ("GET", "events?from=2025-03-01T00:00:00Z&to=2025-04-01T00:00:00Z", None),
+    "kanban": ("GET", "kanban", None),
+    "github_issues": ("GET", "github/bench/repo1", None),
+    "batch_projects_page": ("POST", "batch", {"requests": [
+        {"path": "projects"},
+        {"path": "pools"},
+        {"path": "members"},
+    ]}),
+    "issue": ("POST", "issue", {"project_id": "p0001", "items": [{"item_no": "IT00001", "quantity": 1}]}),
+    # Every request after the first is a retry answered from the idempotency store
+    "issue_retry": ("POST", "issue", {"project_id": "p0001", "items": [{"item_no": "IT00001", "quantity": 1}]},
+                    {"Idempotency-Key": "bench-retry"}),
+}
+
+# ============================================================================
+# WORKER LOADING
+# ============================================================================
+
+def load_worker():
+    """Import entry.py afresh so every scenario starts from a cold isolate"""
+    install_runtime()
+    if str(SRC) not in sys.path:
+        sys.path.insert(0, str(SRC))
+    # Lazily imported handler modules hold references into the old entry module
+    for name, module in list(sys.modules.items()):
+        if name != "entry" and str(getattr(module, "__file__", "") or "").startswith(str(SRC)):
+            del sys.modules[name]
+    if "entry" in sys.modules:
+        return importlib.reload(sys.modules["entry"])
+    return importlib.import_module("entry")
+
+def percentile(samples: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, min(len(ordered), round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+async def drain(exec_ctx: ExecutionContext):
+    while exec_ctx.tasks:
+        tasks, exec_ctx.tasks = exec_ctx.tasks, []
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+# ============================================================================
+# SCENARIO RUNNER
+# ============================================================================
+
+async def run_scenario(name: str, args, tables: dict) -> dict:
+    method, path, body, *extra = SCENARIOS[name]
+    entry = load_worker()
+    upstream = FakeUpstream(
+        copy.deepcopy(tables),
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        github_latency_ms=args.github_latency_ms,
+    )
+    upstream.install(entry)
+    exec_ctx = ExecutionContext()
+    env = Env()
+    env.TRACE_SAMPLE_RATE = str(args.trace_sample_rate)
+    worker = entry.Default(exec_ctx, env)
+
+    res = await worker.fetch(Request("POST", "login", LOGIN))
+    token = json.loads(res.body)["token"]
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json", **(extra[0] if extra else {})}
+    request_bytes = len(json.dumps(body)) if body is not None else 0
+
+    async def one():
+        started = time.perf_counter()
+        res = await worker.fetch(Request(method, path, body, headers))
+        # Streamed bodies are read to the end, as a client would
+        payload = await read_body(res)
+        elapsed = (time.perf_counter() - started) * 1000
+        if payload and res.headers.get("Content-Encoding"):
+            # The runtime would compress on the way out; gzip stands in for br too
+            payload = gzip.compress(payload)
+        return elapsed, res.status, len(payload)
+
+    for _ in range(args.warmup):
+        await one()
+    await drain(exec_ctx)
+    upstream.reset_counters()
+
+    latencies, statuses, response_bytes = [], {}, 0
+    remaining = args.requests
+
+    async def client():
+        nonlocal remaining, response_bytes
+        while remaining > 0:
+            remaining -= 1
+            elapsed, status, size = await one()
+            latencies.append(elapsed)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            response_bytes += size
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - started
+    await drain(exec_ctx)
+
+    count = len(latencies)
+    return {
+        "requests": count,
+        "concurrency": args.concurrency,
+        "statuses": statuses,
+        "rps": round(count / wall, 1) if wall else None,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+        "upstream_calls_per_request": round(upstream.calls / count, 3),
+        "upstream_calls_by_host": upstream.by_host,
+        "bytes_in_per_request": request_bytes,
+        "bytes_out_per_request": round(response_bytes / count, 1),
+        "upstream_bytes_in_per_request": round(upstream.bytes_in / count, 1),
+        "upstream_bytes_out_per_request": round(upstream.bytes_out / count, 1),
+    }
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+# metric -> allowed relative increase before --compare calls it a regression
+COMPARED_METRICS = {
+    "p50_ms": None,
+    "p95_ms": None,
+    "upstream_calls_per_request": 0.0,
+    "bytes_out_per_request": 0.0,
+}
+
+def print_table(results: dict):
+    print(f"{'scenario':<22} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>8} {'up/req':>7} {'out B':>9} {'up in B':>9}")
+    for name, r in results.items():
+        print(
+            f"{name:<22} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['rps']:>8} "
+            f"{r['upstream_calls_per_request']:>7} {r['bytes_out_per_request']:>9} {r['upstream_bytes_in_per_request']:>9}"
+        )
+
+# Settings that change per-request ratios (e.g. one coalesced lookup per wave of
+# concurrent requests), so a baseline is only comparable when they match
+COMPARABLE_CONFIG = ("requests", "concurrency", "warmup", "latency_ms", "jitter_ms", "github_latency_ms", "items")
+
+def config_mismatches(config: dict, baseline_config: dict) -> list:
+    return [
+        f"{key}={config[key]} (baseline {baseline_config[key]})"
+        for key in COMPARABLE_CONFIG
+        if key in baseline_config and baseline_config[key] != config[key]
+    ]
+
+def median_run(runs: list) -> dict:
+    """The run with the median p50, so one noisy run doesn't set the numbers"""
+    return sorted(runs, key=lambda r: r["p50_ms"])[len(runs) // 2]
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta_ms: float, strict_latency: bool) -> list:
+    """Print per-metric changes and return the regressions
+
+    Upstream calls and bytes are deterministic against the fakes, so any
+    growth fails. Wall-clock latency swings by more than the threshold between
+    identical runs on a shared or throttled machine; it is flagged with "?" and
+    only fails under strict_latency.
+    """
+    regressions = []
+    print(f"\n{'scenario':<22} {'metric':<28} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric, allowed in COMPARED_METRICS.items():
+            old, new = before.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else (0.0 if new == old else float("inf"))
+            limit = threshold if allowed is None else allowed
+            # Sub-millisecond latencies are mostly scheduler noise
+            noise = allowed is None and new - old < min_delta_ms
+            flag = ""
+            if change > limit and not noise:
+                flag = " !" if allowed is not None or strict_latency else " ?"
+            if flag == " !":
+                regressions.append((name, metric, old, new))
+            print(f"{name:<22} {metric:<28} {old:>10} {new:>10} {change:>+7.0%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenario names")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before each scenario")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated Supabase round trip")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--github-latency-ms", type=float, default=120.0)
+    parser.add_argument("--items", type=int, default=2000, help="Inventory rows in the fake database")
+    parser.add_argument("--runs", type=int, default=1,
+                        help="Measure each scenario this many times and keep the median run")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", type=Path, help="Earlier results file to diff against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Relative latency increase reported as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="Ignore latency increases smaller than this")
+    parser.add_argument("--strict-latency", action="store_true",
+                        help="Fail on latency regressions too (use on a quiet, dedicated machine)")
+    parser.add_argument("--trace-sample-rate", type=float, default=0.0,
+                        help="TRACE_SAMPLE_RATE for the worker (sampled requests log to stdout)")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    tables = seed_tables(items=args.items)
+    results = {}
+    for name in names:
+        results[name] = median_run([asyncio.run(run_scenario(name, args, tables)) for _ in range(args.runs)])
+
+    print_table(results)
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "config": config,
+        },
+        "scenarios": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2, default=str) + "\n")
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        recorded = json.loads(args.compare.read_text())
+        mismatches = config_mismatches(config, recorded["meta"]["config"])
+        if mismatches:
+            print(f"\nwarning: baseline was recorded with other settings: {', '.join(mismatches)}")
+        baseline = recorded["scenarios"]
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms, args.strict_latency)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s)")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
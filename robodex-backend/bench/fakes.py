@@ -0,0 +1,659 @@
+"""
+In-process stand-ins for the Workers runtime, PostgREST and the GitHub API.
+
+Lets `src/entry.py` run under plain CPython for benchmarks: `install_runtime()`
+registers minimal `workers`, `pyodide.http` and `js` modules, and `FakeUpstream`
+answers every `pyfetch` the worker makes from in-memory tables after a
+configurable delay, counting calls and bytes as it goes.
+"""
+
+import asyncio
+import json
+import random
+import sys
+import types
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, unquote, urlparse
+
+SUPABASE_URL = "https://bench.supabase.local"
+GITHUB_API_URL = "https://bench.github.local"
+
+# ============================================================================
+# RUNTIME MODULES
+# ============================================================================
+
+class Response:
+    """Just enough of workers.Response for entry.py"""
+
+    def __init__(self, body=None, status=200, headers=None):
+        self.body = body
+        self.status = status
+        self.headers = dict(headers or {})
+
+    @classmethod
+    def json(cls, data, status=200, headers=None):
+        return cls(json.dumps(data), status, {"Content-Type": "application/json", **(headers or {})})
+
+    async def text(self):
+        return self.body or ""
+
+class _Uint8Array(bytes):
+    """A JS Uint8Array as Pyodide hands it to Python"""
+
+    def to_bytes(self) -> bytes:
+        return bytes(self)
+
+def _read_result(chunk):
+    if chunk is None:
+        return SimpleNamespace(done=True, value=None)
+    return SimpleNamespace(done=False, value=_Uint8Array(chunk.encode() if isinstance(chunk, str) else chunk))
+
+class BodyStream:
+    """A request body stream: getReader().read() hands out the chunks in turn"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def getReader(self):
+        return self
+
+    async def read(self):
+        return _read_result(next(self._chunks, None))
+
+class ReadableStream:
+    """Readable side of a TransformStream; holds one chunk, so writers wait for the reader"""
+
+    def __init__(self):
+        self._queue = asyncio.Queue(1)
+
+    def getReader(self):
+        return self
+
+    async def read(self):
+        item = await self._queue.get()
+        if isinstance(item, Exception):
+            raise item
+        return _read_result(item)
+
+class _StreamWriter:
+    def __init__(self, readable: ReadableStream):
+        self._readable = readable
+
+    async def write(self, chunk):
+        await self._readable._queue.put(bytes(chunk))
+
+    async def close(self):
+        await self._readable._queue.put(None)
+
+    async def abort(self, reason):
+        await self._readable._queue.put(RuntimeError(f"stream aborted: {reason}"))
+
+class TransformStream:
+    def __init__(self):
+        self.readable = ReadableStream()
+        self.writable = SimpleNamespace(getWriter=lambda: _StreamWriter(self.readable))
+
+    @classmethod
+    def new(cls):
+        return cls()
+
+class TextEncoder:
+    @classmethod
+    def new(cls):
+        return cls()
+
+    def encode(self, text: str) -> bytes:
+        return text.encode()
+
+async def read_body(res) -> bytes:
+    """Whole body of a worker Response, draining it if it is a stream"""
+    if isinstance(res.body, (str, bytes)):
+        return res.body.encode() if isinstance(res.body, str) else res.body
+    if res.body is None:
+        return b""
+    reader, chunks = res.body.getReader(), []
+    while not (result := await reader.read()).done:
+        chunks.append(result.value.to_bytes())
+    return b"".join(chunks)
+
+class WorkerEntrypoint:
+    def __init__(self, ctx=None, env=None):
+        self.ctx = ctx
+        self.env = env
+
+class ExecutionContext:
+    """Collects waitUntil() tasks so a benchmark can drain them"""
+
+    def __init__(self):
+        self.tasks = []
+
+    def waitUntil(self, task):
+        self.tasks.append(task)
+
+async def _unpatched_pyfetch(url, **kwargs):
+    raise RuntimeError(f"pyfetch called before FakeUpstream.install(): {url}")
+
+def install_runtime():
+    """Register stand-in `workers`, `pyodide.http` and `js` modules"""
+    if "workers" not in sys.modules:
+        workers = types.ModuleType("workers")
+        workers.Response = Response
+        workers.WorkerEntrypoint = WorkerEntrypoint
+        sys.modules["workers"] = workers
+
+    if "pyodide.http" not in sys.modules:
+        pyodide = types.ModuleType("pyodide")
+        http = types.ModuleType("pyodide.http")
+        http.pyfetch = _unpatched_pyfetch
+        pyodide.http = http
+        sys.modules["pyodide"] = pyodide
+        sys.modules["pyodide.http"] = http
+
+    if "js" not in sys.modules:
+        js = types.ModuleType("js")
+        js.TransformStream = TransformStream
+        js.TextEncoder = TextEncoder
+        sys.modules["js"] = js
+
+class Env:
+    """Worker bindings pointing at the fake upstreams"""
+
+    SUPABASE_URL = SUPABASE_URL
+    SUPABASE_SERVICE_KEY = "bench-service-key"
+    JWT_SECRET = "bench-jwt-secret"
+    GITHUB_TOKEN = None
+    GITHUB_API_URL = GITHUB_API_URL
+    # Sampled requests print a JSON log line; keep benchmark output clean by default
+    TRACE_SAMPLE_RATE = "0"
+
+class Headers(dict):
+    """Case-insensitive header lookup like the JS Headers object"""
+
+    def get(self, name, default=None):
+        lowered = name.lower()
+        for key, value in self.items():
+            if key.lower() == lowered:
+                return value
+        return default
+
+# Size of the pieces a raw request body arrives in
+BODY_CHUNK_BYTES = 64 * 1024
+
+class Request:
+    """body is JSON data, raw str/bytes, or any iterable of str/bytes chunks (e.g. a generator)"""
+
+    def __init__(self, method: str, path: str, body=None, headers=None):
+        self.method = method
+        self.url = f"https://robodex.bench/{path}"
+        self.headers = Headers(headers or {})
+        self._body = body
+
+    @property
+    def body(self):
+        raw = self._body
+        if raw is None:
+            return None
+        if isinstance(raw, (dict, list)):
+            raw = json.dumps(raw)
+        if isinstance(raw, str):
+            raw = raw.encode()
+        if isinstance(raw, bytes):
+            raw = [raw[i:i + BODY_CHUNK_BYTES] for i in range(0, len(raw), BODY_CHUNK_BYTES)]
+        return BodyStream(raw)
+
+    async def json(self):
+        return self._body
+
+    async def text(self):
+        return json.dumps(self._body)
+
+# ============================================================================
+# FAKE UPSTREAM
+# ============================================================================
+
+class FetchResponse:
+    """What pyfetch returns: status/ok/headers plus async body readers"""
+
+    def __init__(self, data, status=200, headers=None):
+        self._data = data
+        self.status = status
+        self.ok = 200 <= status < 300
+        self.headers = headers or {}
+        self.raw = "" if data is None else json.dumps(data)
+
+    async def json(self):
+        return json.loads(self.raw) if self.raw else None
+
+    async def text(self):
+        return self.raw
+
+def seed_tables(items=2000, members=200, projects=40, issues=3000, events=200, rng=None) -> dict:
+    """Deterministic data set shaped like the production tables"""
+    rng = rng or random.Random(7)
+    member_rows = [{
+        "member_id": f"m{i:05d}",
+        "name": f"member{i}",
+        "password": "bench",
+        "phone": f"98{i:08d}",
+        "department": rng.choice(["ECE", "CSE", "MECH", "EEE"]),
+        "clearance": 5 if i == 0 else rng.choice([1, 2, 3, 5]),
+    } for i in range(members)]
+    inventory_rows = [{
+        "item_no": f"IT{i:05d}",
+        "name": f"{rng.choice(['Servo', 'Arduino', 'Sensor', 'Motor', 'Battery'])} {i}",
+        "quantity": 50,
+        "available": rng.randint(0, 50),
+        "price": round(rng.uniform(10, 900), 2),
+        "location": f"Rack {rng.randint(1, 20)}",
+    } for i in range(items)]
+    pool_rows = [{
+        "pool_id": f"pl{i:03d}",
+        "name": f"Pool {i}",
+        "description": "Benchmark pool",
+        "managers": [f"m{rng.randrange(members):05d}" for _ in range(3)],
+    } for i in range(max(1, projects // 8))]
+    project_rows = [{
+        "project_id": f"p{i:04d}",
+        "project_name": f"Project {i}",
+        "pool": pool_rows[i % len(pool_rows)]["pool_id"],
+        "github_repo": f"bench/repo{i}",
+        "managers": [f"m{rng.randrange(members):05d}"],
+        "members": [f"m{rng.randrange(members):05d}" for _ in range(8)],
+    } for i in range(projects)]
+    issue_rows = []
+    for i in range(issues):
+        member = "m00000" if i % 10 == 0 else f"m{rng.randrange(members):05d}"
+        issue_rows.append({
+            "id": f"row{i:06d}",
+            "issue_id": f"iss{i // 3:06d}",
+            "item_no": f"IT{rng.randrange(items):05d}",
+            "quantity": rng.randint(1, 4),
+            "member_id": member,
+            "project_id": f"p{rng.randrange(projects):04d}",
+            "issued_date": f"2025-{1 + (i // 3) % 12:02d}-{1 + (i // 3) % 28:02d}T10:00:00+00:00",
+            "return_date": None,
+            "returned": rng.random() < 0.4,
+            "returned_quantity": 0,
+        })
+    event_rows = [{
+        "event_id": f"ev{i:04d}",
+        "event_name": f"Event {i}",
+        "event_description": "Benchmark event",
+        "event_datetime": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}T09:00:00+00:00",
+        "project_id": f"p{i % projects:04d}",
+        "tags": [rng.choice(["build", "review", "demo"])],
+    } for i in range(events)]
+    kanban_rows = [{
+        "column_id": f"col{i}",
+        "column_name": name,
+        "color": "#888",
+        "events": [e["event_id"] for e in event_rows[i::4][:10]],
+    } for i, name in enumerate(["Backlog", "Doing", "Review", "Done"])]
+    return {
+        "members": member_rows,
+        "inventory": inventory_rows,
+        "pool": pool_rows,
+        "projects": project_rows,
+        "issues": issue_rows,
+        "events": event_rows,
+        "kanban": kanban_rows,
+    }
+
+# Embedded resources understood in ?select=..., keyed by the join column
+EMBEDS = {"inventory": "item_no", "members": "member_id", "projects": "project_id"}
+
+def _coerce(value: str):
+    if value == "null":
+        return None
+    if value in ("true", "false"):
+        return value == "true"
+    return value
+
+def _compare(row_value, op: str, raw: str) -> bool:
+    if op == "is":
+        return row_value is _coerce(raw)
+    if op == "in":
+        return str(row_value) in {v.strip('"') for v in raw.strip("()").split(",")}
+    if op in ("like", "ilike"):
+        needle = raw.replace("*", "").replace("%", "")
+        haystack = str(row_value or "")
+        return needle.lower() in haystack.lower() if op == "ilike" else needle in haystack
+    if op == "cs":
+        wanted = json.loads(raw.replace("{", "[").replace("}", "]")) if raw.startswith("{") else [raw]
+        return all(w in (row_value or []) for w in wanted)
+    value = _coerce(raw)
+    if op == "eq":
+        return row_value == value or str(row_value) == str(value)
+    if op == "neq":
+        return str(row_value) != str(value)
+    if row_value is None:
+        return False
+    if isinstance(row_value, (int, float)):
+        value = float(value)
+    return {
+        "gt": row_value > value,
+        "gte": row_value >= value,
+        "lt": row_value < value,
+        "lte": row_value <= value,
+    }[op]
+
+class FakeUpstream:
+    """PostgREST- and GitHub-shaped pyfetch replacement with simulated latency"""
+
+    def __init__(self, tables: dict, latency_ms: float = 20.0, jitter_ms: float = 5.0,
+                 github_latency_ms: float = 120.0, seed: int = 1):
+        self.tables = tables
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.github_latency_ms = github_latency_ms
+        self.rng = random.Random(seed)
+        # "db" / "github" -> "down" (answer 503) or extra latency in ms, to exercise
+        # deadlines and circuit breakers
+        self.faults = {}
+        self.rpcs = {
+            "get_project_items": self._rpc_project_items,
+            "get_project_item_stats": self._rpc_project_item_stats,
+            "get_pool_details": self._rpc_pool_details,
+            "get_members_by_ids": self._rpc_members_by_ids,
+            "search_inventory": self._rpc_search_inventory,
+            "get_inventory_changes": self._rpc_inventory_changes,
+            "get_outstanding_issues": self._rpc_outstanding_issues,
+            "get_events": lambda args: self.tables["events"],
+            "get_event": lambda args: self._find("events", "event_id", args.get("p_event_id")),
+            "get_all_kanban": lambda args: self.tables["kanban"],
+            "get_kanban_by_id": lambda args: self._find("kanban", "column_id", args.get("target_id")),
+            "claim_idempotency_key": self._rpc_claim_idempotency_key,
+            "complete_idempotency_key": self._rpc_complete_idempotency_key,
+        }
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.calls = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.by_host = {}
+
+    def install(self, module):
+        """Point the worker module's pyfetch at this fake, and any module imported after it"""
+        module.pyfetch = self.fetch
+        sys.modules["pyodide.http"].pyfetch = self.fetch
+
+    async def _delay(self, base_ms: float):
+        delay = base_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        await asyncio.sleep(max(0.0, delay) / 1000)
+
+    async def fetch(self, url: str, method: str = "GET", headers=None, body=None, **kwargs):
+        parsed = urlparse(url)
+        self.calls += 1
+        self.by_host[parsed.netloc] = self.by_host.get(parsed.netloc, 0) + 1
+        self.bytes_out += len(body or "")
+
+        upstream = "github" if url.startswith(GITHUB_API_URL) else "db"
+        fault = self.faults.get(upstream)
+        if isinstance(fault, (int, float)):
+            await asyncio.sleep(fault / 1000)
+
+        if fault == "down":
+            await self._delay(self.latency_ms)
+            res = FetchResponse({"message": "upstream unavailable"}, 503)
+        elif upstream == "github":
+            await self._delay(self.github_latency_ms)
+            res = self._github(parsed, headers or {})
+        else:
+            await self._delay(self.latency_ms)
+            res = self._postgrest(method, parsed, headers or {}, json.loads(body) if body else None)
+
+        self.bytes_in += len(res.raw)
+        return res
+
+    # ---- GitHub ----
+    def _github(self, parsed, headers: dict) -> FetchResponse:
+        etag = '"bench-' + str(abs(hash(parsed.path)) % 10 ** 8) + '"'
+        rate = {"x-ratelimit-remaining": "4999", "x-ratelimit-reset": "0"}
+        if headers.get("If-None-Match") == etag:
+            return FetchResponse(None, 304, rate)
+        if parsed.path.endswith("/contributors"):
+            data = [{"login": f"dev{i}", "contributions": 100 - i, "avatar_url": ""} for i in range(10)]
+        elif parsed.path.endswith("/pulls"):
+            data = [{"number": i, "title": f"PR {i}", "state": "open", "user": {"login": "dev"}} for i in range(30)]
+        else:
+            data = [{"number": i, "title": f"Issue {i}", "state": "open", "labels": []} for i in range(60)]
+        return FetchResponse(data, 200, {"etag": etag, **rate})
+
+    # ---- PostgREST ----
+    def _find(self, table: str, key: str, value):
+        return [row for row in self.tables[table] if row.get(key) == value]
+
+    def _rpc_project_items(self, args):
+        totals = {}
+        for row in self.tables["issues"]:
+            if row["project_id"] == args.get("p_project_id") and not row["returned"]:
+                totals[row["item_no"]] = totals.get(row["item_no"], 0) + row["quantity"]
+        items = {row["item_no"]: row for row in self.tables["inventory"]}
+        return [{
+            "item_no": item_no,
+            "item_name": items[item_no]["name"],
+            "total_quantity": qty,
+            "price": items[item_no]["price"],
+        } for item_no, qty in totals.items()]
+
+    def _rpc_project_item_stats(self, args):
+        # Aggregated on the fly here; Postgres reads the maintained table instead
+        totals = {}
+        for row in self.tables["issues"]:
+            if row["project_id"] == args.get("p_project_id"):
+                issued, returned = totals.get(row["item_no"], (0, 0))
+                back = row["quantity"] if row["returned"] else row["returned_quantity"]
+                totals[row["item_no"]] = (issued + row["quantity"], returned + back)
+        items = {row["item_no"]: row for row in self.tables["inventory"]}
+        return [{
+            "item_no": item_no,
+            "item_name": items[item_no]["name"],
+            "total_quantity": issued,
+            "price": str(items[item_no]["price"]),
+            "returned_quantity": returned,
+            "outstanding_quantity": issued - returned,
+            "outstanding_value": round((issued - returned) * items[item_no]["price"], 2),
+        } for item_no, (issued, returned) in totals.items()]
+
+    def _rpc_pool_details(self, args):
+        rows = self._find("pool", "pool_id", args.get("p_pool_id"))
+        if not rows:
+            return None
+        pool = dict(rows[0])
+        pool["managers"] = self._rpc_members_by_ids({"p_member_ids": pool["managers"]})
+        return pool
+
+    def _rpc_members_by_ids(self, args):
+        wanted = set(args.get("p_member_ids") or [])
+        return [
+            {k: row.get(k) for k in ("member_id", "name", "phone", "department", "clearance")}
+            for row in self.tables["members"] if row["member_id"] in wanted
+        ]
+
+    def _rpc_search_inventory(self, args):
+        # Substring match ranked prefix-first; stands in for the pg_trgm RPC
+        query = str(args.get("p_query", "")).strip().lower()
+        hits = [row for row in self.tables["inventory"]
+                if query in row["name"].lower() or query in (row.get("location") or "").lower()]
+        hits.sort(key=lambda row: (not row["name"].lower().startswith(query), row["name"]))
+        return [
+            {k: row.get(k) for k in ("item_no", "name", "quantity", "available", "location")}
+            for row in hits[:int(args.get("p_limit", 20))]
+        ]
+
+    def _rpc_inventory_changes(self, args):
+        # Row position stands in for change_version; there are no deletes
+        rows = self.tables["inventory"]
+        since, limit = int(args.get("p_since", 0)), int(args.get("p_limit", 1000))
+        page = rows[since:since + limit]
+        has_more = since + limit < len(rows)
+        return {
+            "items": [dict(row) for row in page],
+            "deleted": [],
+            "version": since + len(page) if has_more else len(rows),
+            "has_more": has_more,
+            "reset": since > len(rows),
+        }
+
+    def _rpc_outstanding_issues(self, args):
+        now = datetime.now(timezone.utc).isoformat()
+        overdue_only = args.get("p_overdue_only") in (True, "true")
+        group_by = args.get("p_group_by", "member")
+        names = {
+            "member": ("member_id", {r["member_id"]: r["name"] for r in self.tables["members"]}),
+            "project": ("project_id", {r["project_id"]: r["project_name"] for r in self.tables["projects"]}),
+            "item": ("item_no", {r["item_no"]: r["name"] for r in self.tables["inventory"]}),
+        }
+        key, labels = names.get(group_by, names["member"])
+        groups = {}
+        for row in self.tables["issues"]:
+            overdue = row["return_date"] is not None and row["return_date"] < now
+            if row["returned"] or (overdue_only and not overdue):
+                continue
+            group = groups.setdefault(row[key], {
+                "group_id": row[key], "group_name": labels.get(row[key]), "open_issues": 0,
+                "outstanding_quantity": 0, "overdue_issues": 0, "overdue_quantity": 0,
+                "next_return_date": None, "issues": [],
+            })
+            outstanding = row["quantity"] - row["returned_quantity"]
+            group["open_issues"] += 1
+            group["outstanding_quantity"] += outstanding
+            if overdue:
+                group["overdue_issues"] += 1
+                group["overdue_quantity"] += outstanding
+            if row["return_date"] and (group["next_return_date"] is None or row["return_date"] < group["next_return_date"]):
+                group["next_return_date"] = row["return_date"]
+            group["issues"].append({
+                "id": row["id"], "issue_id": row["issue_id"], "item_no": row["item_no"],
+                "item_name": names["item"][1].get(row["item_no"]), "member_id": row["member_id"],
+                "member_name": names["member"][1].get(row["member_id"]), "project_id": row["project_id"],
+                "project_name": names["project"][1].get(row["project_id"]), "quantity": outstanding,
+                "issued_date": row["issued_date"], "return_date": row["return_date"], "overdue": overdue,
+            })
+        for group in groups.values():
+            group["issues"].sort(key=lambda line: (line["return_date"] is None, line["return_date"] or "",
+                                                   line["issued_date"]))
+        return sorted(groups.values(), key=lambda g: (-g["overdue_quantity"], -g["outstanding_quantity"],
+                                                      g["group_name"] or ""))
+
+    def _rpc_claim_idempotency_key(self, args):
+        # No expiry here; rows live for the length of a bench run
+        rows = self.tables.setdefault("idempotency_keys", [])
+        row = next(iter(self._find("idempotency_keys", "scope", args["p_scope"])), None)
+        if row is None:
+            rows.append({"scope": args["p_scope"], "fingerprint": args["p_fingerprint"],
+                         "status": None, "body": None, "headers": None})
+            return None
+        return {k: row[k] for k in ("fingerprint", "status", "body", "headers")}
+
+    def _rpc_complete_idempotency_key(self, args):
+        for row in self._find("idempotency_keys", "scope", args["p_scope"]):
+            row.update(status=args["p_status"], body=args["p_body"], headers=args["p_headers"])
+
+    def _select(self, table: str, rows: list, select: str) -> list:
+        if select in ("", "*"):
+            return [dict(row) for row in rows]
+
+        columns, embeds, depth, current = [], {}, 0, ""
+        for ch in select + ",":
+            if ch == "(":
+                depth += 1
+            elif ch == ")":
+                depth -= 1
+            if ch == "," and depth == 0:
+                if "(" in current:
+                    name, _, inner = current.partition("(")
+                    embeds[name] = inner.rstrip(")").split(",")
+                else:
+                    columns.append(current)
+                current = ""
+            else:
+                current += ch
+
+        indexes = {
+            name: {r.get(EMBEDS[name]): r for r in self.tables[name]}
+            for name in embeds
+        }
+        out = []
+        for row in rows:
+            shaped = dict(row) if "*" in columns else {c: row.get(c) for c in columns}
+            for name, inner in embeds.items():
+                match = indexes[name].get(row.get(EMBEDS[name]))
+                shaped[name] = {c: match.get(c) for c in inner} if match else None
+            out.append(shaped)
+        return out
+
+    def _filter(self, rows: list, params: list) -> list:
+        for key, raw in params:
+            if key in ("select", "order", "limit", "offset", "or", "and"):
+                continue
+            negate = raw.startswith("not.")
+            if negate:
+                raw = raw[4:]
+            op, _, value = raw.partition(".")
+            rows = [row for row in rows if _compare(row.get(key), op, unquote(value)) != negate]
+        return rows
+
+    def _order(self, rows: list, order: str) -> list:
+        for clause in reversed(order.split(",")):
+            column, _, direction = clause.partition(".")
+            rows = sorted(
+                rows,
+                key=lambda row: (row.get(column) is None, row.get(column) or ""),
+                reverse=direction.startswith("desc"),
+            )
+        return rows
+
+    def _postgrest(self, method: str, parsed, headers: dict, body) -> FetchResponse:
+        path = parsed.path.split("/rest/v1/", 1)[1]
+        params = parse_qsl(parsed.query, keep_blank_values=True)
+        query = dict(params)
+
+        if path.startswith("rpc/"):
+            handler = self.rpcs.get(path[4:])
+            # Read-only RPCs may be called over GET with arguments in the query string
+            args = body if method == "POST" else query
+            return FetchResponse(handler(args or {}) if handler else None, 200)
+
+        rows = self.tables.setdefault(path, [])
+        if method == "POST":
+            new_rows = body if isinstance(body, list) else [body]
+            if path == "inventory" and any(not 0 <= r.get("available", 0) <= r.get("quantity", 0) for r in new_rows):
+                return FetchResponse({"code": "23514", "message": 'new row for relation "inventory" violates '
+                                                                  'check constraint "inventory_check"'}, 400)
+            key = query.get("on_conflict")
+            if key and "resolution=merge-duplicates" in headers.get("Prefer", ""):
+                existing = {row.get(key): row for row in rows}
+                for row in new_rows:
+                    if row.get(key) in existing:
+                        existing[row.get(key)].update(row)
+                    else:
+                        rows.append(row)
+                        existing[row.get(key)] = row
+            else:
+                rows.extend(new_rows)
+            return FetchResponse(None, 201)
+
+        matched = self._filter(rows, params)
+        if method == "PATCH":
+            for row in matched:
+                row.update(body or {})
+            return FetchResponse(matched, 200)
+        if method == "DELETE":
+            self.tables[path] = [row for row in rows if row not in matched]
+            return FetchResponse(None, 204)
+
+        if "order" in query:
+            matched = self._order(matched, query["order"])
+        total = len(matched)
+        offset = int(query.get("offset", 0))
+        limit = int(query["limit"]) if "limit" in query else None
+        page = matched[offset:offset + limit if limit is not None else None]
+
+        res_headers = {}
+        if "count=" in headers.get("Prefer", ""):
+            end = offset + len(page) - 1
+            res_headers["content-range"] = f"{offset}-{end}/{total}" if page else f"*/{total}"
+        return FetchResponse(self._select(path, page, query.get("select", "*")), 200, res_headers)
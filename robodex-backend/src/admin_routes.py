@@ -0,0 +1,279 @@
+"""Admin writes (projects, pools, events, kanban), reports, metrics and debug.
+
+Imported by entry.lazy_route on first use; the routes themselves, with their
+clearance and invalidation rules, are registered in entry.py.
+"""
+
+import time
+
+from entry import HTTPError, SupabaseError, METRICS, ISOLATE_STARTED_AT, _breakers
+
+# ---- CREATE PROJECT ----
+async def create_project(ctx):
+    body = await ctx.json()
+
+    await ctx.db.post("rpc/create_project", {
+        "p_name": body["project_name"],
+        "p_pool_id": body["pool"]
+    })
+
+    return {"success": True}
+
+# ---- UPDATE PROJECT (PATCH) ----
+async def update_project(ctx):
+    body = await ctx.json()
+
+    await ctx.db.patch(
+        f"projects?project_id=eq.{ctx.params['project_id']}",
+        body
+    )
+
+    return {"success": True}
+
+# ---- DELETE PROJECT ----
+async def delete_project(ctx):
+    await ctx.db.post("rpc/delete_project", {
+        "p_project_id": ctx.params["project_id"]
+    })
+
+    return {"success": True}
+
+# ---- CREATE POOL ----
+async def create_pool(ctx):
+    body = await ctx.json()
+
+    await ctx.db.post("pool", {
+        "name": body["name"],
+        "description": body.get("description", ""),
+        "managers": body.get("managers", [])
+    })
+
+    return {"success": True}
+
+# ---- UPDATE POOL ----
+async def update_pool(ctx):
+    body = await ctx.json()
+
+    # Build update query
+    update_data = {}
+    if "name" in body:
+        update_data["name"] = body["name"]
+    if "description" in body:
+        update_data["description"] = body["description"]
+    if "managers" in body:
+        update_data["managers"] = body["managers"]
+
+    await ctx.db.patch(
+        f"pool?pool_id=eq.{ctx.params['pool_id']}",
+        update_data
+    )
+
+    return {"success": True}
+
+# ---- DELETE POOL ----
+async def delete_pool(ctx):
+    try:
+        await ctx.db.delete(f"pool?pool_id=eq.{ctx.params['pool_id']}")
+    except SupabaseError:
+        raise HTTPError(500, "Failed to delete pool")
+
+    return {"success": True}
+
+# ---- CREATE EVENT ----
+async def create_event(ctx):
+    body = await ctx.json()
+
+    data = await ctx.db.post("rpc/create_event", {
+        "p_name": body["event_name"],
+        "p_description": body.get("event_description", ""),
+        "p_datetime": body["event_datetime"],
+        "p_project_id": body.get("project_id"),
+        "p_tags": body.get("tags")
+    })
+
+    return await data.json()
+
+# ---- UPDATE EVENT ----
+async def update_event(ctx):
+    body = await ctx.json()
+
+    data = await ctx.db.post("rpc/update_event", {
+        "p_event_id": ctx.params["event_id"],
+        "p_updates": body
+    })
+
+    result = await data.json()
+
+    if result is None:
+        raise HTTPError(404, "Event not found")
+
+    return result
+
+# ---- DELETE EVENT ----
+async def delete_event(ctx):
+    data = await ctx.db.post("rpc/delete_event", {
+        "p_event_id": ctx.params["event_id"]
+    })
+
+    result = await data.json()
+
+    if not result:
+        raise HTTPError(404, "Event not found")
+
+    return {"success": True}
+
+# ---- CREATE/UPDATE KANBAN COLUMN (UPSERT) ----
+async def create_kanban(ctx):
+    body = await ctx.json()
+
+    data = await ctx.db.post("rpc/upsert_kanban", {
+        "payload": body
+    })
+
+    result = await data.json()
+
+    if not result or len(result) == 0:
+        raise HTTPError(500, "Failed to upsert kanban column")
+
+    return result[0]
+
+# ---- UPDATE KANBAN COLUMN (UPSERT with column_id) ----
+async def update_kanban(ctx):
+    body = await ctx.json()
+
+    # Add column_id to the payload for upsert
+    body["column_id"] = ctx.params["column_id"]
+
+    data = await ctx.db.post("rpc/upsert_kanban", {
+        "payload": body
+    })
+
+    result = await data.json()
+
+    if not result or len(result) == 0:
+        raise HTTPError(404, "Kanban column not found")
+
+    return result[0]
+
+# ---- KANBAN CARDS ----
+# Single-card edits. Each body may carry the "version" the client last saw;
+# a stale one answers 409 with the current version (see kanban_lock_column).
+
+def optional_int(body: dict, key: str):
+    value = body.get(key)
+    if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+        raise HTTPError(400, f"{key} must be an integer")
+    return value
+
+async def add_kanban_card(ctx):
+    body = await ctx.json()
+    if not body.get("event_id"):
+        raise HTTPError(400, "event_id is required")
+
+    data = await ctx.db.post("rpc/kanban_add_card", {
+        "p_column_id": ctx.params["column_id"],
+        "p_event_id": body["event_id"],
+        "p_position": optional_int(body, "position"),
+        "p_version": optional_int(body, "version")
+    })
+
+    return await data.json()
+
+async def move_kanban_card(ctx):
+    body = await ctx.json()
+
+    # Without to_column_id the card is reordered within its column
+    data = await ctx.db.post("rpc/kanban_move_card", {
+        "p_from_column_id": ctx.params["column_id"],
+        "p_event_id": ctx.params["event_id"],
+        "p_to_column_id": body.get("to_column_id") or ctx.params["column_id"],
+        "p_position": optional_int(body, "position"),
+        "p_from_version": optional_int(body, "version"),
+        "p_to_version": optional_int(body, "to_version")
+    })
+
+    return await data.json()
+
+async def update_kanban_card(ctx):
+    body = await ctx.json()
+    if not isinstance(body.get("field"), str) or "value" not in body:
+        raise HTTPError(400, "field and value are required")
+
+    data = await ctx.db.post("rpc/kanban_update_card", {
+        "p_column_id": ctx.params["column_id"],
+        "p_event_id": ctx.params["event_id"],
+        "p_field": body["field"],
+        "p_value": body["value"],
+        "p_version": optional_int(body, "version")
+    })
+
+    return await data.json()
+
+async def remove_kanban_card(ctx):
+    version = ctx.query.get("version")
+    if version is not None and not version.isdigit():
+        raise HTTPError(400, "version must be an integer")
+
+    data = await ctx.db.post("rpc/kanban_remove_card", {
+        "p_column_id": ctx.params["column_id"],
+        "p_event_id": ctx.params["event_id"],
+        "p_version": int(version) if version is not None else None
+    })
+
+    return await data.json()
+
+# ---- DELETE KANBAN COLUMN ----
+async def delete_kanban(ctx):
+    data = await ctx.db.post("rpc/delete_kanban", {
+        "target_id": ctx.params["column_id"]
+    })
+
+    result = await data.json()
+
+    if result != "Success":
+        raise HTTPError(500, "Failed to delete kanban column")
+
+    return {"success": True}
+
+# ---- OUTSTANDING ISSUES REPORT ----
+REPORT_GROUPS = ("member", "project", "item")
+
+async def outstanding_report(ctx):
+    group_by = ctx.query.get("group_by", "member")
+    if group_by not in REPORT_GROUPS:
+        raise HTTPError(400, f"group_by must be one of: {', '.join(REPORT_GROUPS)}")
+    overdue = ctx.query.get("overdue", "false")
+    if overdue not in ("true", "false"):
+        raise HTTPError(400, "overdue must be true or false")
+
+    # Aggregated in SQL over the open lines only (idx_issues_open_return_date)
+    groups = await ctx.db.get(
+        f"rpc/get_outstanding_issues?p_group_by={group_by}&p_overdue_only={overdue}"
+    )
+    return {
+        "group_by": group_by,
+        "overdue_only": overdue == "true",
+        "totals": {
+            field: sum(group[field] for group in groups)
+            for field in ("open_issues", "outstanding_quantity", "overdue_issues", "overdue_quantity")
+        },
+        "groups": groups,
+    }
+
+# ---- METRICS ----
+async def metrics(ctx):
+    return {
+        "isolate_uptime": round(time.time() - ISOLATE_STARTED_AT, 1),
+        **METRICS,
+        "circuit_breakers": {name: breaker.snapshot() for name, breaker in _breakers.items()},
+    }
+
+# ---- DEBUG ENDPOINT ----
+async def debug(ctx):
+    return {
+        "full_url": ctx.request.url,
+        "path": ctx.path,
+        "method": ctx.method,
+        "has_payload": ctx.payload is not None,
+        "has_github_token": ctx.github_token is not None
+    }
@@ -0,0 +1,399 @@
+"""Bulk inventory import and CSV / NDJSON exports of inventory and issues.
+
+Imported by entry.lazy_route on first use. Both directions stream: an import
+is parsed line by line off the request body and upserted a chunk at a time,
+and an export is written out a page at a time as PostgREST returns it, so a
+100k-row file costs the same memory as a 1k-row one.
+"""
+
+import asyncio
+import codecs
+import csv
+import io
+import json
+import math
+import time
+from urllib.parse import quote
+
+from entry import HTTPError, SupabaseError, StreamBody, INVENTORY_FIELDS, _deadline, metric_inc, parse_fields
+
+BULK_FORMATS = ("csv", "ndjson")
+BULK_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+# ---- IMPORT ----
+IMPORT_REQUIRED = ("item_no", "name", "quantity", "available")
+IMPORT_COLUMNS = IMPORT_REQUIRED + ("price", "location", "resources")
+# Maintained by the database; accepted and dropped so an export imports back as is
+IMPORT_IGNORED = ("change_version",)
+IMPORT_PATH = "inventory?on_conflict=item_no"
+# Rows per PostgREST bulk upsert; one chunk is in flight while the next is parsed
+IMPORT_CHUNK_ROWS = 500
+# Row errors listed in the summary; the rest are only counted
+IMPORT_MAX_ERRORS = 100
+# A line (or quoted CSV record) longer than this is rejected rather than buffered
+IMPORT_MAX_LINE = 64 * 1024
+# Large files outlast the normal request deadline (seconds)
+IMPORT_DEADLINE = 120
+# PostgREST statuses that blame the rows (constraint violations), not the upstream
+ROW_ERROR_STATUSES = (400, 409)
+
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+def import_format(ctx) -> str:
+    """?format= if given, else the request's Content-Type"""
+    fmt = ctx.query.get("format")
+    if fmt is None:
+        content_type = (ctx.header("Content-Type") or "").partition(";")[0].strip().lower()
+        fmt = IMPORT_CONTENT_TYPES.get(content_type)
+    if fmt not in BULK_FORMATS:
+        raise HTTPError(400, "Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson")
+    return fmt
+
+async def body_lines(request):
+    """Lines of the UTF-8 request body, read off the stream a chunk at a time"""
+    stream = request.body if request is not None else None
+    if stream is None:
+        raise HTTPError(400, "Request body is empty")
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    reader = stream.getReader()
+    pending = ""
+    while True:
+        result = await reader.read()
+        try:
+            text = decoder.decode(b"" if result.done else result.value.to_bytes(), final=result.done)
+        except UnicodeDecodeError:
+            raise HTTPError(400, "Request body must be UTF-8")
+        *lines, pending = (pending + text).split("\n")
+        for line in lines:
+            yield line.removesuffix("\r")
+        if len(pending) > IMPORT_MAX_LINE:
+            raise HTTPError(400, f"Lines longer than {IMPORT_MAX_LINE} characters are not supported")
+        if result.done:
+            break
+    if pending:
+        yield pending.removesuffix("\r")
+
+async def csv_records(lines):
+    """(line number, row dict or None, error) per CSV record; the first record is the header"""
+    header = None
+    record, start, line_no = [], 0, 0
+    async for line in lines:
+        line_no += 1
+        if not record:
+            start = line_no
+        record.append(line)
+        text = "\n".join(record)
+        # An odd number of quotes means a quoted field runs on to the next line
+        if text.count('"') % 2:
+            if len(text) > IMPORT_MAX_LINE:
+                raise HTTPError(400, f"Unterminated quoted field starting on line {start}")
+            continue
+        record = []
+        if not text.strip():
+            continue
+        fields = next(csv.reader([text]))
+
+        if header is None:
+            header = [name.strip() for name in fields]
+            unknown = [name for name in header if name not in IMPORT_COLUMNS + IMPORT_IGNORED]
+            if unknown:
+                raise HTTPError(400, f"Unknown columns: {', '.join(unknown)}")
+            missing = [name for name in IMPORT_REQUIRED if name not in header]
+            if missing:
+                raise HTTPError(400, f"Missing columns: {', '.join(missing)}")
+            if len(set(header)) != len(header):
+                raise HTTPError(400, "Duplicate columns in header")
+            continue
+
+        if len(fields) != len(header):
+            yield start, None, f"Expected {len(header)} fields, got {len(fields)}"
+        else:
+            yield start, dict(zip(header, fields)), None
+
+    if record:
+        raise HTTPError(400, f"Unterminated quoted field starting on line {start}")
+    if header is None:
+        raise HTTPError(400, "CSV header row is missing")
+
+async def ndjson_records(lines):
+    """(line number, row dict or None, error) per non-blank NDJSON line"""
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_no, None, "Invalid JSON"
+            continue
+        if isinstance(row, dict):
+            yield line_no, row, None
+        else:
+            yield line_no, None, "Expected a JSON object"
+
+def parse_count(value, field: str) -> int:
+    if isinstance(value, str) and value.strip().isdecimal():
+        return int(value)
+    if isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+        return value
+    raise ValueError(f"{field} must be a non-negative integer")
+
+def parse_price(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            value = None
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value) and value >= 0:
+        return value
+    raise ValueError("price must be a non-negative number")
+
+def validate_row(raw: dict) -> dict:
+    """Inventory row ready for PostgREST, or ValueError naming the problem
+
+    Optional columns absent from the input are left out, so an upsert keeps
+    their current value; present but empty clears them.
+    """
+    unknown = [key for key in raw if key not in IMPORT_COLUMNS + IMPORT_IGNORED]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    row = {}
+    for field in ("item_no", "name"):
+        value = raw.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"{field} is required")
+        row[field] = value.strip()
+    for field in ("quantity", "available"):
+        row[field] = parse_count(raw.get(field), field)
+    if row["available"] > row["quantity"]:
+        raise ValueError("available cannot exceed quantity")
+    if "price" in raw:
+        row["price"] = parse_price(raw["price"])
+    for field in ("location", "resources"):
+        if field in raw:
+            value = raw[field]
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"{field} must be a string")
+            row[field] = (value or "").strip() or None
+    return row
+
+def upstream_message(e: SupabaseError) -> str:
+    try:
+        body = json.loads(e.message)
+    except ValueError:
+        return e.message
+    if isinstance(body, dict) and body.get("message"):
+        return body["message"]
+    return e.message
+
+class ImportReport:
+    def __init__(self, dry_run: bool):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.upserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line: int, item_no, message: str):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "item_no": item_no, "error": message})
+
+    def summary(self) -> dict:
+        return {
+            "rows": self.rows,
+            "valid": self.rows - self.failed,
+            "upserted": self.upserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "dry_run": self.dry_run,
+        }
+
+class ChunkUploader:
+    """Upserts validated rows IMPORT_CHUNK_ROWS at a time, with one chunk in flight
+
+    A chunk is sent early when the next row repeats an item_no already in it
+    (Postgres rejects a bulk upsert touching one row twice) or brings a
+    different set of columns (PostgREST takes the columns from the rows).
+    """
+
+    def __init__(self, db, report: ImportReport):
+        self.db = db
+        self.report = report
+        self.chunk = []
+        self.item_nos = set()
+        self.columns = None
+        self.inflight = None
+
+    async def add(self, line: int, row: dict):
+        columns = tuple(row)
+        if self.chunk and (len(self.chunk) >= IMPORT_CHUNK_ROWS or columns != self.columns
+                           or row["item_no"] in self.item_nos):
+            await self.flush()
+        self.columns = columns
+        self.chunk.append((line, row))
+        self.item_nos.add(row["item_no"])
+
+    async def flush(self):
+        """Start uploading the current chunk once the previous one has finished"""
+        await self.wait()
+        if self.chunk:
+            chunk, self.chunk, self.item_nos = self.chunk, [], set()
+            self.inflight = asyncio.ensure_future(self.upload(chunk))
+
+    async def wait(self):
+        if self.inflight is not None:
+            task, self.inflight = self.inflight, None
+            await task
+
+    def cancel(self):
+        if self.inflight is not None:
+            self.inflight.cancel()
+            self.inflight = None
+
+    async def upload(self, chunk: list):
+        try:
+            await self.db.upsert(IMPORT_PATH, [row for _, row in chunk])
+        except SupabaseError as e:
+            if e.status not in ROW_ERROR_STATUSES:
+                raise
+            if len(chunk) == 1:
+                line, row = chunk[0]
+                self.report.error(line, row["item_no"], upstream_message(e))
+                return
+            # Halve until the rejected rows are isolated; the rest still go in
+            middle = len(chunk) // 2
+            await self.upload(chunk[:middle])
+            await self.upload(chunk[middle:])
+            return
+        self.report.upserted += len(chunk)
+
+async def import_inventory(ctx):
+    fmt = import_format(ctx)
+    dry_run = ctx.query.get("dry_run") in ("1", "true")
+    _deadline.set(time.monotonic() + IMPORT_DEADLINE)
+
+    report = ImportReport(dry_run)
+    uploader = ChunkUploader(ctx.db, report)
+    parse = csv_records if fmt == "csv" else ndjson_records
+    try:
+        async for line, raw, error in parse(body_lines(ctx.request)):
+            report.rows += 1
+            if error is None:
+                try:
+                    row = validate_row(raw)
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                item_no = raw.get("item_no") if raw else None
+                report.error(line, item_no if isinstance(item_no, str) else None, error)
+            elif not dry_run:
+                await uploader.add(line, row)
+        await uploader.flush()
+        await uploader.wait()
+    finally:
+        uploader.cancel()
+
+    metric_inc("bulk", "imported_rows", report.upserted)
+    return report.summary()
+
+# ---- EXPORT ----
+# Rows per PostgREST GET; the next page is fetched while this one is written out
+EXPORT_PAGE_SIZE = 1000
+ISSUE_EXPORT_FIELDS = ("id", "issue_id", "item_no", "quantity", "member_id", "project_id", "issued_date",
+                       "return_date", "returned", "returned_quantity")
+
+def export_format(ctx) -> str:
+    fmt = ctx.query.get("format", "csv")
+    if fmt not in BULK_FORMATS:
+        raise HTTPError(400, f"format must be one of: {', '.join(BULK_FORMATS)}")
+    return fmt
+
+def export_columns(ctx, allowed: tuple, key: str) -> list:
+    select = parse_fields(ctx.query.get("fields"), allowed, required=(key,))
+    return list(allowed) if select == "*" else select.split(",")
+
+async def keyset_pages(db, path: str, key: str):
+    """Async iterator over the pages of ``path`` in ``key`` order
+
+    The first page is fetched before returning, so an unreachable database is
+    still an error response rather than a stream that breaks off; every later
+    page is fetched while the caller writes out the one before it.
+    """
+    base = f"{path}&order={key}.asc&limit={EXPORT_PAGE_SIZE}"
+    first = await db.get(base)
+
+    async def pages():
+        rows, pending = first, None
+        try:
+            while rows:
+                if len(rows) == EXPORT_PAGE_SIZE:
+                    after = quote(str(rows[-1][key]), safe="")
+                    pending = asyncio.ensure_future(db.get(f"{base}&{key}=gt.{after}"))
+                yield rows
+                if pending is None:
+                    break
+                rows, pending = await pending, None
+        finally:
+            if pending is not None:
+                pending.cancel()
+    return pages()
+
+def csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+async def encode_pages(pages, columns: list, fmt: str):
+    """Text chunks of an export: the CSV header first, then one chunk per page"""
+    if fmt == "ndjson":
+        async for rows in pages:
+            yield "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    async for rows in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([csv_cell(row.get(column)) for column in columns] for row in rows)
+        yield buffer.getvalue()
+
+def export_response(name: str, pages, columns: list, fmt: str) -> StreamBody:
+    metric_inc("bulk", f"{name}_exports")
+    filename = f"{name}-{time.strftime('%Y%m%d', time.gmtime())}.{fmt}"
+    return StreamBody(encode_pages(pages, columns, fmt), BULK_MEDIA_TYPES[fmt], filename)
+
+async def export_inventory(ctx):
+    fmt = export_format(ctx)
+    columns = export_columns(ctx, INVENTORY_FIELDS, "item_no")
+    pages = await keyset_pages(ctx.db, f"inventory?select={','.join(columns)}", "item_no")
+    return export_response("inventory", pages, columns, fmt)
+
+async def export_issues(ctx):
+    fmt = export_format(ctx)
+    columns = export_columns(ctx, ISSUE_EXPORT_FIELDS, "id")
+    path = f"issues?select={','.join(columns)}"
+    for field in ("project_id", "member_id"):
+        if field in ctx.query:
+            path += f"&{field}=eq.{quote(ctx.query[field], safe='')}"
+    returned = ctx.query.get("returned")
+    if returned is not None:
+        if returned not in ("true", "false"):
+            raise HTTPError(400, "returned must be true or false")
+        path += f"&returned=is.{returned}"
+    pages = await keyset_pages(ctx.db, path, "id")
+    return export_response("issues", pages, columns, fmt)
@@ -1,46 +1,128 @@
-import json, time, base64, hmac, hashlib
+import sys, json, time, base64, binascii, hmac, hashlib, asyncio, random, contextvars, importlib
+from collections import OrderedDict
+from operator import itemgetter
 from workers import Response, WorkerEntrypoint
 from pyodide.http import pyfetch
-from urllib.parse import urlparse
+from urllib.parse import urlparse, parse_qsl, quote
 
 def b64url(data: bytes) -> str:
     return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
 
-def sign_jwt(payload: dict, secret: str, exp_seconds=3600):
-    payload["exp"] = int(time.time()) + exp_seconds
-    header = {"alg": "HS256", "typ": "JWT"}
+class TTLCache:
+    """Small per-isolate LRU cache whose entries expire after a TTL"""
 
-    h = b64url(json.dumps(header).encode())
-    p = b64url(json.dumps(payload).encode())
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
 
-    sig = hmac.new(
-        secret.encode(),
-        f"{h}.{p}".encode(),
-        hashlib.sha256
-    ).digest()
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
 
-    return f"{h}.{p}.{b64url(sig)}"
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
 
-def verify_jwt(token: str, secret: str):
-    try:
-        h, p, s = token.split(".")
-    except ValueError:
-        return None
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
 
-    sig = hmac.new(
-        secret.encode(),
-        f"{h}.{p}".encode(),
-        hashlib.sha256
-    ).digest()
+    def clear(self):
+        self._data.clear()
 
-    if b64url(sig) != s:
-        return None
+    def __len__(self):
+        return len(self._data)
 
-    payload = json.loads(base64.urlsafe_b64decode(p + "=="))
-    if payload["exp"] < time.time():
-        return None
+# ---- JWT ----
+JWT_HEADER_SEGMENT = b64url(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+TOKEN_CACHE_MAX = 1024
+_B64_TO_URLSAFE = bytes.maketrans(b"+/", b"-_")
+_URLSAFE_TO_B64 = bytes.maketrans(b"-_", b"+/")
+
+class TokenVerifier:
+    """HS256 signing and verification with the keyed HMAC prepared once per isolate
+
+    Verified payloads are cached by token until their ``exp``, so a client's
+    repeat requests skip the decode and signature check. Treat them as read-only.
+    """
+
+    def __init__(self, secret: str, cache_max: int = TOKEN_CACHE_MAX):
+        self.secret = secret
+        self._prefix = JWT_HEADER_SEGMENT + "."
+        # HMAC-SHA256 (RFC 2104) from two prepared SHA-256 states: copying them
+        # costs about half of copying an hmac object. Every token this worker
+        # issues starts with the same header segment, so the inner state has
+        # already consumed it.
+        key = secret.encode()
+        if len(key) > 64:
+            key = hashlib.sha256(key).digest()
+        key = key.ljust(64, b"\0")
+        self._inner = hashlib.sha256(bytes(b ^ 0x36 for b in key) + self._prefix.encode())
+        self._outer = hashlib.sha256(bytes(b ^ 0x5C for b in key))
+        self._verified = TTLCache(cache_max, 0)
+
+    def _signature(self, payload_segment: str) -> bytes:
+        inner = self._inner.copy()
+        inner.update(payload_segment.encode())
+        outer = self._outer.copy()
+        outer.update(inner.digest())
+        return binascii.b2a_base64(outer.digest(), newline=False).translate(_B64_TO_URLSAFE).rstrip(b"=")
+
+    def sign(self, payload: dict, exp_seconds=3600) -> str:
+        payload["exp"] = int(time.time()) + exp_seconds
+        payload_segment = b64url(json.dumps(payload).encode())
+        return f"{self._prefix}{payload_segment}.{self._signature(payload_segment).decode()}"
+
+    def verify(self, token: str):
+        payload = self._verified.get(token)
+        if payload is not None:
+            return payload
+
+        # Any other header (alg "none", a different algorithm) is rejected here
+        if not token.startswith(self._prefix):
+            return None
+        payload_segment, _, signature = token[len(self._prefix):].partition(".")
+        if "." in signature:
+            return None
+        if not hmac.compare_digest(self._signature(payload_segment), signature.encode()):
+            return None
+
+        try:
+            payload = json.loads(binascii.a2b_base64(payload_segment.encode().translate(_URLSAFE_TO_B64) + b"=="))
+            remaining = payload["exp"] - time.time()
+        except (ValueError, TypeError, KeyError):
+            return None
+        if remaining < 0:
+            return None
+
+        self._verified.set(token, payload, ttl=remaining)
+        return payload
+
+_token_verifier = None
+
+def get_token_verifier(secret: str) -> TokenVerifier:
+    """Return the isolate-wide verifier, rebuilding it if the secret changes"""
+    global _token_verifier
+    if _token_verifier is None or _token_verifier.secret != secret:
+        _token_verifier = TokenVerifier(secret)
+    return _token_verifier
+
+def sign_jwt(payload: dict, secret: str, exp_seconds=3600):
+    return get_token_verifier(secret).sign(payload, exp_seconds)
 
-    return payload
+def verify_jwt(token: str, secret: str):
+    return get_token_verifier(secret).verify(token)
 
 def auth_payload(request, secret: str):
     auth = request.headers.get("Authorization", "")
@@ -48,748 +130,1733 @@ def auth_payload(request, secret: str):
         return None
     return verify_jwt(auth[7:], secret)
 
-async def get_member_clearance(member_id: str, url: str, key: str):
-    """Get member clearance level from Supabase"""
-    res = await sb_get(
-        f"members?member_id=eq.{member_id}&select=clearance",
-        url,
-        key
-    )
+ISOLATE_STARTED_AT = time.time()
+
+# Per-isolate counters and gauges, exposed by GET /metrics
+METRICS = {}
+
+def metric_inc(group: str, name: str, amount: int = 1):
+    counters = METRICS.setdefault(group, {})
+    counters[name] = counters.get(name, 0) + amount
+
+def metric_set(group: str, name: str, value):
+    METRICS.setdefault(group, {})[name] = value
+
+# ---- TRACING ----
+# Fraction of requests that get a full trace (Server-Timing phases plus a log line);
+# override per deployment with the TRACE_SAMPLE_RATE var. 5xx responses are always logged.
+TRACE_SAMPLE_RATE = 0.05
+TRACE_MAX_CALLS = 50
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+
+class Trace:
+    """Phase and upstream timings collected for one sampled request"""
+
+    __slots__ = ("started", "route", "phases", "calls")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.route = None
+        # phase name -> accumulated milliseconds (batch sub-requests add up)
+        self.phases = {}
+        self.calls = []
+
+    def phase(self, name: str, started: float):
+        self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    def upstream(self, target: str, method: str, path: str, status, started: float):
+        if len(self.calls) < TRACE_MAX_CALLS:
+            self.calls.append({
+                "target": target,
+                "method": method,
+                # Query strings can carry credentials (login) so only the resource is kept
+                "path": path.partition("?")[0],
+                "status": status,
+                "ms": round((time.perf_counter() - started) * 1000, 2),
+            })
+
+    def upstream_totals(self) -> dict:
+        totals = {}
+        for call in self.calls:
+            count, ms = totals.get(call["target"], (0, 0.0))
+            totals[call["target"]] = (count + 1, ms + call["ms"])
+        return totals
+
+    def server_timing(self, total_ms: float) -> str:
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.phases.items()]
+        for target, (count, ms) in self.upstream_totals().items():
+            parts.append(f'{target};dur={ms:.1f};desc="calls={count}"')
+        parts.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(parts)
+
+def trace_sample_rate(env) -> float:
+    raw = getattr(env, "TRACE_SAMPLE_RATE", None)
+    if raw is None:
+        return TRACE_SAMPLE_RATE
+    try:
+        return float(raw)
+    except (TypeError, ValueError):
+        return TRACE_SAMPLE_RATE
+
+def current_trace():
+    return _current_trace.get()
+
+def trace_phase(name: str, started: float):
+    """Record time since ``started`` under ``name`` when the request is sampled"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.phase(name, started)
+
+def log_event(level: str, message: str, **fields):
+    """One structured JSON log line (Workers Logs indexes the fields)"""
+    print(json.dumps({"level": level, "message": message, **fields}, default=str))
+
+# ---- DEADLINES ----
+# Wall-clock budget for one request, shared by every upstream call it makes;
+# override per deployment with the REQUEST_DEADLINE var (seconds)
+REQUEST_DEADLINE = 20
+
+# time.monotonic() by which the current request must be done, or None
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+def request_deadline(env) -> float:
+    raw = getattr(env, "REQUEST_DEADLINE", None)
+    if raw is None:
+        return REQUEST_DEADLINE
+    try:
+        return float(raw)
+    except (TypeError, ValueError):
+        return REQUEST_DEADLINE
+
+def upstream_timeout(timeout: float) -> float:
+    """Timeout for one upstream call: timeout, capped by what is left of the request's deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return timeout
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        metric_inc("deadline", "exceeded")
+        raise DeadlineExceeded()
+    return min(timeout, remaining)
+
+# ---- CIRCUIT BREAKERS ----
+BREAKER_FAILURE_THRESHOLD = 5
+# How long an open breaker fails fast before letting a probe through
+BREAKER_RESET_TIMEOUT = 15
+
+class CircuitBreaker:
+    """Per-isolate breaker for one upstream
+
+    Closed until BREAKER_FAILURE_THRESHOLD consecutive failures, then open:
+    calls fail fast with 503 for BREAKER_RESET_TIMEOUT seconds. After that it
+    is half-open and lets one probe through; the probe's outcome closes or
+    re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at = None
+
+    def retry_after(self) -> int:
+        return max(1, int(self.opened_at + self.reset_timeout - time.monotonic() + 0.999))
+
+    def check(self):
+        """Raise UpstreamUnavailable unless a call may go out now"""
+        if self.state == "closed":
+            return
+        now = time.monotonic()
+        if self.state == "open" and now - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self.probe_started_at = None
+        if self.state == "half_open":
+            # A probe that never reported back (cancelled) doesn't block the next one forever
+            if self.probe_started_at is None or now - self.probe_started_at >= self.reset_timeout:
+                self.probe_started_at = now
+                metric_inc("breakers", f"{self.name}_probes")
+                return
+        metric_inc("breakers", f"{self.name}_rejected")
+        raise UpstreamUnavailable(self.name, self.retry_after())
+
+    def success(self):
+        if self.state != "closed":
+            log_event("info", "circuit closed", upstream=self.name)
+        self.state = "closed"
+        self.failures = 0
+        self.probe_started_at = None
+
+    def failure(self):
+        self.failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.probe_started_at = None
+            metric_inc("breakers", f"{self.name}_opened")
+            log_event("warn", "circuit opened", upstream=self.name, failures=self.failures)
+
+    def snapshot(self) -> dict:
+        snapshot = {"state": self.state, "consecutive_failures": self.failures}
+        if self.state != "closed":
+            snapshot["retry_after"] = self.retry_after()
+        return snapshot
+
+_breakers = {name: CircuitBreaker(name) for name in ("db", "github")}
+
+# Clearance, department and phone change outside the worker (SQL, the Supabase
+# dashboard), where nothing can tell this isolate. So a demoted member keeps
+# the old clearance here for at most this many seconds. Writes through a
+# route with invalidates=("members",) take effect on the next request.
+MEMBER_CONTEXT_TTL = 5
+MEMBER_CONTEXT_MAX = 512
+
+# member_id -> ("members" version, {"clearance", "department", "phone"}), shared by every request in this isolate
+_member_context_cache = TTLCache(MEMBER_CONTEXT_MAX, MEMBER_CONTEXT_TTL)
+
+async def get_member_context(db, member_id: str):
+    """Get member clearance, department and phone from Supabase in one query (cached per isolate)"""
+    version = _resource_versions.get("members", 0)
+    cached = _member_context_cache.get(member_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    res = await db.get(f"members?member_id=eq.{member_id}&select=clearance,department,phone")
     if not res or len(res) == 0:
         return None
-    return res[0].get("clearance")
-
-async def get_member_dept(member_id: str, url: str, key: str):
-    """Get member department from Supabase"""
-    res = await sb_get(
-        f"members?member_id=eq.{member_id}&select=department",
-        url,
-        key
-    )
-    if not res or len(res) == 0:
+
+    member = res[0]
+    _member_context_cache.set(member_id, (version, member))
+    return member
+
+# ---- MEMBER DIRECTORY ----
+# The only member columns ever sent to clients (never the password)
+MEMBER_PUBLIC_FIELDS = ("member_id", "name", "phone", "department", "clearance")
+MEMBER_DIRECTORY_TTL = 60
+# An unknown id triggers a reload only if the snapshot is at least this old
+MEMBER_DIRECTORY_MISS_REFRESH = 5
+
+class MemberDirectory:
+    """Per-isolate snapshot of every member's public fields, indexed by member_id"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._records = []
+        self._by_id = {}
+        self._loaded_at = 0.0
+        self._version = None
+
+    def _age(self) -> float:
+        return time.time() - self._loaded_at
+
+    async def _ensure(self, db, force: bool = False):
+        # Writes through this isolate bump the "members" version (see bump_resource)
+        version = _resource_versions.get("members", 0)
+        if not force and self._version == version and self._age() < self.ttl:
+            return
+        # Concurrent reloads share one GET through the client's coalescing
+        rows = await db.get(f"members?select={','.join(MEMBER_PUBLIC_FIELDS)}&order=name.asc")
+        self._records = rows
+        self._by_id = {row["member_id"]: row for row in rows}
+        self._loaded_at = time.time()
+        self._version = version
+        metric_inc("member_directory", "loads")
+        metric_set("member_directory", "size", len(rows))
+
+    async def all(self, db) -> list:
+        await self._ensure(db)
+        return self._records
+
+    async def lookup(self, db, member_ids) -> list:
+        """Public records for the given ids, in request order; unknown ids are skipped"""
+        await self._ensure(db)
+        member_ids = list(dict.fromkeys(member_ids or []))
+        if any(member_id not in self._by_id for member_id in member_ids) \
+                and self._age() >= MEMBER_DIRECTORY_MISS_REFRESH:
+            await self._ensure(db, force=True)
+        by_id = self._by_id
+        return [by_id[member_id] for member_id in member_ids if member_id in by_id]
+
+_member_directory = MemberDirectory(MEMBER_DIRECTORY_TTL)
+
+class SupabaseError(Exception):
+    """Raised when PostgREST answers with a non-2xx status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Supabase error: {status} - {message}")
+        self.status = status
+        self.message = message
+
+    def as_http_error(self):
+        """HTTPError for an exception raised in SQL with a PTnnn SQLSTATE, else None
+
+        PostgREST answers those with status nnn; a JSON object in DETAIL is
+        merged into the error body (e.g. the current version on a 409). A
+        gateway error from an unreachable database becomes a 503.
+        """
+        if self.status in SupabaseClient.UNAVAILABLE_STATUSES:
+            return HTTPError(503, "Database unavailable")
+        try:
+            body = json.loads(self.message)
+        except ValueError:
+            return None
+        code = body.get("code") if isinstance(body, dict) else None
+        if not isinstance(code, str) or not code.startswith("PT") or not code[2:].isdigit():
+            return None
+
+        data = {"error": body.get("message")}
+        try:
+            details = json.loads(body.get("details") or "null")
+        except ValueError:
+            details = None
+        if isinstance(details, dict):
+            data.update(details)
+        return HTTPError(int(code[2:]), body.get("message"), data=data)
+
+class SupabaseClient:
+    """PostgREST client created once per isolate and shared by every request"""
+
+    GET_TIMEOUT = 10
+    WRITE_TIMEOUT = 20
+    GET_RETRIES = 2
+    RETRY_BASE_DELAY = 0.1
+    RETRY_STATUSES = (429, 502, 503, 504)
+    # Statuses that count against the circuit breaker (SQL errors don't)
+    UNAVAILABLE_STATUSES = (502, 503, 504)
+
+    def __init__(self, url: str, key: str):
+        self.url = url
+        self.key = key
+        self.base = f"{url}/rest/v1/"
+        self.headers = {
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Content-Type": "application/json"
+        }
+        self.patch_headers = {**self.headers, "Prefer": "return=representation"}
+        # Bulk insert that updates rows whose on_conflict key already exists
+        self.upsert_headers = {**self.headers, "Prefer": "resolution=merge-duplicates,return=minimal"}
+        self._count_headers = {}
+        # (path, prefer) -> task of the GET currently in flight for it
+        self._inflight = {}
+
+    async def _request(self, method: str, path: str, headers: dict, body=None, timeout: float = None):
+        kwargs = {"method": method, "headers": headers}
+        if body is not None:
+            kwargs["body"] = json.dumps(body)
+        # Deadline first: a request already out of time must not take the
+        # half-open breaker's single probe
+        timeout = upstream_timeout(timeout or self.WRITE_TIMEOUT)
+        breaker = _breakers["db"]
+        breaker.check()
+        try:
+            res = await asyncio.wait_for(pyfetch(self.base + path, **kwargs), timeout)
+        except (asyncio.TimeoutError, OSError):
+            breaker.failure()
+            raise
+        if res.status in self.UNAVAILABLE_STATUSES:
+            breaker.failure()
+        else:
+            breaker.success()
+        return res
+
+    async def _raise_for_status(self, res):
+        if not res.ok:
+            raise SupabaseError(res.status, await res.text())
+        return res
+
+    async def _get_with_retry(self, path: str, headers: dict, timeout: float):
+        attempt = 0
+        while True:
+            try:
+                res = await self._request("GET", path, headers, timeout=timeout or self.GET_TIMEOUT)
+                if res.status in self.RETRY_STATUSES and attempt < self.GET_RETRIES:
+                    raise SupabaseError(res.status, "retryable status")
+                await self._raise_for_status(res)
+                return await res.json(), res.headers
+            except (asyncio.TimeoutError, OSError, SupabaseError) as e:
+                retryable = not isinstance(e, SupabaseError) or e.status in self.RETRY_STATUSES
+                if not retryable or attempt >= self.GET_RETRIES:
+                    raise
+            # Exponential backoff with full jitter so bursts don't retry in lockstep
+            await asyncio.sleep(random.uniform(0, self.RETRY_BASE_DELAY * (2 ** attempt)))
+            attempt += 1
+
+    async def _traced(self, method: str, path: str, awaitable):
+        """Await an upstream call, recording it on the request's trace if sampled"""
+        trace = _current_trace.get()
+        if trace is None:
+            return await awaitable
+        started = time.perf_counter()
+        status = 200
+        try:
+            return await awaitable
+        except (SupabaseError, HTTPError) as e:
+            # HTTPError: rejected by the breaker or deadline before any request
+            status = e.status
+            raise
+        except asyncio.TimeoutError:
+            status = "timeout"
+            raise
+        finally:
+            trace.upstream("db", method, path, status, started)
+
+    async def _coalesced_get(self, path: str, headers: dict, timeout: float):
+        """Identical concurrent GETs share one upstream request"""
+        key = (path, headers.get("Prefer"))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._get_with_retry(path, headers, timeout))
+            self._inflight[key] = task
+
+            def _done(t, key=key):
+                if self._inflight.get(key) is t:
+                    del self._inflight[key]
+            task.add_done_callback(_done)
+
+        # Shield so one caller giving up doesn't cancel the request for the others
+        return await asyncio.shield(task)
+
+    async def get(self, path: str, timeout: float = None):
+        """GET and decode JSON"""
+        data, _ = await self._traced("GET", path, self._coalesced_get(path, self.headers, timeout))
+        return data
+
+    async def get_with_count(self, path: str, count: str = "estimated", timeout: float = None):
+        """GET rows plus the total PostgREST reports in Content-Range (None if unknown)"""
+        headers = self._count_headers.get(count)
+        if headers is None:
+            headers = self._count_headers[count] = {**self.headers, "Prefer": f"count={count}"}
+
+        data, res_headers = await self._traced("GET", path, self._coalesced_get(path, headers, timeout))
+        content_range = res_headers.get("content-range", "")
+        total = content_range.rpartition("/")[2]
+        return data, int(total) if total.isdigit() else None
+
+    async def _write(self, method: str, path: str, headers: dict, body, timeout: float):
+        res = await self._request(method, path, headers, body, timeout)
+        return await self._raise_for_status(res)
+
+    async def post(self, path: str, body, timeout: float = None):
+        return await self._traced("POST", path, self._write("POST", path, self.headers, body, timeout))
+
+    async def upsert(self, path: str, rows: list, timeout: float = None):
+        """POST rows with merge-duplicates; path names the key, e.g. ``inventory?on_conflict=item_no``"""
+        return await self._traced("POST", path, self._write("POST", path, self.upsert_headers, rows, timeout))
+
+    async def patch(self, path: str, body, timeout: float = None):
+        return await self._traced("PATCH", path, self._write("PATCH", path, self.patch_headers, body, timeout))
+
+    async def delete(self, path: str, timeout: float = None):
+        return await self._traced("DELETE", path, self._write("DELETE", path, self.headers, None, timeout))
+
+_supabase = None
+
+def get_supabase(url: str, key: str) -> SupabaseClient:
+    """Return the isolate-wide Supabase client, creating it on first use"""
+    global _supabase
+    if _supabase is None or _supabase.url != url or _supabase.key != key:
+        _supabase = SupabaseClient(url, key)
+    return _supabase
+
+# ============================================================================
+# ROUTING
+# ============================================================================
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, PATCH, OPTIONS, DELETE",
+    "Access-Control-Allow-Headers": "Content-Type, Authorization, If-None-Match, Idempotency-Key",
+    "Access-Control-Expose-Headers": "ETag, X-Next-Cursor, X-Total-Count, X-Cache, Server-Timing, Idempotent-Replayed, Retry-After, Content-Disposition",
+    "Timing-Allow-Origin": "*",
+}
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+class HTTPError(Exception):
+    """Raised by a route handler to answer with an error response
+
+    The response is the plain-text message, or ``data`` as JSON when given.
+    """
+
+    def __init__(self, status: int, message: str, data=None, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.data = data
+        self.headers = headers or {}
+
+class UpstreamUnavailable(HTTPError):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+    def __init__(self, upstream: str, retry_after: int):
+        super().__init__(503, f"{upstream} unavailable", data={
+            "error": "Service temporarily unavailable",
+            "upstream": upstream,
+            "retry_after": retry_after
+        }, headers={"Retry-After": str(retry_after)})
+        self.upstream = upstream
+
+class DeadlineExceeded(HTTPError):
+    """Raised instead of calling an upstream once the request's deadline has passed"""
+
+    def __init__(self):
+        super().__init__(504, "Request deadline exceeded")
+
+_MISSING = object()
+
+class RequestContext:
+    """Per-request state handed to every route handler"""
+
+    def __init__(self, request, env, method: str, path: str, query_string: str = "", body=_MISSING, exec_ctx=None,
+                 request_headers=None):
+        self.request = request
+        # Read by header() instead of request.headers when given, keyed in lower case
+        self.request_headers = request_headers
+        self.env = env
+        self.exec_ctx = exec_ctx
+        self.method = method
+        self.path = path
+        self.query_string = query_string
+        self.params = {}
+        self.payload = None
+        self.member = None
+        # Extra headers merged into the final response
+        self.headers = {}
+        self._body = body
+        self._query = None
+        self._idempotency_key = _MISSING
+
+        self.supabase_url = env.SUPABASE_URL
+        self.supabase_key = env.SUPABASE_SERVICE_KEY
+        self.jwt_secret = env.JWT_SECRET
+        self.github_token = getattr(env, "GITHUB_TOKEN", None)
+        self.github_api_url = getattr(env, "GITHUB_API_URL", None) or GITHUB_API_URL
+
+    @property
+    def query(self) -> dict:
+        if self._query is None:
+            self._query = dict(parse_qsl(self.query_string))
+        return self._query
+
+    @property
+    def idempotency_key(self):
+        if self._idempotency_key is _MISSING:
+            self._idempotency_key = self.header("Idempotency-Key")
+        return self._idempotency_key
+
+    @idempotency_key.setter
+    def idempotency_key(self, value):
+        self._idempotency_key = value
+
+    def defer(self, coro):
+        """Run work after the response is sent, keeping the isolate alive for it"""
+        task = asyncio.ensure_future(coro)
+        task.add_done_callback(self._log_deferred_failure)
+        if self.exec_ctx is not None:
+            try:
+                self.exec_ctx.waitUntil(task)
+            except Exception as e:
+                log_event("error", "waitUntil failed", method=self.method, path=self.path, error=repr(e))
+        return task
+
+    def _log_deferred_failure(self, task):
+        # Nobody awaits a deferred task, so its exception would otherwise go unseen
+        if task.cancelled() or task.exception() is None:
+            return
+        import traceback
+        e = task.exception()
+        log_event("error", "background task failed", method=self.method, path=self.path, error=repr(e),
+                  trace="".join(traceback.format_exception(type(e), e, e.__traceback__)))
+
+    def header(self, name: str, default=None):
+        if self.request_headers is not None:
+            return self.request_headers.get(name.lower(), default)
+        if self.request is None:
+            return default
+        return self.request.headers.get(name, default)
+
+    @property
+    def db(self) -> SupabaseClient:
+        return get_supabase(self.supabase_url, self.supabase_key)
+
+    @property
+    def member_id(self) -> str:
+        return self.payload["member_id"]
+
+    @property
+    def clearance(self):
+        return (self.member or {}).get("clearance")
+
+    async def json(self):
+        if self._body is _MISSING:
+            self._body = await self.request.json()
+        return self._body
+
+class Route:
+    __slots__ = ("method", "pattern", "handler", "clearance", "auth", "etag", "invalidates", "columnar", "idempotent",
+                 "streaming")
+
+    def __init__(self, method: str, pattern: str, handler, clearance, auth: bool, etag=None, invalidates=(),
+                 columnar=False, idempotent=False, streaming=False):
+        self.method = method
+        self.pattern = pattern
+        self.handler = handler
+        # Minimum member clearance; None skips the member lookup entirely
+        self.clearance = clearance
+        self.auth = auth
+        # Resource whose version stamp guards this GET's ETag / body cache
+        self.etag = etag
+        # Resources whose version stamp is bumped once this write has run
+        self.invalidates = invalidates
+        # List GET that can answer in the columnar format (see negotiate_format)
+        self.columnar = columnar
+        # Write that honours an Idempotency-Key header (see idempotency.py)
+        self.idempotent = idempotent
+        # Reads the raw request body or answers with a StreamBody; picks its own
+        # ?format= and cannot run inside /batch
+        self.streaming = streaming
+
+class _RouteNode:
+    __slots__ = ("children", "param_name", "param_child", "routes")
+
+    def __init__(self):
+        self.children = {}
+        self.param_name = None
+        self.param_child = None
+        self.routes = {}
+
+class Router:
+    """Segment trie mapping (method, path) to a Route in O(path segments)"""
+
+    def __init__(self):
+        self._root = _RouteNode()
+
+    def add(self, method: str, pattern: str, handler, clearance=0, auth=True, etag=None, invalidates=(),
+            columnar=False, idempotent=False, streaming=False):
+        node = self._root
+        for segment in pattern.split("/"):
+            if segment.startswith("{") and segment.endswith("}"):
+                name = segment[1:-1]
+                if node.param_child is None:
+                    node.param_child = _RouteNode()
+                    node.param_name = name
+                elif node.param_name != name:
+                    raise ValueError(f"Conflicting parameter names at '{pattern}'")
+                node = node.param_child
+            else:
+                node = node.children.setdefault(segment, _RouteNode())
+
+        if method in node.routes:
+            raise ValueError(f"Duplicate route {method} {pattern}")
+        node.routes[method] = Route(method, pattern, handler, clearance, auth, etag, invalidates, columnar,
+                                    idempotent, streaming)
+
+    def route(self, method: str, pattern: str, clearance=0, auth=True, etag=None, invalidates=(),
+              columnar=False, idempotent=False, streaming=False):
+        def decorator(handler):
+            self.add(method, pattern, handler, clearance, auth, etag, invalidates, columnar, idempotent, streaming)
+            return handler
+        return decorator
+
+    def match(self, method: str, path: str):
+        segments = path.split("/") if path else [""]
+        params = {}
+        node = self._match(self._root, segments, 0, params)
+        if node is None or method not in node.routes:
+            return None, None
+        return node.routes[method], params
+
+    def _match(self, node, segments, index, params):
+        if index == len(segments):
+            return node if node.routes else None
+
+        segment = segments[index]
+        child = node.children.get(segment)
+        if child is not None:
+            found = self._match(child, segments, index + 1, params)
+            if found is not None:
+                return found
+
+        if node.param_child is not None and segment:
+            found = self._match(node.param_child, segments, index + 1, params)
+            if found is not None:
+                params[node.param_name] = segment
+                return found
+
         return None
-    return res[0].get("department")
-
-async def get_member_phone(member_id: str, url: str, key: str):
-    """Get member phone number from Supabase"""
-    res = await sb_get(
-        f"members?member_id=eq.{member_id}&select=phone",
-        url,
-        key
-    )
-    if not res or len(res) == 0:
+
+ROUTER = Router()
+route = ROUTER.route
+
+# ---- LAZY ROUTES ----
+# Rarely hit handlers live in their own modules under src/, compiled and
+# imported on first use rather than on every cold start. Their routes are
+# still registered here, so matching and clearance checks never import them.
+
+def load_module(name: str):
+    """Import a module from src/ on first use, recording how long that took"""
+    module = sys.modules.get(name)
+    if module is None:
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        metric_set("lazy_imports", name, round((time.perf_counter() - started) * 1000, 2))
+        trace_phase("import", started)
+    return module
+
+def lazy_route(method: str, pattern: str, target: str, **options):
+    """Register a route whose handler is "module.function", imported when first called"""
+    module_name, _, name = target.partition(".")
+
+    async def handler(ctx):
+        return await getattr(load_module(module_name), name)(ctx)
+    handler.__name__ = name
+    ROUTER.add(method, pattern, handler, **options)
+
+# ============================================================================
+# RESPONSE FORMATS
+# ============================================================================
+
+# Opt-in compact encoding for list GETs: {"columns": [...], "rows": [[...], ...]}
+# instead of one object per row repeating every key
+COLUMNAR_MEDIA_TYPE = "application/vnd.robodex.columnar+json"
+COLUMNAR_HEADERS = {"Content-Type": COLUMNAR_MEDIA_TYPE}
+RESPONSE_FORMATS = ("json", "columnar")
+
+# Bodies smaller than this are not worth a Content-Encoding
+COMPRESS_MIN_BYTES = 1024
+# Preference order when the client accepts several
+COMPRESS_ENCODINGS = ("br", "gzip")
+
+def negotiate_format(ctx: RequestContext, matched: Route) -> str:
+    """Pick the body format from ?format= or, on columnar routes, the Accept header"""
+    requested = ctx.query.get("format")
+    if requested is not None:
+        if requested not in RESPONSE_FORMATS:
+            raise HTTPError(400, f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+        if requested == "columnar" and not matched.columnar:
+            raise HTTPError(400, "format=columnar is not supported by this endpoint")
+        return requested
+    if matched.columnar and COLUMNAR_MEDIA_TYPE in (ctx.header("Accept") or ""):
+        return "columnar"
+    return "json"
+
+class StreamBody:
+    """Handler result sent as it is produced: text chunks from an async iterator
+
+    dispatch hands the runtime a ReadableStream and keeps feeding it after the
+    response has started, one chunk at a time, so a large export never sits in
+    memory as a whole.
+    """
+
+    def __init__(self, chunks, content_type: str, filename: str = None):
+        self.chunks = chunks
+        self.headers = {"Content-Type": content_type}
+        if filename:
+            self.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    def readable(self, ctx: RequestContext):
+        from js import TextEncoder, TransformStream
+        stream = TransformStream.new()
+        writer = stream.writable.getWriter()
+        encoder = TextEncoder.new()
+
+        # Called once dispatch has reset the request's deadline, so only the
+        # per-call upstream timeouts bound how long the stream may run
+        async def pump():
+            try:
+                async for chunk in self.chunks:
+                    # Resolves once the client has taken the chunk, so a slow
+                    # reader holds the producer back instead of filling memory
+                    await writer.write(encoder.encode(chunk))
+                await writer.close()
+            except Exception as e:
+                metric_inc("streams", "failed")
+                log_event("error", "stream failed", method=ctx.method, path=ctx.path, error=str(e))
+                await writer.abort(str(e))
+
+        ctx.defer(pump())
+        return stream.readable
+
+def to_columnar(rows: list) -> dict:
+    columns = list(rows[0]) if rows else []
+    first = rows[0].keys() if rows else None
+    if any(row.keys() != first for row in rows):
+        # Ragged rows: union of keys, absent values become null
+        columns = list(dict.fromkeys(key for row in rows for key in row))
+        values = [[row.get(column) for column in columns] for row in rows]
+    elif len(columns) == 1:
+        values = [[row[columns[0]]] for row in rows]
+    else:
+        # itemgetter pulls a whole row in one C call; json encodes the tuples as arrays
+        values = list(map(itemgetter(*columns), rows)) if columns else [[] for _ in rows]
+    return {"columns": columns, "rows": values}
+
+def encode_result(result, fmt: str):
+    """Serialize a handler result, returning ``(body, content headers)``"""
+    if fmt == "columnar" and isinstance(result, list) and all(isinstance(row, dict) for row in result):
+        return json.dumps(to_columnar(result), separators=(",", ":")), COLUMNAR_HEADERS
+    return json.dumps(result), JSON_HEADERS
+
+def negotiate_encoding(accept_encoding) -> str:
+    """Best Content-Encoding the client accepts (q > 0), or None"""
+    if not accept_encoding:
         return None
-    return res[0].get("phone")
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    best = None
+    for encoding in COMPRESS_ENCODINGS:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (encoding, q)
+    return best[0] if best else None
+
+def add_vary(headers: dict, value: str):
+    existing = headers.get("Vary")
+    headers["Vary"] = f"{existing}, {value}" if existing else value
+
+# ============================================================================
+# CONDITIONAL RESPONSES (ETag / If-None-Match)
+# ============================================================================
+
+# How long a cached list body may be served without asking Supabase again.
+# Writes handled by this isolate bump the version immediately; this TTL bounds
+# how stale a body can be after a write that went through another isolate.
+LIST_CACHE_TTL = 5
+LIST_CACHE_MAX = 128
+
+# resource -> version stamp, bumped by write routes handled in this isolate
+_resource_versions = {}
+
+# Past LIST_CACHE_TTL a body is only served while the database is unreachable
+LIST_STALE_TTL = 300
+
+# (resource, path, query, format) -> (version, cached_at, etag, body, headers)
+_list_cache = TTLCache(LIST_CACHE_MAX, LIST_STALE_TTL)
+
+def bump_resource(resource: str):
+    _resource_versions[resource] = _resource_versions.get(resource, 0) + 1
+
+def make_etag(body: str) -> str:
+    return '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our strong ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+async def conditional_result(ctx: RequestContext, matched: Route, fmt: str):
+    """Serve a list GET with an ETag, answering 304 when the client is current"""
+    key = (matched.etag, ctx.path, ctx.query_string, fmt)
+    version = _resource_versions.get(matched.etag, 0)
+
+    cached = _list_cache.get(key)
+    if cached is not None and cached[0] == version and time.time() - cached[1] < LIST_CACHE_TTL:
+        _, _, etag, body, extra_headers = cached
+    else:
+        started = time.perf_counter()
+        try:
+            result = await matched.handler(ctx)
+        except (UpstreamUnavailable, DeadlineExceeded, SupabaseError, asyncio.TimeoutError) as e:
+            unreachable = not isinstance(e, SupabaseError) or e.status in SupabaseClient.UNAVAILABLE_STATUSES
+            if cached is None or not unreachable:
+                raise
+            # Last known body beats a 503, even if a write has bumped the version since
+            metric_inc("list_cache", "stale_served")
+            _, _, etag, body, extra_headers = cached
+            result = _MISSING
+        trace_phase("handler", started)
+        if result is _MISSING:
+            extra_headers = {**extra_headers, "X-Cache": "STALE"}
+        else:
+            started = time.perf_counter()
+            body, content_headers = encode_result(result, fmt)
+            etag = make_etag(body)
+            trace_phase("encode", started)
+            extra_headers = {**ctx.headers, **content_headers}
+            _list_cache.set(key, (version, time.time(), etag, body, extra_headers))
 
-async def sb_get(path, url, key):
     headers = {
-        "apikey": key,
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json"
+        **extra_headers,
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
     }
-    res = await pyfetch(f"{url}/rest/v1/{path}", headers=headers)
-    return await res.json()
+    if etag_matches(ctx.header("If-None-Match"), etag):
+        headers.pop("Content-Type", None)
+        return 304, None, headers
 
-async def sb_post(path, body, url, key):
-    headers = {
-        "apikey": key,
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json"
+    return 200, body, headers
+
+async def authorize(ctx: RequestContext, matched: Route):
+    """Verify the JWT and, when the route asks for it, the member's clearance"""
+    if not matched.auth:
+        return
+
+    if ctx.payload is None:
+        started = time.perf_counter()
+        ctx.payload = auth_payload(ctx.request, ctx.jwt_secret)
+        trace_phase("auth", started)
+    if not ctx.payload:
+        raise HTTPError(401, "Unauthorized")
+
+    if matched.clearance is None:
+        return
+
+    if ctx.member is None:
+        started = time.perf_counter()
+        ctx.member = await get_member_context(ctx.db, ctx.member_id) or {}
+        trace_phase("member", started)
+    if ctx.clearance is None or ctx.clearance < matched.clearance:
+        raise HTTPError(401, "Unauthorized: Insufficient clearance")
+
+def error_result(e: HTTPError):
+    if e.data is not None:
+        return e.status, json.dumps(e.data), {**JSON_HEADERS, **e.headers}
+    return e.status, e.message, e.headers
+
+async def run_handler(ctx: RequestContext, matched: Route, fmt: str):
+    """Call the handler and serialize its result; handler errors become error results"""
+    started = time.perf_counter()
+    try:
+        result = await matched.handler(ctx)
+    except HTTPError as e:
+        return error_result(e)
+    except SupabaseError as e:
+        error = e.as_http_error()
+        if error is None:
+            raise
+        return error_result(error)
+    finally:
+        trace_phase("handler", started)
+        for resource in matched.invalidates:
+            bump_resource(resource)
+
+    if isinstance(result, StreamBody):
+        return 200, result, {**ctx.headers, **result.headers}
+    started = time.perf_counter()
+    body, content_headers = encode_result(result, fmt)
+    trace_phase("encode", started)
+    return 200, body, {**ctx.headers, **content_headers}
+
+async def execute(ctx: RequestContext):
+    """Resolve, authorize and run the handler for a request
+
+    Returns ``(status, body, headers)`` with the body already serialized, so the
+    result can become an HTTP response or an entry in a batch reply.
+    """
+    matched, params = ROUTER.match(ctx.method, ctx.path)
+    if matched is None:
+        return 404, json.dumps({
+            "error": "Not Found",
+            "debug": {
+                "path": ctx.path,
+                "method": ctx.method,
+                "url": ctx.request.url if ctx.request is not None else None
+            }
+        }), JSON_HEADERS
+
+    ctx.params = params
+    trace = _current_trace.get()
+    if trace is not None and trace.route is None:
+        trace.route = matched.pattern
+
+    if matched.columnar:
+        add_vary(ctx.headers, "Accept")
+
+    try:
+        await authorize(ctx, matched)
+        fmt = "json" if matched.streaming else negotiate_format(ctx, matched)
+        if matched.etag:
+            return await conditional_result(ctx, matched, fmt)
+        key = ctx.idempotency_key if matched.idempotent else None
+        if key:
+            idempotency = load_module("idempotency")
+            return await idempotency.run_idempotent(ctx, key, lambda: run_handler(ctx, matched, fmt))
+        return await run_handler(ctx, matched, fmt)
+    except HTTPError as e:
+        return error_result(e)
+    except SupabaseError as e:
+        error = e.as_http_error()
+        if error is None:
+            raise
+        return error_result(error)
+    except asyncio.TimeoutError:
+        return error_result(HTTPError(504, "Upstream request timed out"))
+
+async def dispatch(ctx: RequestContext):
+    """Run a request and attach Server-Timing; sampled requests also get a log line"""
+    trace = Trace() if random.random() < trace_sample_rate(ctx.env) else None
+    token = _current_trace.set(trace)
+    deadline_token = _deadline.set(time.monotonic() + request_deadline(ctx.env))
+    started = time.perf_counter()
+    try:
+        status, body, headers = await execute(ctx)
+    except Exception as e:
+        import traceback
+        log_request(ctx, 500, (time.perf_counter() - started) * 1000, trace, error=traceback.format_exc())
+        return Response.json({
+            "error": str(e),
+            "type": type(e).__name__
+        }, status=500, headers=CORS_HEADERS)
+    finally:
+        _deadline.reset(deadline_token)
+        _current_trace.reset(token)
+    total_ms = (time.perf_counter() - started) * 1000
+
+    headers = {**CORS_HEADERS, **headers}
+    if status in (200, 304):
+        add_vary(headers, "Accept-Encoding")
+        encoding = negotiate_encoding(ctx.header("Accept-Encoding"))
+        if encoding and body is not None and (isinstance(body, StreamBody) or len(body) >= COMPRESS_MIN_BYTES):
+            # The Workers runtime compresses the body to match (encodeBody "automatic"),
+            # natively and off the Python heap
+            headers["Content-Encoding"] = encoding
+    if trace is not None:
+        headers["Server-Timing"] = trace.server_timing(total_ms)
+    else:
+        headers["Server-Timing"] = f"total;dur={total_ms:.1f}"
+
+    if trace is not None or status >= 500:
+        log_request(ctx, status, total_ms, trace)
+    if isinstance(body, StreamBody):
+        body = body.readable(ctx)
+    return Response(body, status=status, headers=headers)
+
+def log_request(ctx: RequestContext, status: int, total_ms: float, trace=None, error: str = None):
+    fields = {
+        "method": ctx.method,
+        "path": ctx.path,
+        "status": status,
+        "duration_ms": round(total_ms, 2),
+        "sampled": trace is not None,
+    }
+    if trace is not None:
+        fields["route"] = trace.route
+        fields["phases"] = {name: round(ms, 2) for name, ms in trace.phases.items()}
+        fields["upstream"] = {
+            target: {"count": count, "ms": round(ms, 2)}
+            for target, (count, ms) in trace.upstream_totals().items()
+        }
+        fields["calls"] = trace.calls
+    if error is not None:
+        fields["error"] = error
+    log_event("error" if status >= 500 else "info", "request", **fields)
+
+# ============================================================================
+# ROUTE HANDLERS
+# ============================================================================
+
+# ---- ADMIN WRITES, REPORTS, METRICS AND DEBUG (admin_routes.py) ----
+lazy_route("POST", "projects", "admin_routes.create_project",
+           clearance=5, invalidates=("projects",), idempotent=True)
+lazy_route("PATCH", "projects/{project_id}", "admin_routes.update_project", invalidates=("projects",))
+lazy_route("DELETE", "projects/{project_id}", "admin_routes.delete_project", clearance=5, invalidates=("projects",))
+lazy_route("POST", "pool", "admin_routes.create_pool", clearance=5, invalidates=("pools",), idempotent=True)
+lazy_route("PATCH", "pool/{pool_id}", "admin_routes.update_pool", clearance=5, invalidates=("pools",))
+lazy_route("DELETE", "pool/{pool_id}", "admin_routes.delete_pool", clearance=5, invalidates=("pools",))
+lazy_route("POST", "events", "admin_routes.create_event", clearance=5, invalidates=("events",), idempotent=True)
+lazy_route("PATCH", "events/{event_id}", "admin_routes.update_event", clearance=5, invalidates=("events",))
+lazy_route("DELETE", "events/{event_id}", "admin_routes.delete_event", clearance=5, invalidates=("events",))
+lazy_route("POST", "kanban", "admin_routes.create_kanban", clearance=5, invalidates=("kanban",))
+lazy_route("PATCH", "kanban/{column_id}", "admin_routes.update_kanban", clearance=5, invalidates=("kanban",))
+lazy_route("DELETE", "kanban/{column_id}", "admin_routes.delete_kanban", clearance=5, invalidates=("kanban",))
+lazy_route("POST", "kanban/{column_id}/cards", "admin_routes.add_kanban_card",
+           clearance=5, invalidates=("kanban",))
+lazy_route("POST", "kanban/{column_id}/cards/{event_id}/move", "admin_routes.move_kanban_card",
+           clearance=5, invalidates=("kanban", "events"))
+lazy_route("PATCH", "kanban/{column_id}/cards/{event_id}", "admin_routes.update_kanban_card",
+           clearance=5, invalidates=("events",))
+lazy_route("DELETE", "kanban/{column_id}/cards/{event_id}", "admin_routes.remove_kanban_card",
+           clearance=5, invalidates=("kanban",))
+lazy_route("GET", "reports/outstanding", "admin_routes.outstanding_report", clearance=5)
+lazy_route("GET", "metrics", "admin_routes.metrics", clearance=5)
+lazy_route("GET", "debug", "admin_routes.debug", clearance=None)
+
+# ---- GITHUB PROXY (github_routes.py) ----
+GITHUB_API_URL = "https://api.github.com"
+
+lazy_route("GET", "github/{owner}/{repo}", "github_routes.github_issues")
+lazy_route("GET", "github/{owner}/{repo}/pulls", "github_routes.github_pulls")
+lazy_route("GET", "github/{owner}/{repo}/contributors", "github_routes.github_contributors")
+
+# ---- BULK IMPORT / EXPORT (bulk_routes.py) ----
+lazy_route("POST", "registry/import", "bulk_routes.import_inventory", clearance=5, invalidates=("inventory",),
+           streaming=True)
+lazy_route("GET", "registry/export", "bulk_routes.export_inventory", streaming=True)
+lazy_route("GET", "issues/export", "bulk_routes.export_issues", clearance=5, streaming=True)
+
+# ---- LOGIN ----
+@route("POST", "login", auth=False)
+async def login(ctx):
+    body = await ctx.json()
+
+    res = await ctx.db.get(
+        f"members?name=eq.{body['name']}&password=eq.{body['password']}&select=member_id,name"
+    )
+
+    if not res:
+        raise HTTPError(401, "Unauthorized")
+
+    # Copy: the row may be shared with a coalesced concurrent request
+    token = sign_jwt(dict(res[0]), ctx.jwt_secret)
+    return {"token": token}
+
+# ---- ME ENDPOINT ----
+@route("GET", "me")
+async def me(ctx):
+    return {
+        "member_id": ctx.payload["member_id"],
+        "name": ctx.payload["name"],
+        "department": ctx.member.get("department"),
+        "phone": ctx.member.get("phone"),
+        "clearance": ctx.clearance,
     }
-    res = await pyfetch(
-        f"{url}/rest/v1/{path}",
-        method="POST",
-        headers=headers,
-        body=json.dumps(body)
+
+# ---- UPDATE PASSWORD ----
+@route("POST", "update-password", invalidates=("members",))
+async def update_password(ctx):
+    body = await ctx.json()
+
+    # Verify current password
+    login_res = await ctx.db.get(
+        f"members?name=eq.{ctx.payload['name']}&password=eq.{body['current_password']}&select=member_id,name"
     )
-    
-    if not res.ok:
-        error_text = await res.text()
-        raise Exception(f"Supabase error: {res.status} - {error_text}")
-    
-    return res
-
-async def sb_patch(path, body, url, key):
-    """PATCH method for updating Supabase records"""
-    headers = {
-        "apikey": key,
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json",
-        "Prefer": "return=representation"
+
+    if not login_res:
+        raise HTTPError(401, "Current password is incorrect")
+
+    # Update password
+    await ctx.db.post("rpc/update_member_password", {
+        "p_member_id": ctx.member_id,
+        "p_new_password": body["new_password"]
+    })
+
+    # Generate new JWT
+    new_token = sign_jwt(dict(login_res[0]), ctx.jwt_secret)
+
+    return {
+        "success": True,
+        "token": new_token
+    }
+
+# ---- INVENTORY ----
+INVENTORY_FIELDS = ("item_no", "name", "quantity", "available", "price", "location", "resources", "change_version")
+REGISTRY_DEFAULT_LIMIT = 100
+REGISTRY_MAX_LIMIT = 500
+# Query parameters the worker interprets itself instead of forwarding to PostgREST
+# (select is always built from fields)
+REGISTRY_RESERVED_PARAMS = ("limit", "cursor", "fields", "format", "select")
+# PostgREST parameters that would reorder or skip rows under keyset pagination
+REGISTRY_KEYSET_CONFLICTS = ("order", "offset")
+
+def encode_cursor(value: dict) -> str:
+    return b64url(json.dumps(value, separators=(",", ":")).encode())
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPError(400, "Invalid cursor")
+    if not isinstance(value, dict):
+        raise HTTPError(400, "Invalid cursor")
+    return value
+
+# Longest id a keyset cursor may carry (UUIDs are 36)
+CURSOR_ID_MAX_LENGTH = 64
+
+def decode_keyset_cursor(cursor: str) -> tuple:
+    """(timestamp, id) from a {"d", "i"} cursor, checked before it is spliced into an or= filter"""
+    from datetime import datetime
+    value = decode_cursor(cursor)
+    timestamp, key = value.get("d"), value.get("i")
+    # Ids are UUIDs: letters, digits and dashes only, nothing PostgREST treats as syntax
+    if not isinstance(timestamp, str) or not isinstance(key, str) or len(key) > CURSOR_ID_MAX_LENGTH \
+            or not key.isascii() or not key.replace("-", "").isalnum():
+        raise HTTPError(400, "Invalid cursor")
+    try:
+        return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).isoformat(), key
+    except ValueError:
+        raise HTTPError(400, "Invalid cursor")
+
+def parse_limit(raw, default: int, maximum: int) -> int:
+    if raw is None:
+        return default
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise HTTPError(400, "limit must be an integer")
+    if limit < 1:
+        raise HTTPError(400, "limit must be positive")
+    return min(limit, maximum)
+
+def parse_fields(raw, allowed: tuple, required: tuple = ()) -> str:
+    """Validate a comma separated fields= projection into a PostgREST select list"""
+    if not raw:
+        return "*"
+    fields = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise HTTPError(400, f"Unknown fields: {', '.join(unknown)}")
+    for field in required:
+        if field not in fields:
+            fields.insert(0, field)
+    return ",".join(fields)
+
+@route("GET", "registry", etag="inventory", columnar=True)
+async def registry(ctx):
+    # Forward remaining query string filters (e.g. item_no=eq.X) to PostgREST
+    filters = "&".join(
+        f"{k}={quote(v, safe=',.()*:')}"
+        for k, v in parse_qsl(ctx.query_string)
+        if k not in REGISTRY_RESERVED_PARAMS
+    )
+    query_params = f"&{filters}" if filters else ""
+
+    paginated = "limit" in ctx.query or "cursor" in ctx.query
+    if not paginated:
+        select = parse_fields(ctx.query.get("fields"), INVENTORY_FIELDS)
+        return await ctx.db.get(f"inventory?select={select}{query_params}")
+
+    # Keyset pagination on item_no: cost per page stays flat however deep the client pages
+    conflicts = [k for k in REGISTRY_KEYSET_CONFLICTS if k in ctx.query]
+    if conflicts:
+        raise HTTPError(400, f"{', '.join(conflicts)} cannot be combined with limit or cursor")
+    select = parse_fields(ctx.query.get("fields"), INVENTORY_FIELDS, required=("item_no",))
+    limit = parse_limit(ctx.query.get("limit"), REGISTRY_DEFAULT_LIMIT, REGISTRY_MAX_LIMIT)
+    path = f"inventory?select={select}{query_params}&order=item_no.asc&limit={limit}"
+    if "cursor" in ctx.query:
+        after = decode_cursor(ctx.query["cursor"]).get("after")
+        if not isinstance(after, str):
+            raise HTTPError(400, "Invalid cursor")
+        rows = await ctx.db.get(f"{path}&item_no=gt.{quote(after, safe='')}")
+    else:
+        # Total only on the first page; later pages would count just the remainder
+        rows, total = await ctx.db.get_with_count(path)
+        if total is not None:
+            ctx.headers["X-Total-Count"] = str(total)
+    if len(rows) == limit:
+        ctx.headers["X-Next-Cursor"] = encode_cursor({"after": rows[-1]["item_no"]})
+    return rows
+
+# ---- INVENTORY CHANGES ----
+CHANGES_DEFAULT_LIMIT = 1000
+CHANGES_MAX_LIMIT = 5000
+
+@route("GET", "registry/changes", etag="inventory")
+async def registry_changes(ctx):
+    """Rows changed and item_nos deleted since a client's last seen change_version"""
+    try:
+        since = int(ctx.query.get("since", "0"))
+    except ValueError:
+        raise HTTPError(400, "since must be an integer")
+    if since < 0:
+        raise HTTPError(400, "since must not be negative")
+    limit = parse_limit(ctx.query.get("limit"), CHANGES_DEFAULT_LIMIT, CHANGES_MAX_LIMIT)
+
+    return await ctx.db.get(f"rpc/get_inventory_changes?p_since={since}&p_limit={limit}")
+
+# ---- INVENTORY SEARCH ----
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 50
+SEARCH_MAX_QUERY_LENGTH = 100
+
+@route("GET", "registry/search", etag="inventory")
+async def search_registry(ctx):
+    query = ctx.query.get("q", "").strip()
+    if not query:
+        raise HTTPError(400, "q is required")
+    if len(query) > SEARCH_MAX_QUERY_LENGTH:
+        raise HTTPError(400, f"q must be at most {SEARCH_MAX_QUERY_LENGTH} characters")
+    limit = parse_limit(ctx.query.get("limit"), SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT)
+
+    # search_inventory is STABLE, so PostgREST serves it over GET (coalesced, retried)
+    return await ctx.db.get(
+        f"rpc/search_inventory?p_query={quote(query, safe='')}&p_limit={limit}"
+    )
+
+# ---- PROJECTS LIST ----
+@route("GET", "projects", etag="projects")
+async def list_projects(ctx):
+    return await ctx.db.get("projects?select=*")
+
+# ---- GET PROJECT DETAILS ----
+@route("GET", "projects/{project_id}")
+async def get_project(ctx):
+    project = await ctx.db.get(f"projects?project_id=eq.{ctx.params['project_id']}&select=*")
+
+    if not project or len(project) == 0:
+        raise HTTPError(404, "Project not found")
+
+    return project[0]
+
+# ---- GET PROJECT ANALYTICS ----
+@route("GET", "projects/{project_id}/analytics")
+async def project_analytics(ctx):
+    # Reads the trigger-maintained project_item_stats rows (see supabase.sql)
+    return await ctx.db.get(
+        f"rpc/get_project_item_stats?p_project_id={quote(ctx.params['project_id'], safe='')}"
+    )
+
+# ---- PROJECT DASHBOARD ----
+# Per-source budget; a slow source is reported in "errors" instead of holding up the page
+DASHBOARD_PART_TIMEOUT = 4
+
+async def dashboard_part(name: str, coro, errors: dict):
+    try:
+        return await asyncio.wait_for(coro, DASHBOARD_PART_TIMEOUT)
+    except asyncio.TimeoutError:
+        errors[name] = "timeout"
+    except HTTPError as e:
+        errors[name] = e.message
+    except Exception as e:
+        errors[name] = str(e)
+    return None
+
+async def fetch_members_by_ids(ctx, member_ids: list):
+    return await _member_directory.lookup(ctx.db, member_ids)
+
+@route("GET", "projects/{project_id}/dashboard")
+async def project_dashboard(ctx):
+    errors = {}
+
+    # Phase 1: the project row (everything else hangs off it) alongside analytics
+    project, analytics = await asyncio.gather(
+        dashboard_part("project", get_project(ctx), errors),
+        dashboard_part("analytics", project_analytics(ctx), errors),
+    )
+    if project is None:
+        if errors.get("project") == "Project not found":
+            raise HTTPError(404, "Project not found")
+        raise HTTPError(504, f"Failed to load project: {errors.get('project')}")
+
+    # Phase 2: pool, people and GitHub, all at once
+    parts = {}
+    if project.get("pool"):
+        parts["pool"] = fetch_pool_details(ctx, project["pool"])
+    member_ids = list(dict.fromkeys((project.get("managers") or []) + (project.get("members") or [])))
+    if member_ids:
+        parts["members"] = fetch_members_by_ids(ctx, member_ids)
+    repo = project.get("github_repo")
+    github = load_module("github_routes") if repo else None
+    if repo:
+        for resource in github.GITHUB_RESOURCES:
+            parts[f"github.{resource}"] = github.fetch_github_resource(ctx, repo, resource)
+
+    results = await asyncio.gather(*(dashboard_part(name, coro, errors) for name, coro in parts.items()))
+    loaded = dict(zip(parts, results))
+
+    return {
+        "project": project,
+        "analytics": analytics,
+        "pool": loaded.get("pool"),
+        "members": loaded.get("members") or [],
+        "github": {
+            resource: loaded.get(f"github.{resource}")
+            for resource in github.GITHUB_RESOURCES
+        } if repo else None,
+        "errors": errors,
     }
-    res = await pyfetch(
-        f"{url}/rest/v1/{path}",
-        method="PATCH",
-        headers=headers,
-        body=json.dumps(body)
+
+# ---- ISSUE ITEMS ----
+@route("POST", "issue", invalidates=("inventory",), idempotent=True)
+async def issue_items(ctx):
+    body = await ctx.json()
+    await ctx.db.post("rpc/issue_items", {
+        "p_member_id": ctx.member_id,
+        "p_project_id": body["project_id"],
+        "p_items": body["items"],
+        "p_return_date": body.get("return_date")
+    })
+    return {"success": True}
+
+# ---- MY ISSUES ----
+# Issue lines with the inventory fields the issues page needs, embedded by PostgREST
+MY_ISSUES_SELECT = (
+    "id,issue_id,item_no,quantity,project_id,issued_date,return_date,returned,returned_quantity,"
+    "inventory(name,location,price)"
+)
+MY_ISSUES_ORDER = "issued_date.desc,issue_id.desc,id.asc"
+MY_ISSUES_MAX_LIMIT = 500
+MY_ISSUES_STATUS_FILTERS = {
+    "all": "",
+    "open": "&returned=eq.false",
+    "closed": "&returned=eq.true",
+}
+
+def group_issue_rows(rows: list) -> list:
+    """Fold issue lines (with embedded inventory) into one entry per issue_id"""
+    groups = {}
+    for row in rows:
+        group = groups.get(row["issue_id"])
+        if group is None:
+            group = groups[row["issue_id"]] = {
+                "issue_id": row["issue_id"],
+                "project_id": row["project_id"],
+                "issued_date": row["issued_date"],
+                "return_date": row["return_date"],
+                "returned": True,
+                "items": [],
+            }
+        item = row.get("inventory") or {}
+        group["returned"] = group["returned"] and bool(row["returned"])
+        group["items"].append({
+            "id": row["id"],
+            "item_no": row["item_no"],
+            "quantity": row["quantity"],
+            "returned_quantity": row["returned_quantity"],
+            "returned": row["returned"],
+            "name": item.get("name"),
+            "location": item.get("location"),
+            "price": item.get("price"),
+        })
+    return list(groups.values())
+
+@route("GET", "my-issues", columnar=True)
+async def my_issues(ctx):
+    if ctx.query.get("view") != "grouped":
+        return await ctx.db.get(f"issues?member_id=eq.{ctx.member_id}&select=*")
+
+    status = ctx.query.get("status", "all")
+    if status not in MY_ISSUES_STATUS_FILTERS:
+        raise HTTPError(400, "status must be one of: all, open, closed")
+    base = f"issues?member_id=eq.{ctx.member_id}{MY_ISSUES_STATUS_FILTERS[status]}&select={MY_ISSUES_SELECT}"
+
+    if "limit" not in ctx.query and "cursor" not in ctx.query:
+        return group_issue_rows(await ctx.db.get(f"{base}&order={MY_ISSUES_ORDER}"))
+
+    # Keyset pagination on (issued_date, issue_id); the limit counts issue lines
+    limit = parse_limit(ctx.query.get("limit"), MY_ISSUES_MAX_LIMIT, MY_ISSUES_MAX_LIMIT)
+    path = f"{base}&order={MY_ISSUES_ORDER}&limit={limit}"
+    if "cursor" in ctx.query:
+        before_date, before_issue = decode_keyset_cursor(ctx.query["cursor"])
+        keyset = f'(issued_date.lt."{before_date}",and(issued_date.eq."{before_date}",issue_id.lt.{before_issue}))'
+        path += "&or=" + quote(keyset, safe='(),."')
+
+    rows = await ctx.db.get(path)
+    groups = group_issue_rows(rows)
+    if len(rows) < limit:
+        return groups
+
+    if len(groups) > 1:
+        # The last issue may continue past this page; leave it for the next one
+        groups.pop()
+    else:
+        # One issue filled the whole page: fetch the rest of its lines
+        rest = await ctx.db.get(
+            f"issues?member_id=eq.{ctx.member_id}&issue_id=eq.{groups[0]['issue_id']}"
+            f"{MY_ISSUES_STATUS_FILTERS[status]}&select={MY_ISSUES_SELECT}&order=id.asc&offset={len(rows)}"
+        )
+        if rest:
+            extra = group_issue_rows(rest)[0]
+            groups[0]["items"].extend(extra["items"])
+            groups[0]["returned"] = groups[0]["returned"] and extra["returned"]
+
+    last = groups[-1]
+    ctx.headers["X-Next-Cursor"] = encode_cursor({"d": last["issued_date"], "i": last["issue_id"]})
+    return groups
+
+# ---- FULL RETURN ----
+@route("POST", "full", invalidates=("inventory",), idempotent=True)
+async def full_return(ctx):
+    body = await ctx.json()
+    await ctx.db.post("rpc/return_issue", {
+        "p_issue_id": body["issue_id"]
+    })
+    return {"success": True}
+
+# ---- PARTIAL RETURN ----
+@route("POST", "partial", invalidates=("inventory",), idempotent=True)
+async def partial_return(ctx):
+    body = await ctx.json()
+    await ctx.db.post("rpc/return_items", {
+        "p_issue_id": body["issue_id"],
+        "p_items": body["items"]
+    })
+    return {"success": True}
+
+# ---- MEMBERS ----
+@route("GET", "members", clearance=None, etag="members", columnar=True)
+async def list_members(ctx):
+    return await _member_directory.all(ctx.db)
+
+# Longer than any member id; keeps junk out of the directory lookup
+MEMBER_ID_MAX_LENGTH = 64
+
+@route("POST", "members/batch")
+async def members_batch(ctx):
+    body = await ctx.json()
+    if not isinstance(body, dict):
+        raise HTTPError(400, "Expected a JSON object")
+    # "member_id" is what older frontends send
+    member_ids = body.get("member_ids", body.get("member_id", []))
+    if not isinstance(member_ids, list):
+        raise HTTPError(400, "member_ids must be an array")
+    if not all(isinstance(m, str) and len(m) <= MEMBER_ID_MAX_LENGTH for m in member_ids):
+        raise HTTPError(400, f"member_ids must be strings of at most {MEMBER_ID_MAX_LENGTH} characters")
+
+    return await _member_directory.lookup(ctx.db, member_ids)
+
+# ---- GET ALL POOLS ----
+@route("GET", "pools", etag="pools")
+async def list_pools(ctx):
+    return await ctx.db.get("pool?select=*")
+
+# ---- GET POOL DETAILS ----
+async def fetch_pool_details(ctx, pool_id: str):
+    """Pool row with managers expanded to {member_id, name} from the member directory"""
+    rows = await ctx.db.get(
+        f"pool?pool_id=eq.{quote(pool_id, safe='')}&select=pool_id,name,description,managers,created_at"
+    )
+    if not rows:
+        return None
+
+    pool = dict(rows[0])
+    managers = await _member_directory.lookup(ctx.db, pool.get("managers") or [])
+    pool["managers"] = [{"member_id": m["member_id"], "name": m["name"]} for m in managers]
+    return pool
+
+@route("GET", "pool/{pool_id}")
+async def get_pool(ctx):
+    result = await fetch_pool_details(ctx, ctx.params["pool_id"])
+
+    if result is None:
+        raise HTTPError(404, "Pool not found")
+
+    return result
+
+# ---- GET ALL EVENTS ----
+EVENTS_DEFAULT_LIMIT = 500
+EVENTS_MAX_LIMIT = 1000
+EVENTS_ORDER = "event_datetime.asc,event_id.asc"
+# Query parameters that switch /events from the legacy full dump to a windowed query
+EVENTS_WINDOW_PARAMS = ("from", "to", "project_id", "tag", "limit", "cursor")
+
+def parse_timestamp(raw: str, name: str) -> str:
+    """Validate an ISO 8601 timestamp query parameter and return it normalized"""
+    from datetime import datetime
+    try:
+        return datetime.fromisoformat(raw.replace("Z", "+00:00")).isoformat()
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an ISO 8601 timestamp")
+
+@route("GET", "events", etag="events", columnar=True)
+async def list_events(ctx):
+    if not any(param in ctx.query for param in EVENTS_WINDOW_PARAMS):
+        data = await ctx.db.post("rpc/get_events", {})
+        result = await data.json()
+        return result if result else []
+
+    # Range scan on idx_events_datetime (or idx_events_project_datetime / idx_events_tags)
+    filters = []
+    if "from" in ctx.query:
+        start = parse_timestamp(ctx.query["from"], "from")
+        filters.append(f"event_datetime=gte.{quote(start, safe='')}")
+    if "to" in ctx.query:
+        end = parse_timestamp(ctx.query["to"], "to")
+        filters.append(f"event_datetime=lt.{quote(end, safe='')}")
+    if "project_id" in ctx.query:
+        filters.append(f"project_id=eq.{quote(ctx.query['project_id'], safe='')}")
+    if "tag" in ctx.query:
+        filters.append("tags=cs." + quote("{" + json.dumps(ctx.query["tag"]) + "}", safe=""))
+
+    limit = parse_limit(ctx.query.get("limit"), EVENTS_DEFAULT_LIMIT, EVENTS_MAX_LIMIT)
+    path = "events?" + "&".join(["select=*", *filters, f"order={EVENTS_ORDER}", f"limit={limit}"])
+    if "cursor" in ctx.query:
+        # Keyset on (event_datetime, event_id), matching EVENTS_ORDER
+        after_date, after_id = decode_keyset_cursor(ctx.query["cursor"])
+        keyset = f'(event_datetime.gt."{after_date}",and(event_datetime.eq."{after_date}",event_id.gt.{after_id}))'
+        path += "&or=" + quote(keyset, safe='(),."')
+
+    rows = await ctx.db.get(path)
+    if len(rows) == limit:
+        last = rows[-1]
+        ctx.headers["X-Next-Cursor"] = encode_cursor({"d": last["event_datetime"], "i": last["event_id"]})
+    return rows
+
+# ---- GET SINGLE EVENT ----
+@route("GET", "events/{event_id}")
+async def get_event(ctx):
+    data = await ctx.db.post("rpc/get_event", {
+        "p_event_id": ctx.params["event_id"]
+    })
+
+    result = await data.json()
+
+    if result is None:
+        raise HTTPError(404, "Event not found")
+
+    return result
+
+# ---- GET ALL KANBAN COLUMNS ----
+@route("GET", "kanban", etag="kanban")
+async def list_kanban(ctx):
+    data = await ctx.db.post("rpc/get_all_kanban", {})
+    result = await data.json()
+    return result if result else []
+
+# ---- GET SINGLE KANBAN COLUMN ----
+@route("GET", "kanban/{column_id}")
+async def get_kanban(ctx):
+    data = await ctx.db.post("rpc/get_kanban_by_id", {
+        "target_id": ctx.params["column_id"]
+    })
+
+    result = await data.json()
+
+    if not result or len(result) == 0:
+        raise HTTPError(404, "Kanban column not found")
+
+    return result[0]
+
+# ---- BATCH ----
+BATCH_MAX_REQUESTS = 20
+
+def batch_target(item: dict) -> tuple:
+    """(method, path, query string) of a batch entry"""
+    path, _, query_string = str(item.get("path", "")).strip("/").partition("?")
+    return str(item.get("method", "GET")).upper(), path, query_string
+
+def batch_needs_member(items: list) -> bool:
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        method, path, _ = batch_target(item)
+        matched, _ = ROUTER.match(method, path)
+        if matched is not None and matched.auth and matched.clearance is not None:
+            return True
+    return False
+
+def batch_context(ctx, item: dict) -> RequestContext:
+    """Sub-request context sharing the batch's verified token and member"""
+    method, path, query_string = batch_target(item)
+    sub = RequestContext(
+        ctx.request,
+        ctx.env,
+        method,
+        path,
+        query_string,
+        body=item.get("body"),
+        exec_ctx=ctx.exec_ctx,
+        # Only the entry's own headers: the batch's If-None-Match, Accept and
+        # Accept-Encoding describe the batch response, not this entry's
+        request_headers={k.lower(): v for k, v in (item.get("headers") or {}).items()}
     )
-    
-    if not res.ok:
-        error_text = await res.text()
-        raise Exception(f"Supabase PATCH error: {res.status} - {error_text}")
-    
-    return res
+    sub.payload = ctx.payload
+    sub.member = ctx.member
+    # The batch's own header would collide across entries; each entry brings its own key
+    sub.idempotency_key = item.get("idempotency_key")
+    return sub
+
+async def run_batch_item(ctx, item) -> dict:
+    if not isinstance(item, dict):
+        return {"status": 400, "body": "Batch entries must be objects"}
+    headers = item.get("headers")
+    if headers is not None and not (
+            isinstance(headers, dict) and all(isinstance(v, str) for v in headers.values())):
+        return {"status": 400, "body": "Entry headers must be an object of strings"}
+    if item.get("idempotency_key") is not None and not isinstance(item["idempotency_key"], str):
+        return {"status": 400, "body": "idempotency_key must be a string"}
+    sub = batch_context(ctx, item)
+    if sub.path == "batch":
+        return {"status": 400, "body": "Batch requests cannot be nested"}
+    matched, _ = ROUTER.match(sub.method, sub.path)
+    if matched is not None and matched.streaming:
+        return {"status": 400, "body": "Streaming endpoints cannot be batched"}
+
+    try:
+        status, body, headers = await execute(sub)
+    except Exception as e:
+        import traceback
+        log_event("error", "batch entry failed", method=sub.method, path=sub.path, error=repr(e),
+                  trace=traceback.format_exc())
+        return {"status": 500, "body": {"error": str(e), "type": type(e).__name__}}
+
+    if body is not None and headers.get("Content-Type") in ("application/json", COLUMNAR_MEDIA_TYPE):
+        body = json.loads(body)
+    headers = {k: v for k, v in headers.items() if k != "Content-Type"}
+
+    entry = {"status": status, "body": body}
+    if headers:
+        entry["headers"] = headers
+    return entry
+
+@route("POST", "batch", clearance=None)
+async def batch(ctx):
+    body = await ctx.json()
+    items = body.get("requests") if isinstance(body, dict) else None
+    if not isinstance(items, list) or not items:
+        raise HTTPError(400, "Expected a non-empty requests array")
+    if len(items) > BATCH_MAX_REQUESTS:
+        raise HTTPError(400, f"At most {BATCH_MAX_REQUESTS} requests per batch")
+
+    # Look the member up once for every sub-request that checks clearance
+    if batch_needs_member(items):
+        ctx.member = await get_member_context(ctx.db, ctx.member_id) or {}
+
+    responses = [None] * len(items)
+    reads = []
+
+    async def flush_reads():
+        results = await asyncio.gather(*(run_batch_item(ctx, items[i]) for i in reads))
+        for i, result in zip(reads, results):
+            responses[i] = result
+        reads.clear()
+
+    # Consecutive GETs run concurrently; any other method waits for the reads
+    # before it and holds back the ones after it, so writes keep request order
+    for index, item in enumerate(items):
+        if isinstance(item, dict) and batch_target(item)[0] == "GET":
+            reads.append(index)
+            continue
+        await flush_reads()
+        responses[index] = await run_batch_item(ctx, item)
+    await flush_reads()
+
+    return {"responses": responses}
 
 class Default(WorkerEntrypoint):
     async def fetch(self, request):
-        # CORS headers
-        cors_headers = {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, POST, PATCH, OPTIONS, DELETE",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization",
-        }
-
         # Handle OPTIONS preflight request
         if request.method == "OPTIONS":
-            return Response("", status=204, headers=cors_headers)
+            return Response("", status=204, headers=CORS_HEADERS)
 
         try:
-            # Access environment variables
-            SUPABASE_URL = self.env.SUPABASE_URL
-            SUPABASE_KEY = self.env.SUPABASE_SERVICE_KEY
-            JWT_SECRET = self.env.JWT_SECRET
-            GITHUB_TOKEN = self.env.GITHUB_TOKEN if hasattr(self.env, 'GITHUB_TOKEN') else None
-            
             parsed_url = urlparse(request.url)
-            path = parsed_url.path.lstrip("/")
-            method = request.method
-
-            # ---- LOGIN ----
-            if path == "login" and method == "POST":
-                body = await request.json()
-
-                res = await sb_get(
-                    f"members?name=eq.{body['name']}&password=eq.{body['password']}&select=member_id,name",
-                    SUPABASE_URL,
-                    SUPABASE_KEY
-                )
-
-                if not res:
-                    return Response("Unauthorized", status=401, headers=cors_headers)
-
-                token = sign_jwt(res[0], JWT_SECRET)
-                return Response.json({"token": token}, headers=cors_headers)
-
-            # ---- AUTH REQUIRED BELOW ----
-            payload = auth_payload(request, JWT_SECRET)
-            if not payload:
-                return Response("Unauthorized", status=401, headers=cors_headers)
-
-            # ---- CLEARANCE CHECK ----
-            clearance = await get_member_clearance(payload["member_id"], SUPABASE_URL, SUPABASE_KEY)
-            department = await get_member_dept(payload["member_id"], SUPABASE_URL, SUPABASE_KEY)
-            phone = await get_member_phone(payload["member_id"], SUPABASE_URL, SUPABASE_KEY)
-
-            # ---- ME ENDPOINT ----
-            if path == "me" and method == "GET":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                return Response.json({
-                    "member_id": payload["member_id"],
-                    "name": payload["name"],
-                    "department": department,
-                    "phone": phone,
-                    "clearance": clearance,
-                }, headers=cors_headers)
-
-            # ---- INVENTORY ----
-            if path == "registry" or path.startswith("registry"):
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                # Parse query string for filters
-                query_params = ""
-                if "?" in request.url:
-                    query_params = "&" + request.url.split("?")[1]
-                
-                data = await sb_get(
-                    f"inventory?select=*{query_params}",
-                    SUPABASE_URL,
-                    SUPABASE_KEY
-                )
-                return Response.json(data, headers=cors_headers)
-
-            # ---- PROJECTS LIST ----
-            if path == "projects" and method == "GET":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                data = await sb_get("projects?select=*", SUPABASE_URL, SUPABASE_KEY)
-                return Response.json(data, headers=cors_headers)
-
-            # ---- CREATE PROJECT ----
-            if path == "projects" and method == "POST":
-                if clearance is None or clearance < 5:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                body = await request.json()
-                
-                await sb_post("rpc/create_project", {
-                    "p_name": body["project_name"],
-                    "p_pool_id": body["pool"]
-                }, SUPABASE_URL, SUPABASE_KEY)
-                
-                return Response.json({"success": True}, headers=cors_headers)
-
-            # ---- DELETE PROJECT ----
-            if path.startswith("projects/") and method == "DELETE":
-                if clearance is None or clearance < 5:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                project_id = path.split("/")[1]
-                
-                await sb_post("rpc/delete_project", {
-                    "p_project_id": project_id
-                }, SUPABASE_URL, SUPABASE_KEY)
-                
-                return Response.json({"success": True}, headers=cors_headers)
-
-            # ---- UPDATE PROJECT (PATCH) ----
-            if path.startswith("projects/") and method == "PATCH":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                project_id = path.split("/")[1]
-                body = await request.json()
-                
-                # Update project in Supabase using PATCH
-                await sb_patch(
-                    f"projects?project_id=eq.{project_id}",
-                    body,
-                    SUPABASE_URL,
-                    SUPABASE_KEY
-                )
-                
-                return Response.json({"success": True}, headers=cors_headers)
-
-            # ---- GET PROJECT ANALYTICS ----
-            if path.endswith("/analytics") and method == "GET":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                project_id = path.split("/")[1]
-                
-                data = await sb_post("rpc/get_project_items", {
-                    "p_project_id": project_id
-                }, SUPABASE_URL, SUPABASE_KEY)
-                
-                result = await data.json()
-                return Response.json(result, headers=cors_headers)
-
-            # ---- GET PROJECT DETAILS ----
-            if path.startswith("projects/") and method == "GET":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                project_id = path.split("/")[1]
-                
-                # Get project info
-                project = await sb_get(
-                    f"projects?project_id=eq.{project_id}&select=*",
-                    SUPABASE_URL,
-                    SUPABASE_KEY
-                )
-                
-                if not project or len(project) == 0:
-                    return Response("Project not found", status=404, headers=cors_headers)
-                
-                return Response.json(project[0], headers=cors_headers)
-
-            # ---- GITHUB CONTRIBUTORS ----
-            if path.startswith("github/") and path.endswith("/contributors") and method == "GET":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                repo = path.replace("/contributors", "").split("/", 1)[1]
-                
-                try:
-                    headers = {
-                        "Accept": "application/vnd.github.v3+json",
-                        "User-Agent": "Robodex-App"
-                    }
-                    if GITHUB_TOKEN:
-                        headers["Authorization"] = f"token {GITHUB_TOKEN}"
-                    
-                    gh_response = await pyfetch(
-                        f"https://api.github.com/repos/{repo}/contributors?per_page=10",
-                        headers=headers
-                    )
-                    
-                    if not gh_response.ok:
-                        error_text = await gh_response.text()
-                        return Response.json({
-                            "error": "Failed to fetch contributors",
-                            "status": gh_response.status,
-                            "details": error_text
-                        }, status=gh_response.status, headers=cors_headers)
-                    
-                    data = await gh_response.json()
-                    return Response.json(data, headers=cors_headers)
-                    
-                except Exception as gh_error:
-                    return Response.json({
-                        "error": "GitHub API error",
-                        "details": str(gh_error)
-                    }, status=500, headers=cors_headers)
-
-            # ---- GITHUB PULL REQUESTS ----
-            if path.startswith("github/") and path.endswith("/pulls") and method == "GET":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                repo = path.replace("/pulls", "").split("/", 1)[1]
-                
-                try:
-                    headers = {
-                        "Accept": "application/vnd.github.v3+json",
-                        "User-Agent": "Robodex-App"
-                    }
-                    if GITHUB_TOKEN:
-                        headers["Authorization"] = f"token {GITHUB_TOKEN}"
-                    
-                    gh_response = await pyfetch(
-                        f"https://api.github.com/repos/{repo}/pulls?state=all&per_page=100",
-                        headers=headers
-                    )
-                    
-                    if not gh_response.ok:
-                        error_text = await gh_response.text()
-                        return Response.json({
-                            "error": "Failed to fetch pull requests",
-                            "status": gh_response.status,
-                            "details": error_text
-                        }, status=gh_response.status, headers=cors_headers)
-                    
-                    data = await gh_response.json()
-                    return Response.json(data, headers=cors_headers)
-                    
-                except Exception as gh_error:
-                    return Response.json({
-                        "error": "GitHub API error",
-                        "details": str(gh_error)
-                    }, status=500, headers=cors_headers)
-
-            # ---- GITHUB ISSUES (base endpoint, must be last) ----
-            if path.startswith("github/") and method == "GET":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                # Extract repo (everything after "github/")
-                repo = path.split("/", 1)[1]
-                
-                # Remove any trailing paths that were already handled
-                if "/pulls" in repo or "/contributors" in repo:
-                    return Response("Not Found", status=404, headers=cors_headers)
-                
-                try:
-                    headers = {
-                        "Accept": "application/vnd.github.v3+json",
-                        "User-Agent": "Robodex-App"
-                    }
-                    if GITHUB_TOKEN:
-                        headers["Authorization"] = f"token {GITHUB_TOKEN}"
-                    
-                    gh_response = await pyfetch(
-                        f"https://api.github.com/repos/{repo}/issues?state=all&per_page=100",
-                        headers=headers
-                    )
-                    
-                    if not gh_response.ok:
-                        error_text = await gh_response.text()
-                        return Response.json({
-                            "error": "Failed to fetch GitHub issues",
-                            "status": gh_response.status,
-                            "details": error_text
-                        }, status=gh_response.status, headers=cors_headers)
-                    
-                    issues = await gh_response.json()
-                    return Response.json(issues, headers=cors_headers)
-                    
-                except Exception as gh_error:
-                    return Response.json({
-                        "error": "GitHub API error",
-                        "details": str(gh_error)
-                    }, status=500, headers=cors_headers)
-
-            # ---- ISSUE ITEMS ----
-            if path == "issue" and method == "POST":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                body = await request.json()
-                await sb_post("rpc/issue_items", {
-                    "p_member_id": payload["member_id"],
-                    "p_project_id": body["project_id"],
-                    "p_items": body["items"],
-                    "p_return_date": body.get("return_date")
-                }, SUPABASE_URL, SUPABASE_KEY)
-                return Response.json({"success": True}, headers=cors_headers)
-            
-            # ---- MY ISSUES ----
-            if path == "my-issues" and method == "GET":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                data = await sb_get(
-                    f"issues?member_id=eq.{payload['member_id']}&select=*",
-                    SUPABASE_URL,
-                    SUPABASE_KEY
-                )
-                return Response.json(data, headers=cors_headers)
-
-            # ---- FULL RETURN ----
-            if path == "full" and method == "POST":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                body = await request.json()
-                await sb_post("rpc/return_issue", {
-                    "p_issue_id": body["issue_id"]
-                }, SUPABASE_URL, SUPABASE_KEY)
-                return Response.json({"success": True}, headers=cors_headers)
-
-            # ---- PARTIAL RETURN ----
-            if path == "partial" and method == "POST":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                body = await request.json()
-                await sb_post("rpc/return_items", {
-                    "p_issue_id": body["issue_id"],
-                    "p_items": body["items"]
-                }, SUPABASE_URL, SUPABASE_KEY)
-                return Response.json({"success": True}, headers=cors_headers)
-            
-            if path == "members/batch" and method == "POST":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                body = await request.json()
-                member_ids = body.get("member_ids", [])
-                
-                data = await sb_post("rpc/get_members_by_ids", {
-                    "p_member_ids": member_ids
-                }, SUPABASE_URL, SUPABASE_KEY)
-                
-                result = await data.json()
-                return Response.json(result, headers=cors_headers)
-
-            if path == "members" and method == "GET":
-                data = await sb_get("members?select=*", SUPABASE_URL, SUPABASE_KEY)
-                return Response.json(data, headers=cors_headers)
-
-            # ---- GET POOL DETAILS ----
-            if path.startswith("pool/") and method == "GET":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                pool_id = path.split("/")[1]
-                
-                data = await sb_post("rpc/get_pool_details", {
-                    "p_pool_id": pool_id
-                }, SUPABASE_URL, SUPABASE_KEY)
-                
-                result = await data.json()
-                
-                if result is None:
-                    return Response("Pool not found", status=404, headers=cors_headers)
-                
-                return Response.json(result, headers=cors_headers)
-
-            # ---- GET ALL POOLS ----
-            if path == "pools" and method == "GET":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                data = await sb_get("pool?select=*", SUPABASE_URL, SUPABASE_KEY)
-                return Response.json(data, headers=cors_headers)
-
-            # ---- CREATE POOL ----
-            if path == "pool" and method == "POST":
-                if clearance is None or clearance < 5:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                body = await request.json()
-                
-                await sb_post("pool", {
-                    "name": body["name"],
-                    "description": body.get("description", ""),
-                    "managers": body.get("managers", [])
-                }, SUPABASE_URL, SUPABASE_KEY)
-                
-                return Response.json({"success": True}, headers=cors_headers)
-
-            # ---- UPDATE POOL ----
-            if path.startswith("pool/") and method == "PATCH":
-                if clearance is None or clearance < 5:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                pool_id = path.split("/")[1]
-                body = await request.json()
-                
-                # Build update query
-                update_data = {}
-                if "name" in body:
-                    update_data["name"] = body["name"]
-                if "description" in body:
-                    update_data["description"] = body["description"]
-                if "managers" in body:
-                    update_data["managers"] = body["managers"]
-                
-                await sb_post(f"pool?pool_id=eq.{pool_id}", update_data, SUPABASE_URL, SUPABASE_KEY)
-                
-                return Response.json({"success": True}, headers=cors_headers)
-
-            # ---- DELETE POOL ----
-            if path.startswith("pool/") and method == "DELETE":
-                if clearance is None or clearance < 5:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                pool_id = path.split("/")[1]
-                
-                res = await pyfetch(
-                    f"{SUPABASE_URL}/rest/v1/pool?pool_id=eq.{pool_id}",
-                    method="DELETE",
-                    headers={
-                        "apikey": SUPABASE_KEY,
-                        "Authorization": f"Bearer {SUPABASE_KEY}",
-                        "Content-Type": "application/json"
-                    }
-                )
-                
-                if not res.ok:
-                    return Response("Failed to delete pool", status=500, headers=cors_headers)
-                
-                return Response.json({"success": True}, headers=cors_headers)
-            
-            # ---- UPDATE PASSWORD ----
-            if path == "update-password" and method == "POST":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                body = await request.json()
-                
-                # Verify current password
-                login_res = await sb_get(
-                    f"members?name=eq.{payload['name']}&password=eq.{body['current_password']}&select=member_id,name",
-                    SUPABASE_URL,
-                    SUPABASE_KEY
-                )
-                
-                if not login_res:
-                    return Response("Current password is incorrect", status=401, headers=cors_headers)
-                
-                # Update password
-                await sb_post("rpc/update_member_password", {
-                    "p_member_id": payload["member_id"],
-                    "p_new_password": body["new_password"]
-                }, SUPABASE_URL, SUPABASE_KEY)
-                
-                # Generate new JWT
-                new_token = sign_jwt(login_res[0], JWT_SECRET)
-                
-                return Response.json({
-                    "success": True,
-                    "token": new_token
-                }, headers=cors_headers)
-            
-            # ---- GET ALL EVENTS ----
-            if path == "events" and method == "GET":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                data = await sb_post("rpc/get_events", {}, SUPABASE_URL, SUPABASE_KEY)
-                result = await data.json()
-                return Response.json(result if result else [], headers=cors_headers)
-
-            # ---- GET SINGLE EVENT ----
-            if path.startswith("events/") and method == "GET":
-                if clearance is None or clearance < 0:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                event_id = path.split("/")[1]
-                
-                data = await sb_post("rpc/get_event", {
-                    "p_event_id": event_id
-                }, SUPABASE_URL, SUPABASE_KEY)
-                
-                result = await data.json()
-                
-                if result is None:
-                    return Response("Event not found", status=404, headers=cors_headers)
-                
-                return Response.json(result, headers=cors_headers)
-
-            # ---- CREATE EVENT ----
-            if path == "events" and method == "POST":
-                if clearance is None or clearance < 5:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                body = await request.json()
-                
-                data = await sb_post("rpc/create_event", {
-                    "p_name": body["event_name"],
-                    "p_description": body.get("event_description", ""),
-                    "p_datetime": body["event_datetime"],
-                    "p_project_id": body.get("project_id"),
-                    "p_tags": body.get("tags")
-                }, SUPABASE_URL, SUPABASE_KEY)
-                
-                result = await data.json()
-                return Response.json(result, headers=cors_headers)
-
-            # ---- UPDATE EVENT ----
-            if path.startswith("events/") and method == "PATCH":
-                if clearance is None or clearance < 5:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                event_id = path.split("/")[1]
-                body = await request.json()
-                
-                data = await sb_post("rpc/update_event", {
-                    "p_event_id": event_id,
-                    "p_updates": body
-                }, SUPABASE_URL, SUPABASE_KEY)
-                
-                result = await data.json()
-                
-                if result is None:
-                    return Response("Event not found", status=404, headers=cors_headers)
-                
-                return Response.json(result, headers=cors_headers)
-
-            # ---- DELETE EVENT ----
-            if path.startswith("events/") and method == "DELETE":
-                if clearance is None or clearance < 5:
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                event_id = path.split("/")[1]
-                
-                data = await sb_post("rpc/delete_event", {
-                    "p_event_id": event_id
-                }, SUPABASE_URL, SUPABASE_KEY)
-                
-                result = await data.json()
-                
-                if not result:
-                    return Response("Event not found", status=404, headers=cors_headers)
-                
-                return Response.json({"success": True}, headers=cors_headers)
-
-            # ---- GET ALL KANBAN COLUMNS ----
-            if path == "kanban" and method == "GET":
-                if (clearance is None) or (clearance < 0):
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                data = await sb_post("rpc/get_all_kanban", {}, SUPABASE_URL, SUPABASE_KEY)
-                result = await data.json()
-                return Response.json(result if result else [], headers=cors_headers)
-
-            # ---- GET SINGLE KANBAN COLUMN ----
-            if path.startswith("kanban/") and method == "GET":
-                if (clearance is None) or (clearance < 0):
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                column_id = path.split("/")[1]
-                
-                data = await sb_post("rpc/get_kanban_by_id", {
-                    "target_id": column_id
-                }, SUPABASE_URL, SUPABASE_KEY)
-                
-                result = await data.json()
-                
-                if not result or len(result) == 0:
-                    return Response("Kanban column not found", status=404, headers=cors_headers)
-                
-                return Response.json(result[0], headers=cors_headers)
-
-            # ---- CREATE/UPDATE KANBAN COLUMN (UPSERT) ----
-            if path == "kanban" and method == "POST":
-                if (clearance is None) or (clearance < 5):
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                body = await request.json()
-                
-                data = await sb_post("rpc/upsert_kanban", {
-                    "payload": body
-                }, SUPABASE_URL, SUPABASE_KEY)
-                
-                result = await data.json()
-                
-                if not result or len(result) == 0:
-                    return Response("Failed to upsert kanban column", status=500, headers=cors_headers)
-                
-                return Response.json(result[0], headers=cors_headers)
-
-            # ---- UPDATE KANBAN COLUMN (UPSERT with column_id) ----
-            if path.startswith("kanban/") and method == "PATCH":
-                if (clearance is None) or (clearance < 5):
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                column_id = path.split("/")[1]
-                body = await request.json()
-                
-                # Add column_id to the payload for upsert
-                body["column_id"] = column_id
-                
-                data = await sb_post("rpc/upsert_kanban", {
-                    "payload": body
-                }, SUPABASE_URL, SUPABASE_KEY)
-                
-                result = await data.json()
-                
-                if not result or len(result) == 0:
-                    return Response("Kanban column not found", status=404, headers=cors_headers)
-                
-                return Response.json(result[0], headers=cors_headers)
-
-            # ---- DELETE KANBAN COLUMN ----
-            if path.startswith("kanban/") and method == "DELETE":
-                if (clearance is None) or (clearance < 5):
-                    return Response("Unauthorized: Insufficient clearance", status=401, headers=cors_headers)
-                
-                column_id = path.split("/")[1]
-                
-                data = await sb_post("rpc/delete_kanban", {
-                    "target_id": column_id
-                }, SUPABASE_URL, SUPABASE_KEY)
-                
-                result = await data.json()
-                
-                if result != "Success":
-                    return Response("Failed to delete kanban column", status=500, headers=cors_headers)
-                
-                return Response.json({"success": True}, headers=cors_headers)
-
-            # ---- DEBUG ENDPOINT ----
-            if path == "debug" and method == "GET":
-                return Response.json({
-                    "full_url": request.url,
-                    "path": path,
-                    "method": method,
-                    "has_payload": payload is not None,
-                    "has_github_token": GITHUB_TOKEN is not None
-                }, headers=cors_headers)
-
-            # 404 with debug info
-            return Response.json({
-                "error": "Not Found",
-                "debug": {
-                    "path": path,
-                    "method": method,
-                    "url": request.url
-                }
-            }, status=404, headers=cors_headers)
+            ctx = RequestContext(
+                request,
+                self.env,
+                request.method,
+                parsed_url.path.strip("/"),
+                parsed_url.query,
+                exec_ctx=getattr(self, "ctx", None)
+            )
+            return await dispatch(ctx)
 
         except Exception as e:
-            # Log the full error for debugging
+            # Errors inside dispatch are logged there; this only catches setup failures
             import traceback
-            error_details = traceback.format_exc()
-            print(f"Error: {error_details}")
-            
+            log_event("error", "request setup failed", url=request.url, error=traceback.format_exc())
+
             # Return error with CORS headers
             return Response.json({
                 "error": str(e),
                 "type": type(e).__name__
-            }, status=500, headers=cors_headers)
\ No newline at end of file
+            }, status=500, headers=CORS_HEADERS)
@@ -0,0 +1,180 @@
+"""GitHub REST API proxy with a per-isolate ETag cache.
+
+Imported on first use by the github/* routes and the project dashboard.
+"""
+
+import asyncio, time
+from collections import OrderedDict
+from pyodide.http import pyfetch
+
+from entry import (
+    DeadlineExceeded, HTTPError, UpstreamUnavailable, _breakers, _current_trace, metric_inc, metric_set,
+    upstream_timeout,
+)
+
+# Serve straight from cache for this long
+GITHUB_FRESH_TTL = 60
+# Past fresh but within this age, serve the cached body and refresh in the background
+GITHUB_STALE_TTL = 3600
+GITHUB_CACHE_MAX = 256
+GITHUB_TIMEOUT = 10
+
+class GitHubCache:
+    """Per-isolate cache of GitHub API bodies, revalidated with If-None-Match"""
+
+    # Conditional requests answered with 304 don't count against the token's rate limit
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        # url -> {"etag", "body", "fetched_at"}
+        self._entries = OrderedDict()
+        # url -> task refreshing that url
+        self._refreshing = {}
+
+    def _store(self, url: str, entry: dict):
+        self._entries[url] = entry
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get(self, ctx, url: str):
+        """Return (status, body, cache state) for a GitHub API URL"""
+        entry = self._entries.get(url)
+        if entry is not None:
+            age = time.time() - entry["fetched_at"]
+            if age < GITHUB_FRESH_TTL:
+                metric_inc("github", "cache_hits")
+                return 200, entry["body"], "HIT"
+            if age < GITHUB_STALE_TTL:
+                metric_inc("github", "stale_served")
+                if url not in self._refreshing:
+                    ctx.defer(self.refresh(ctx, url))
+                return 200, entry["body"], "STALE"
+
+        started = time.perf_counter()
+        try:
+            status, body, revalidated = await self.refresh(ctx, url)
+        except (UpstreamUnavailable, DeadlineExceeded, asyncio.TimeoutError, OSError):
+            if entry is None:
+                raise
+            status = None
+        if entry is not None and (status is None or status >= 500):
+            # GitHub is down or the breaker is open: any cached copy beats an error
+            metric_inc("github", "stale_served")
+            return 200, entry["body"], "STALE"
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.upstream("github", "GET", url.removeprefix(ctx.github_api_url), status, started)
+        return status, body, "REVALIDATED" if revalidated else "MISS"
+
+    async def refresh(self, ctx, url: str):
+        """Fetch (or revalidate) one URL; concurrent callers share the request"""
+        task = self._refreshing.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(ctx.github_token, url))
+            self._refreshing[url] = task
+
+            def _done(t, url=url):
+                if self._refreshing.get(url) is t:
+                    del self._refreshing[url]
+            task.add_done_callback(_done)
+        return await asyncio.shield(task)
+
+    async def _fetch(self, token, url: str):
+        headers = {
+            "Accept": "application/vnd.github.v3+json",
+            "User-Agent": "Robodex-App"
+        }
+        if token:
+            headers["Authorization"] = f"token {token}"
+
+        entry = self._entries.get(url)
+        if entry is not None and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+
+        timeout = upstream_timeout(GITHUB_TIMEOUT)
+        breaker = _breakers["github"]
+        breaker.check()
+        metric_inc("github", "upstream_requests")
+        try:
+            res = await asyncio.wait_for(pyfetch(url, headers=headers), timeout)
+        except (asyncio.TimeoutError, OSError):
+            breaker.failure()
+            raise
+        if res.status >= 500:
+            breaker.failure()
+        else:
+            breaker.success()
+        res_headers = res.headers
+        if "x-ratelimit-remaining" in res_headers:
+            metric_set("github", "rate_limit_remaining", int(res_headers["x-ratelimit-remaining"]))
+            metric_set("github", "rate_limit_reset", int(res_headers.get("x-ratelimit-reset", 0)))
+
+        if res.status == 304 and entry is not None:
+            metric_inc("github", "not_modified")
+            entry["fetched_at"] = time.time()
+            self._entries.move_to_end(url)
+            return 200, entry["body"], True
+
+        if not res.ok:
+            return res.status, await res.text(), False
+
+        body = await res.json()
+        self._store(url, {
+            "etag": res_headers.get("etag"),
+            "body": body,
+            "fetched_at": time.time(),
+        })
+        return 200, body, False
+
+_github_cache = GitHubCache(GITHUB_CACHE_MAX)
+
+async def github_proxy(ctx, resource: str, error_label: str):
+    """Serve a GitHub REST API resource for the repo in the route params"""
+    repo = f"{ctx.params['owner']}/{ctx.params['repo']}"
+
+    try:
+        status, body, cache_state = await _github_cache.get(
+            ctx,
+            f"{ctx.github_api_url}/repos/{repo}/{resource}"
+        )
+    except HTTPError:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPError(504, "GitHub API timed out")
+    except Exception as gh_error:
+        raise HTTPError(500, "GitHub API error", {
+            "error": "GitHub API error",
+            "details": str(gh_error)
+        })
+
+    if status != 200:
+        raise HTTPError(status, error_label, {
+            "error": error_label,
+            "status": status,
+            "details": body
+        })
+
+    ctx.headers["X-Cache"] = cache_state
+    return body
+
+GITHUB_RESOURCES = {
+    "issues": "issues?state=all&per_page=100",
+    "pulls": "pulls?state=all&per_page=100",
+    "contributors": "contributors?per_page=10",
+}
+
+async def github_issues(ctx):
+    return await github_proxy(ctx, GITHUB_RESOURCES["issues"], "Failed to fetch GitHub issues")
+
+async def github_pulls(ctx):
+    return await github_proxy(ctx, GITHUB_RESOURCES["pulls"], "Failed to fetch pull requests")
+
+async def github_contributors(ctx):
+    return await github_proxy(ctx, GITHUB_RESOURCES["contributors"], "Failed to fetch contributors")
+
+async def fetch_github_resource(ctx, repo: str, resource: str):
+    status, body, _ = await _github_cache.get(ctx, f"{ctx.github_api_url}/repos/{repo}/{GITHUB_RESOURCES[resource]}")
+    if status != 200:
+        raise HTTPError(status, f"GitHub returned {status}")
+    return body
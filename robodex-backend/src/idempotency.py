@@ -0,0 +1,151 @@
+"""Idempotency-Key support for write routes (see run_idempotent).
+
+Imported by entry.execute the first time a request carries a key.
+"""
+
+import asyncio, hashlib, json, time
+from urllib.parse import quote
+
+from entry import HTTPError, RequestContext, TTLCache, log_event, metric_inc
+
+IDEMPOTENCY_TTL = 24 * 3600
+IDEMPOTENCY_MAX = 1024
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+# How long a duplicate waits on a first attempt running in another isolate
+IDEMPOTENCY_WAIT = 10
+IDEMPOTENCY_POLL_INTERVAL = 0.25
+
+class MemoryIdempotencyStore:
+    """Results of keyed writes held in this isolate; the default backend"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._results = TTLCache(maxsize, ttl)
+
+    async def claim(self, ctx, scope: str, fingerprint: str):
+        """Stored (fingerprint, status, body, headers) for scope, or None if the caller should run it"""
+        return self._results.get(scope)
+
+    async def complete(self, ctx, scope: str, record: tuple):
+        self._results.set(scope, record)
+
+    async def release(self, ctx, scope: str):
+        pass
+
+class SupabaseIdempotencyStore:
+    """Results of keyed writes shared by every isolate through the idempotency_keys table"""
+
+    async def claim(self, ctx, scope: str, fingerprint: str):
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT
+        while True:
+            res = await ctx.db.post("rpc/claim_idempotency_key", {
+                "p_scope": scope,
+                "p_fingerprint": fingerprint,
+                "p_ttl_seconds": IDEMPOTENCY_TTL
+            })
+            row = await res.json()
+            if row is None:
+                return None
+            # A mismatched fingerprint is rejected by the caller whether or not the row is done
+            if row["status"] is not None or row["fingerprint"] != fingerprint:
+                return row["fingerprint"], row["status"], row["body"], row["headers"] or {}
+            if time.monotonic() >= deadline:
+                raise HTTPError(409, "A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+    async def complete(self, ctx, scope: str, record: tuple):
+        _, status, body, headers = record
+        await ctx.db.post("rpc/complete_idempotency_key", {
+            "p_scope": scope,
+            "p_status": status,
+            "p_body": body,
+            "p_headers": headers
+        })
+
+    async def release(self, ctx, scope: str):
+        await ctx.db.delete(f"idempotency_keys?scope=eq.{quote(scope, safe='')}&status=is.null")
+
+IDEMPOTENCY_STORES = {
+    "memory": lambda: MemoryIdempotencyStore(IDEMPOTENCY_MAX, IDEMPOTENCY_TTL),
+    "supabase": SupabaseIdempotencyStore,
+}
+
+_idempotency_stores = {}
+# scope -> future resolved with the first attempt's record (None if it stored nothing)
+_idempotency_inflight = {}
+
+def get_idempotency_store(env):
+    """Backend named by IDEMPOTENCY_STORE, created once per isolate"""
+    kind = getattr(env, "IDEMPOTENCY_STORE", None) or "memory"
+    store = _idempotency_stores.get(kind)
+    if store is None:
+        factory = IDEMPOTENCY_STORES.get(kind)
+        if factory is None:
+            raise ValueError(f"Unknown IDEMPOTENCY_STORE '{kind}'")
+        store = _idempotency_stores[kind] = factory()
+    return store
+
+def request_fingerprint(ctx: RequestContext, body) -> str:
+    canonical = json.dumps([ctx.method, ctx.path, ctx.query_string, body], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def replay_result(record: tuple, fingerprint: str):
+    stored_fingerprint, status, body, headers = record
+    if stored_fingerprint != fingerprint:
+        raise HTTPError(422, "Idempotency-Key was already used for a different request")
+    metric_inc("idempotency", "replayed")
+    return status, body, {**headers, "Idempotent-Replayed": "true"}
+
+async def run_idempotent(ctx: RequestContext, key: str, run):
+    """Run a keyed write once per member and key
+
+    Retries get the stored result of the first execution, and duplicates that
+    arrive while it is still running wait for it instead of running again.
+    Only results below 500 are stored, so a failed attempt can be retried.
+    """
+    if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPError(400, f"Idempotency-Key must be at most {IDEMPOTENCY_KEY_MAX_LENGTH} characters")
+    try:
+        body = await ctx.json()
+    except Exception:
+        body = None
+    fingerprint = request_fingerprint(ctx, body)
+    scope = f"{ctx.member_id}:{key}"
+
+    while scope in _idempotency_inflight:
+        metric_inc("idempotency", "waited")
+        record = await asyncio.shield(_idempotency_inflight[scope])
+        if record is not None:
+            return replay_result(record, fingerprint)
+        # The first attempt stored nothing; the next waiter to get here runs it again
+
+    store = get_idempotency_store(ctx.env)
+    future = asyncio.get_running_loop().create_future()
+    _idempotency_inflight[scope] = future
+    record = None
+    claimed = False
+    try:
+        record = await store.claim(ctx, scope, fingerprint)
+        if record is not None:
+            return replay_result(record, fingerprint)
+
+        claimed = True
+        status, body, headers = await run()
+        if status >= 500:
+            await store.release(ctx, scope)
+            return status, body, headers
+
+        record = (fingerprint, status, body, headers)
+        try:
+            await store.complete(ctx, scope, record)
+            metric_inc("idempotency", "stored")
+        except Exception as e:
+            # The write itself went through; failing now would invite the retry we're guarding against
+            log_event("error", "idempotency store failed", scope=scope, error=str(e))
+        return status, body, headers
+    except BaseException:
+        if claimed and record is None:
+            ctx.defer(store.release(ctx, scope))
+        raise
+    finally:
+        del _idempotency_inflight[scope]
+        future.set_result(record)
@@ -569,3 +569,1139 @@ BEGIN
     RETURN 'Success';
 END;
 $$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- SET-BASED ISSUE / RETURN
+-- ============================================================================
+-- Replaces the per-item loops above. Each call now runs a fixed number of
+-- statements regardless of cart size: a locking pass over the affected
+-- rows (taken in key order so concurrent carts cannot deadlock), one
+-- validation query, then one UPDATE ... FROM / multi-row INSERT per table.
+-- Error messages are unchanged. Repeated lines for the same item_no are
+-- validated against their combined quantity.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION issue_items(
+  p_member_id UUID,
+  p_project_id UUID,
+  p_items JSONB,
+  p_return_date TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS UUID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  new_issue_id UUID := gen_random_uuid();
+  v_qty INT;
+  v_item_no TEXT;
+  v_available INT;
+  v_missing BOOLEAN;
+BEGIN
+  -- Validate member exists
+  IF NOT EXISTS(SELECT 1 FROM members WHERE member_id = p_member_id) THEN
+    RAISE EXCEPTION 'Invalid member_id: %', p_member_id;
+  END IF;
+
+  -- Validate project exists
+  IF NOT EXISTS(SELECT 1 FROM projects WHERE project_id = p_project_id) THEN
+    RAISE EXCEPTION 'Invalid project_id: %', p_project_id;
+  END IF;
+
+  -- Lock every requested inventory row once
+  PERFORM 1
+  FROM inventory
+  WHERE item_no IN (
+    SELECT r.item_no FROM jsonb_to_recordset(p_items) AS r(item_no TEXT)
+  )
+  ORDER BY item_no
+  FOR UPDATE;
+
+  -- First cart line (in request order) that cannot be satisfied
+  SELECT c.item_no, c.quantity, i.available, i.item_no IS NULL
+  INTO v_item_no, v_qty, v_available, v_missing
+  FROM (
+    SELECT r.item_no, SUM(r.quantity)::INT AS quantity, MIN(r.line_no) AS line_no
+    FROM ROWS FROM (jsonb_to_recordset(p_items) AS (item_no TEXT, quantity INT))
+      WITH ORDINALITY AS r(item_no, quantity, line_no)
+    GROUP BY r.item_no
+  ) c
+  LEFT JOIN inventory i ON i.item_no = c.item_no
+  WHERE i.item_no IS NULL
+     OR i.available < c.quantity
+  ORDER BY c.line_no
+  LIMIT 1;
+
+  IF FOUND THEN
+    IF v_missing THEN
+      RAISE EXCEPTION 'Item not found: %', v_item_no;
+    END IF;
+    RAISE EXCEPTION 'Insufficient inventory for item %. Available: %, Requested: %',
+      v_item_no, v_available, v_qty;
+  END IF;
+
+  -- Update inventory
+  UPDATE inventory i
+  SET available = i.available - c.quantity
+  FROM (
+    SELECT r.item_no, SUM(r.quantity)::INT AS quantity
+    FROM jsonb_to_recordset(p_items) AS r(item_no TEXT, quantity INT)
+    GROUP BY r.item_no
+  ) c
+  WHERE i.item_no = c.item_no;
+
+  -- Insert issue records, one per cart line
+  INSERT INTO issues (
+    issue_id,
+    item_no,
+    quantity,
+    member_id,
+    project_id,
+    issued_date,
+    return_date,
+    returned
+  )
+  SELECT
+    new_issue_id,
+    r.item_no,
+    r.quantity,
+    p_member_id,
+    p_project_id,
+    NOW(),
+    p_return_date,
+    false
+  FROM jsonb_to_recordset(p_items) AS r(item_no TEXT, quantity INT);
+
+  RAISE NOTICE 'Successfully issued % lines for issue %', jsonb_array_length(p_items), new_issue_id;
+
+  RETURN new_issue_id;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION return_items(
+  p_issue_id UUID,
+  p_items JSONB
+)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_qty INT;
+  v_item_no TEXT;
+  v_current_returned INT;
+  v_total_quantity INT;
+  v_missing BOOLEAN;
+BEGIN
+  -- Lock the open lines of the issue; none means it is unknown or fully returned
+  PERFORM 1
+  FROM issues
+  WHERE issue_id = p_issue_id
+    AND returned = false
+  ORDER BY id
+  FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Issue not found or already fully returned: %', p_issue_id;
+  END IF;
+
+  -- First returned line (in request order) that does not fit the issue
+  SELECT c.item_no, c.quantity, iss.returned_quantity, iss.quantity, iss.id IS NULL
+  INTO v_item_no, v_qty, v_current_returned, v_total_quantity, v_missing
+  FROM (
+    SELECT r.item_no, SUM(r.quantity)::INT AS quantity, MIN(r.line_no) AS line_no
+    FROM ROWS FROM (jsonb_to_recordset(p_items) AS (item_no TEXT, quantity INT))
+      WITH ORDINALITY AS r(item_no, quantity, line_no)
+    GROUP BY r.item_no
+  ) c
+  LEFT JOIN issues iss
+    ON iss.issue_id = p_issue_id
+   AND iss.item_no = c.item_no
+   AND iss.returned = false
+  WHERE iss.id IS NULL
+     OR iss.returned_quantity + c.quantity > iss.quantity
+  ORDER BY c.line_no
+  LIMIT 1;
+
+  IF FOUND THEN
+    IF v_missing THEN
+      RAISE EXCEPTION 'Item % not found in issue % or already returned',
+        v_item_no, p_issue_id;
+    END IF;
+    RAISE EXCEPTION 'Cannot return % units of item %. Issued: %, Already returned: %, Attempting to return: %',
+      v_qty, v_item_no, v_total_quantity, v_current_returned, v_qty;
+  END IF;
+
+  -- Update issue lines with returned quantities
+  UPDATE issues iss
+  SET returned_quantity = iss.returned_quantity + c.quantity
+  FROM (
+    SELECT r.item_no, SUM(r.quantity)::INT AS quantity
+    FROM jsonb_to_recordset(p_items) AS r(item_no TEXT, quantity INT)
+    GROUP BY r.item_no
+  ) c
+  WHERE iss.issue_id = p_issue_id
+    AND iss.item_no = c.item_no
+    AND iss.returned = false;
+
+  -- Lock inventory in the same order issue_items does before returning stock
+  PERFORM 1
+  FROM inventory
+  WHERE item_no IN (
+    SELECT r.item_no FROM jsonb_to_recordset(p_items) AS r(item_no TEXT)
+  )
+  ORDER BY item_no
+  FOR UPDATE;
+
+  -- Return items to inventory
+  UPDATE inventory i
+  SET available = i.available + c.quantity
+  FROM (
+    SELECT r.item_no, SUM(r.quantity)::INT AS quantity
+    FROM jsonb_to_recordset(p_items) AS r(item_no TEXT, quantity INT)
+    GROUP BY r.item_no
+  ) c
+  WHERE i.item_no = c.item_no;
+
+  -- Auto-close fully returned issues
+  UPDATE issues
+  SET returned = true,
+      return_date = NOW()
+  WHERE issue_id = p_issue_id
+    AND returned_quantity = quantity
+    AND returned = false;
+
+  IF FOUND THEN
+    RAISE NOTICE 'Issue % fully returned and closed', p_issue_id;
+  END IF;
+END;
+$$;
+
+-- ============================================================================
+-- INVENTORY SEARCH
+-- Purpose: Ranked type-ahead lookup over inventory name / location
+-- ============================================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Substring and fuzzy matches (queries of 3+ characters)
+CREATE INDEX IF NOT EXISTS idx_inventory_name_trgm
+  ON inventory USING GIN (lower(name) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_inventory_location_trgm
+  ON inventory USING GIN (lower(location) gin_trgm_ops);
+
+-- Prefix matches for 1-2 character queries, which yield no trigrams
+CREATE INDEX IF NOT EXISTS idx_inventory_name_prefix
+  ON inventory (lower(name) text_pattern_ops);
+
+-- Case-insensitive exact item_no match; without it the OR'd item_no test
+-- cannot join the bitmap scans above and every search reads the whole table
+CREATE INDEX IF NOT EXISTS idx_inventory_item_no_lower
+  ON inventory (lower(item_no));
+
+CREATE OR REPLACE FUNCTION search_inventory(
+  p_query TEXT,
+  p_limit INT DEFAULT 20
+)
+RETURNS TABLE (
+  item_no TEXT,
+  name TEXT,
+  quantity INT,
+  available INT,
+  location TEXT
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  v_query TEXT := lower(btrim(coalesce(p_query, '')));
+  v_like TEXT;
+BEGIN
+  IF v_query = '' THEN
+    RETURN;
+  END IF;
+
+  -- Match the query literally inside LIKE patterns
+  v_like := replace(replace(replace(v_query, '\', '\\'), '%', '\%'), '_', '\_');
+
+  IF length(v_query) < 3 THEN
+    RETURN QUERY
+    SELECT i.item_no, i.name, i.quantity, i.available, i.location
+    FROM inventory i
+    WHERE lower(i.name) LIKE v_like || '%'
+       OR lower(i.item_no) = v_query
+    ORDER BY (lower(i.item_no) = v_query) DESC, i.name
+    LIMIT p_limit;
+    RETURN;
+  END IF;
+
+  -- Rank: exact item_no, then name prefix, then substring, then fuzzy similarity
+  RETURN QUERY
+  SELECT i.item_no, i.name, i.quantity, i.available, i.location
+  FROM inventory i
+  WHERE lower(i.name) LIKE '%' || v_like || '%'
+     OR lower(i.location) LIKE '%' || v_like || '%'
+     OR v_query <% lower(i.name)
+     OR lower(i.item_no) = v_query
+  ORDER BY
+    CASE
+      WHEN lower(i.item_no) = v_query THEN 3
+      WHEN lower(i.name) LIKE v_like || '%' THEN 2
+      WHEN lower(i.name) LIKE '%' || v_like || '%' THEN 1
+      ELSE 0
+    END
+    + word_similarity(v_query, lower(i.name)) DESC,
+    i.name
+  LIMIT p_limit;
+END;
+$$;
+
+-- Test:
+-- SELECT * FROM search_inventory('ardu', 10);
+-- EXPLAIN ANALYZE SELECT * FROM search_inventory('motor driver', 20);
+-- EXPLAIN SELECT * FROM inventory WHERE lower(name) LIKE '%ardu%' OR lower(item_no) = 'ardu';   -- BitmapOr, no Seq Scan
+
+-- ============================================================================
+-- INVENTORY CHANGE VERSIONS
+-- Purpose: Let clients holding a local copy of inventory fetch only what
+--          changed since the version they last saw (GET /registry/changes)
+-- ============================================================================
+
+-- A change's version is the id of the transaction that made it (offset by
+-- 2^40 so it sorts above versions from the earlier sequence-based scheme).
+-- Every row a transaction writes shares its version, and readers only hand
+-- out versions below the oldest transaction still running, so nothing can
+-- commit later with a version a client has already moved past. No lock is
+-- taken: concurrent inventory writers do not wait for each other.
+CREATE OR REPLACE FUNCTION inventory_version_of(p_xid XID8)
+RETURNS BIGINT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT (1::BIGINT << 40) + p_xid::TEXT::BIGINT;
+$$;
+
+CREATE OR REPLACE FUNCTION next_inventory_change_version()
+RETURNS BIGINT
+LANGUAGE sql
+VOLATILE
+AS $$
+  SELECT inventory_version_of(pg_current_xact_id());
+$$;
+
+-- Existing rows are given a version by the backfill below
+ALTER TABLE inventory
+  ADD COLUMN IF NOT EXISTS change_version BIGINT NOT NULL DEFAULT 0;
+
+-- Databases migrated before versions were transaction ids drew them from
+-- inventory_change_seq; the trigger sets them now
+ALTER TABLE inventory ALTER COLUMN change_version SET DEFAULT 0;
+DROP SEQUENCE IF EXISTS inventory_change_seq;
+
+CREATE INDEX IF NOT EXISTS idx_inventory_change_version ON inventory(change_version);
+
+-- One row per deleted item_no, so clients can drop it from their copy
+CREATE TABLE IF NOT EXISTS inventory_tombstones (
+  item_no TEXT PRIMARY KEY,
+  change_version BIGINT NOT NULL,
+  deleted_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_inventory_tombstones_change_version
+  ON inventory_tombstones(change_version);
+
+CREATE OR REPLACE FUNCTION inventory_bump_change_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  -- No-op updates (same values) keep their version
+  IF TG_OP = 'UPDATE' AND NEW IS NOT DISTINCT FROM OLD THEN
+    RETURN NEW;
+  END IF;
+
+  NEW.change_version := next_inventory_change_version();
+
+  IF TG_OP = 'INSERT' THEN
+    DELETE FROM inventory_tombstones WHERE item_no = NEW.item_no;
+  END IF;
+
+  RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION inventory_record_tombstone()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO inventory_tombstones (item_no, change_version)
+  VALUES (OLD.item_no, next_inventory_change_version())
+  ON CONFLICT (item_no) DO UPDATE
+  SET change_version = EXCLUDED.change_version,
+      deleted_at = NOW();
+
+  RETURN OLD;
+END;
+$$;
+
+-- Covers issue_items, return_issue, return_items and direct edits alike
+DROP TRIGGER IF EXISTS trg_inventory_change_version ON inventory;
+CREATE TRIGGER trg_inventory_change_version
+  BEFORE INSERT OR UPDATE ON inventory
+  FOR EACH ROW
+  EXECUTE FUNCTION inventory_bump_change_version();
+
+DROP TRIGGER IF EXISTS trg_inventory_tombstone ON inventory;
+CREATE TRIGGER trg_inventory_tombstone
+  AFTER DELETE ON inventory
+  FOR EACH ROW
+  EXECUTE FUNCTION inventory_record_tombstone();
+
+-- Backfill: new columns and sequence-era versions move to this transaction's
+-- version, so clients holding an older version download everything once
+UPDATE inventory
+SET change_version = next_inventory_change_version()
+WHERE change_version < (1::BIGINT << 40);
+
+UPDATE inventory_tombstones
+SET change_version = next_inventory_change_version()
+WHERE change_version < (1::BIGINT << 40);
+
+-- Rows and tombstones with change_version > p_since, oldest first.
+-- STABLE, so every statement below reads the same snapshot. Pages end on a
+-- whole transaction, so a page can exceed p_limit when one write changed
+-- more rows than that.
+CREATE OR REPLACE FUNCTION get_inventory_changes(
+  p_since BIGINT,
+  p_limit INT DEFAULT 1000
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  v_items JSONB;
+  v_deleted JSONB;
+  v_has_more BOOLEAN;
+  v_bound BIGINT;
+  v_cut BIGINT;
+BEGIN
+  -- Every transaction with a version below this has committed or aborted
+  v_bound := inventory_version_of(pg_snapshot_xmin(pg_current_snapshot()));
+
+  -- A version ahead of the server (e.g. after a restore) cannot be resumed
+  IF p_since >= v_bound THEN
+    RETURN jsonb_build_object(
+      'items', '[]'::jsonb,
+      'deleted', '[]'::jsonb,
+      'version', v_bound - 1,
+      'has_more', false,
+      'reset', true
+    );
+  END IF;
+
+  -- Last version on this page
+  SELECT MAX(c.change_version) INTO v_cut
+  FROM (
+    SELECT change_version
+    FROM (
+      SELECT i.change_version FROM inventory i
+      WHERE i.change_version > p_since AND i.change_version < v_bound
+      UNION ALL
+      SELECT t.change_version FROM inventory_tombstones t
+      WHERE t.change_version > p_since AND t.change_version < v_bound
+    ) v
+    ORDER BY change_version
+    LIMIT p_limit
+  ) c;
+
+  IF v_cut IS NULL THEN
+    RETURN jsonb_build_object(
+      'items', '[]'::jsonb,
+      'deleted', '[]'::jsonb,
+      'version', v_bound - 1,
+      'has_more', false,
+      'reset', false
+    );
+  END IF;
+
+  SELECT COALESCE(jsonb_agg(to_jsonb(i) - 'change_version' ORDER BY i.change_version), '[]'::jsonb)
+  INTO v_items
+  FROM inventory i
+  WHERE i.change_version > p_since AND i.change_version <= v_cut;
+
+  SELECT COALESCE(jsonb_agg(t.item_no ORDER BY t.change_version), '[]'::jsonb)
+  INTO v_deleted
+  FROM inventory_tombstones t
+  WHERE t.change_version > p_since AND t.change_version <= v_cut;
+
+  v_has_more := EXISTS (
+    SELECT 1 FROM inventory i
+    WHERE i.change_version > v_cut AND i.change_version < v_bound
+  ) OR EXISTS (
+    SELECT 1 FROM inventory_tombstones t
+    WHERE t.change_version > v_cut AND t.change_version < v_bound
+  );
+
+  RETURN jsonb_build_object(
+    'items', v_items,
+    'deleted', v_deleted,
+    -- Resume from the last transaction returned while more pages remain
+    'version', CASE WHEN v_has_more THEN v_cut ELSE v_bound - 1 END,
+    'has_more', v_has_more,
+    'reset', false
+  );
+END;
+$$;
+
+-- Test:
+-- SELECT get_inventory_changes(0, 5);
+-- SELECT inventory_version_of(pg_snapshot_xmin(pg_current_snapshot())) - 1;   -- current high-water mark
+-- UPDATE inventory SET location = location WHERE item_no = '99';   -- no-op, version unchanged
+-- SELECT item_no, change_version FROM inventory ORDER BY change_version DESC LIMIT 5;
+
+-- ============================================================================
+-- EVENT WINDOW INDEXES
+-- Purpose: Serve GET /events?from=&to=&project_id=&tag= as index range scans
+--          instead of get_events() returning every event ever created
+-- ============================================================================
+
+-- Calendar window, ordered and paginated by (event_datetime, event_id)
+CREATE INDEX IF NOT EXISTS idx_events_datetime
+  ON events(event_datetime, event_id);
+
+-- Project-scoped windows
+CREATE INDEX IF NOT EXISTS idx_events_project_datetime
+  ON events(project_id, event_datetime);
+
+-- tags @> '{tag}'
+CREATE INDEX IF NOT EXISTS idx_events_tags
+  ON events USING GIN (tags);
+
+-- Test:
+-- EXPLAIN ANALYZE
+-- SELECT * FROM events
+-- WHERE event_datetime >= '2025-03-01' AND event_datetime < '2025-04-01'
+-- ORDER BY event_datetime, event_id
+-- LIMIT 500;
+
+-- ============================================================================
+-- KANBAN CARD OPERATIONS
+-- Purpose: Add / move / reorder / remove one card, or change one card field,
+--          without rewriting the whole column. Every kanban column and event
+--          row carries a version; writes that name a stale version fail with
+--          SQLSTATE PT409, which PostgREST returns as HTTP 409.
+-- ============================================================================
+
+ALTER TABLE kanban ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 1;
+ALTER TABLE events ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 1;
+
+-- Any real change bumps the version, including upsert_kanban / update_event
+CREATE OR REPLACE FUNCTION bump_row_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF NEW IS DISTINCT FROM OLD THEN
+    NEW.version := OLD.version + 1;
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_kanban_version ON kanban;
+CREATE TRIGGER trg_kanban_version
+  BEFORE UPDATE ON kanban
+  FOR EACH ROW
+  EXECUTE FUNCTION bump_row_version();
+
+DROP TRIGGER IF EXISTS trg_events_version ON events;
+CREATE TRIGGER trg_events_version
+  BEFORE UPDATE ON events
+  FOR EACH ROW
+  EXECUTE FUNCTION bump_row_version();
+
+-- Lock a column and check the caller's version (NULL skips the check)
+CREATE OR REPLACE FUNCTION kanban_lock_column(p_column_id UUID, p_version INT)
+RETURNS kanban
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_column kanban;
+BEGIN
+  SELECT * INTO v_column FROM kanban WHERE column_id = p_column_id FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Kanban column % not found', p_column_id
+      USING ERRCODE = 'PT404';
+  END IF;
+
+  IF p_version IS NOT NULL AND p_version <> v_column.version THEN
+    RAISE EXCEPTION 'Kanban column % has changed', p_column_id
+      USING ERRCODE = 'PT409',
+            DETAIL = jsonb_build_object('column_id', p_column_id, 'version', v_column.version)::TEXT;
+  END IF;
+
+  RETURN v_column;
+END;
+$$;
+
+-- p_events with p_event_id inserted before 1-based p_position (NULL or past the end appends)
+CREATE OR REPLACE FUNCTION kanban_insert_card(p_events UUID[], p_event_id UUID, p_position INT)
+RETURNS UUID[]
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT CASE
+    WHEN p_position IS NULL OR p_position > coalesce(cardinality(p_events), 0)
+      THEN coalesce(p_events, '{}') || p_event_id
+    ELSE coalesce(p_events[1:greatest(p_position, 1) - 1], '{}')
+      || p_event_id
+      || coalesce(p_events[greatest(p_position, 1):], '{}')
+  END;
+$$;
+
+CREATE OR REPLACE FUNCTION kanban_add_card(
+  p_column_id UUID,
+  p_event_id UUID,
+  p_position INT DEFAULT NULL,
+  p_version INT DEFAULT NULL
+)
+RETURNS kanban
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_column kanban;
+BEGIN
+  v_column := kanban_lock_column(p_column_id, p_version);
+
+  IF coalesce(p_event_id = ANY(v_column.events), false) THEN
+    RETURN v_column;
+  END IF;
+
+  UPDATE kanban
+  SET events = kanban_insert_card(events, p_event_id, p_position)
+  WHERE column_id = p_column_id
+  RETURNING * INTO v_column;
+
+  RETURN v_column;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION kanban_remove_card(
+  p_column_id UUID,
+  p_event_id UUID,
+  p_version INT DEFAULT NULL
+)
+RETURNS kanban
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_column kanban;
+BEGIN
+  v_column := kanban_lock_column(p_column_id, p_version);
+
+  UPDATE kanban
+  SET events = array_remove(events, p_event_id)
+  WHERE column_id = p_column_id
+  RETURNING * INTO v_column;
+
+  RETURN v_column;
+END;
+$$;
+
+-- Move a card between columns, or reorder it within one (p_to_column_id = p_from_column_id).
+-- The event's column tag is switched to the target column, as the board expects.
+CREATE OR REPLACE FUNCTION kanban_move_card(
+  p_from_column_id UUID,
+  p_event_id UUID,
+  p_to_column_id UUID,
+  p_position INT DEFAULT NULL,
+  p_from_version INT DEFAULT NULL,
+  p_to_version INT DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_from kanban;
+  v_to kanban;
+BEGIN
+  -- Lock both columns in column_id order so opposite moves cannot deadlock
+  IF p_from_column_id = p_to_column_id THEN
+    v_from := kanban_lock_column(p_from_column_id, p_from_version);
+  ELSIF p_from_column_id < p_to_column_id THEN
+    v_from := kanban_lock_column(p_from_column_id, p_from_version);
+    v_to := kanban_lock_column(p_to_column_id, p_to_version);
+  ELSE
+    v_to := kanban_lock_column(p_to_column_id, p_to_version);
+    v_from := kanban_lock_column(p_from_column_id, p_from_version);
+  END IF;
+
+  IF NOT coalesce(p_event_id = ANY(v_from.events), false) THEN
+    RAISE EXCEPTION 'Card % is not in column %', p_event_id, p_from_column_id
+      USING ERRCODE = 'PT409',
+            DETAIL = jsonb_build_object('column_id', p_from_column_id, 'version', v_from.version)::TEXT;
+  END IF;
+
+  IF p_from_column_id = p_to_column_id THEN
+    UPDATE kanban
+    SET events = kanban_insert_card(array_remove(events, p_event_id), p_event_id, p_position)
+    WHERE column_id = p_from_column_id
+    RETURNING * INTO v_from;
+
+    RETURN jsonb_build_object('from', to_jsonb(v_from), 'to', to_jsonb(v_from));
+  END IF;
+
+  UPDATE kanban
+  SET events = array_remove(events, p_event_id)
+  WHERE column_id = p_from_column_id
+  RETURNING * INTO v_from;
+
+  UPDATE kanban
+  SET events = kanban_insert_card(array_remove(events, p_event_id), p_event_id, p_position)
+  WHERE column_id = p_to_column_id
+  RETURNING * INTO v_to;
+
+  UPDATE events
+  SET tags = ARRAY(
+    SELECT t FROM unnest(coalesce(tags, '{}')) AS t
+    WHERE t NOT IN (SELECT column_id::TEXT FROM kanban)
+  ) || p_to_column_id::TEXT
+  WHERE event_id = p_event_id;
+
+  RETURN jsonb_build_object('from', to_jsonb(v_from), 'to', to_jsonb(v_to));
+END;
+$$;
+
+-- Change one field of a card's event; the card must be in p_column_id
+DROP FUNCTION IF EXISTS kanban_update_card(UUID, TEXT, JSONB, INT);
+CREATE OR REPLACE FUNCTION kanban_update_card(
+  p_column_id UUID,
+  p_event_id UUID,
+  p_field TEXT,
+  p_value JSONB,
+  p_version INT DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_column kanban;
+  v_version INT;
+  v_event JSONB;
+BEGIN
+  IF p_field NOT IN ('event_name', 'event_description', 'event_datetime', 'project_id') THEN
+    RAISE EXCEPTION 'Field % cannot be updated', p_field
+      USING ERRCODE = 'PT400';
+  END IF;
+
+  -- Shared lock: a concurrent move cannot take the card out of the column
+  -- before the update commits (column before event, the order moves use)
+  SELECT * INTO v_column FROM kanban WHERE column_id = p_column_id FOR SHARE;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Kanban column % not found', p_column_id
+      USING ERRCODE = 'PT404';
+  END IF;
+
+  IF NOT coalesce(p_event_id = ANY(v_column.events), false) THEN
+    RAISE EXCEPTION 'Card % is not in column %', p_event_id, p_column_id
+      USING ERRCODE = 'PT409',
+            DETAIL = jsonb_build_object('column_id', p_column_id, 'version', v_column.version)::TEXT;
+  END IF;
+
+  SELECT version INTO v_version FROM events WHERE event_id = p_event_id FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Event % not found', p_event_id
+      USING ERRCODE = 'PT404';
+  END IF;
+
+  IF p_version IS NOT NULL AND p_version <> v_version THEN
+    RAISE EXCEPTION 'Event % has changed', p_event_id
+      USING ERRCODE = 'PT409',
+            DETAIL = jsonb_build_object('event_id', p_event_id, 'version', v_version)::TEXT;
+  END IF;
+
+  UPDATE events
+  SET event_name = CASE WHEN p_field = 'event_name' THEN p_value #>> '{}' ELSE event_name END,
+      event_description = CASE WHEN p_field = 'event_description' THEN p_value #>> '{}' ELSE event_description END,
+      event_datetime = CASE WHEN p_field = 'event_datetime' THEN (p_value #>> '{}')::TIMESTAMPTZ ELSE event_datetime END,
+      project_id = CASE WHEN p_field = 'project_id' THEN (p_value #>> '{}')::UUID ELSE project_id END
+  WHERE event_id = p_event_id
+  RETURNING to_jsonb(events) INTO v_event;
+
+  RETURN v_event;
+END;
+$$;
+
+-- Test:
+-- SELECT kanban_add_card('<column uuid>', '<event uuid>', 1, 1);
+-- SELECT kanban_move_card('<from uuid>', '<event uuid>', '<to uuid>', NULL, 2, 1);
+-- SELECT kanban_update_card('<column uuid>', '<event uuid>', 'event_name', '"Renamed"', 3);
+
+-- ============================================================================
+-- PROJECT ITEM STATS
+-- Purpose: Per-project / per-item issue totals kept current by triggers on
+--          issues, so project analytics is one primary-key range read instead
+--          of re-aggregating the project's whole issue history
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS project_item_stats (
+  project_id UUID NOT NULL REFERENCES projects(project_id) ON DELETE CASCADE,
+  item_no TEXT NOT NULL REFERENCES inventory(item_no),
+  issued_quantity BIGINT NOT NULL DEFAULT 0,
+  returned_quantity BIGINT NOT NULL DEFAULT 0,
+  outstanding_quantity BIGINT GENERATED ALWAYS AS (issued_quantity - returned_quantity) STORED,
+  PRIMARY KEY (project_id, item_no)
+);
+
+-- What one issue line contributes to returned_quantity: a closed line counts
+-- in full, an open one by what has been partially returned so far
+CREATE OR REPLACE FUNCTION issue_line_returned(p_quantity INT, p_returned_quantity INT, p_returned BOOLEAN)
+RETURNS INT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT CASE WHEN p_returned THEN p_quantity ELSE coalesce(p_returned_quantity, 0) END;
+$$;
+
+-- Statement-level, so issue_items / return_items touching N lines apply one
+-- grouped delta per (project, item) rather than N row updates
+CREATE OR REPLACE FUNCTION project_item_stats_apply()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    INSERT INTO project_item_stats AS s (project_id, item_no, issued_quantity, returned_quantity)
+    SELECT n.project_id, n.item_no, SUM(n.quantity),
+           SUM(issue_line_returned(n.quantity, n.returned_quantity, n.returned))
+    FROM new_rows n
+    GROUP BY n.project_id, n.item_no
+    ORDER BY n.project_id, n.item_no
+    ON CONFLICT (project_id, item_no) DO UPDATE
+    SET issued_quantity = s.issued_quantity + EXCLUDED.issued_quantity,
+        returned_quantity = s.returned_quantity + EXCLUDED.returned_quantity;
+
+  ELSIF TG_OP = 'DELETE' THEN
+    UPDATE project_item_stats s
+    SET issued_quantity = s.issued_quantity - d.issued,
+        returned_quantity = s.returned_quantity - d.returned
+    FROM (
+      SELECT o.project_id, o.item_no, SUM(o.quantity) AS issued,
+             SUM(issue_line_returned(o.quantity, o.returned_quantity, o.returned)) AS returned
+      FROM old_rows o
+      GROUP BY o.project_id, o.item_no
+    ) d
+    WHERE s.project_id = d.project_id AND s.item_no = d.item_no;
+
+  ELSE
+    INSERT INTO project_item_stats AS s (project_id, item_no, issued_quantity, returned_quantity)
+    SELECT d.project_id, d.item_no, SUM(d.issued), SUM(d.returned)
+    FROM (
+      SELECT n.project_id, n.item_no, n.quantity AS issued,
+             issue_line_returned(n.quantity, n.returned_quantity, n.returned) AS returned
+      FROM new_rows n
+      UNION ALL
+      SELECT o.project_id, o.item_no, -o.quantity,
+             -issue_line_returned(o.quantity, o.returned_quantity, o.returned)
+      FROM old_rows o
+    ) d
+    GROUP BY d.project_id, d.item_no
+    HAVING SUM(d.issued) <> 0 OR SUM(d.returned) <> 0
+    ORDER BY d.project_id, d.item_no
+    ON CONFLICT (project_id, item_no) DO UPDATE
+    SET issued_quantity = s.issued_quantity + EXCLUDED.issued_quantity,
+        returned_quantity = s.returned_quantity + EXCLUDED.returned_quantity;
+  END IF;
+
+  RETURN NULL;
+END;
+$$;
+
+-- Transition tables need one trigger per event
+DROP TRIGGER IF EXISTS trg_project_item_stats_insert ON issues;
+CREATE TRIGGER trg_project_item_stats_insert
+  AFTER INSERT ON issues
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION project_item_stats_apply();
+
+DROP TRIGGER IF EXISTS trg_project_item_stats_update ON issues;
+CREATE TRIGGER trg_project_item_stats_update
+  AFTER UPDATE ON issues
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION project_item_stats_apply();
+
+DROP TRIGGER IF EXISTS trg_project_item_stats_delete ON issues;
+CREATE TRIGGER trg_project_item_stats_delete
+  AFTER DELETE ON issues
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION project_item_stats_apply();
+
+-- Recompute stats from issues, for one project or (NULL) all of them.
+-- Blocks issue writes while it runs so no delta lands in between.
+CREATE OR REPLACE FUNCTION rebuild_project_item_stats(p_project_id UUID DEFAULT NULL)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_count INT;
+BEGIN
+  LOCK TABLE issues IN SHARE MODE;
+
+  DELETE FROM project_item_stats
+  WHERE p_project_id IS NULL OR project_id = p_project_id;
+
+  INSERT INTO project_item_stats (project_id, item_no, issued_quantity, returned_quantity)
+  SELECT i.project_id, i.item_no, SUM(i.quantity),
+         SUM(issue_line_returned(i.quantity, i.returned_quantity, i.returned))
+  FROM issues i
+  WHERE p_project_id IS NULL OR i.project_id = p_project_id
+  GROUP BY i.project_id, i.item_no;
+
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  RETURN v_count;
+END;
+$$;
+
+-- Rows where the stats disagree with a fresh aggregate; empty means consistent
+CREATE OR REPLACE FUNCTION check_project_item_stats(p_project_id UUID DEFAULT NULL)
+RETURNS TABLE (
+  project_id UUID,
+  item_no TEXT,
+  expected_issued BIGINT,
+  actual_issued BIGINT,
+  expected_returned BIGINT,
+  actual_returned BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+  WITH expected AS (
+    SELECT i.project_id, i.item_no, SUM(i.quantity) AS issued,
+           SUM(issue_line_returned(i.quantity, i.returned_quantity, i.returned)) AS returned
+    FROM issues i
+    WHERE p_project_id IS NULL OR i.project_id = p_project_id
+    GROUP BY i.project_id, i.item_no
+  ),
+  actual AS (
+    SELECT s.project_id, s.item_no, s.issued_quantity AS issued, s.returned_quantity AS returned
+    FROM project_item_stats s
+    WHERE (p_project_id IS NULL OR s.project_id = p_project_id)
+      AND (s.issued_quantity <> 0 OR s.returned_quantity <> 0)
+  )
+  SELECT coalesce(e.project_id, a.project_id),
+         coalesce(e.item_no, a.item_no),
+         coalesce(e.issued, 0)::BIGINT, coalesce(a.issued, 0)::BIGINT,
+         coalesce(e.returned, 0)::BIGINT, coalesce(a.returned, 0)::BIGINT
+  FROM expected e
+  FULL OUTER JOIN actual a
+    ON a.project_id = e.project_id AND a.item_no = e.item_no
+  WHERE coalesce(e.issued, 0) <> coalesce(a.issued, 0)
+     OR coalesce(e.returned, 0) <> coalesce(a.returned, 0);
+$$;
+
+-- Analytics read: same columns as get_project_items (total_quantity is
+-- everything ever issued) plus returned / outstanding and their value at price
+CREATE OR REPLACE FUNCTION get_project_item_stats(p_project_id UUID)
+RETURNS TABLE (
+  item_no TEXT,
+  item_name TEXT,
+  total_quantity BIGINT,
+  price TEXT,
+  returned_quantity BIGINT,
+  outstanding_quantity BIGINT,
+  outstanding_value NUMERIC
+)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT s.item_no,
+         inv.name,
+         s.issued_quantity,
+         inv.price::TEXT,
+         s.returned_quantity,
+         s.outstanding_quantity,
+         -- price is TEXT in deployed databases and may be blank
+         s.outstanding_quantity * NULLIF(btrim(inv.price::TEXT), '')::NUMERIC
+  FROM project_item_stats s
+  JOIN inventory inv ON inv.item_no = s.item_no
+  WHERE s.project_id = p_project_id
+    AND s.issued_quantity > 0
+  ORDER BY inv.name;
+$$;
+
+-- Backfill
+SELECT rebuild_project_item_stats();
+
+-- Test:
+-- SELECT * FROM get_project_item_stats('<project uuid>');
+-- SELECT * FROM check_project_item_stats();   -- expect no rows
+
+-- ============================================================================
+-- IDEMPOTENCY KEYS
+-- Purpose: Shared result store for write requests sent with an
+--          Idempotency-Key header (IDEMPOTENCY_STORE=supabase), so a retry
+--          that lands on another worker isolate still gets the first result
+-- ============================================================================
+
+-- status is NULL while the first attempt is still running
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+  scope TEXT PRIMARY KEY,
+  fingerprint TEXT NOT NULL,
+  status INT,
+  body TEXT,
+  headers JSONB,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys(expires_at);
+
+-- Returns NULL when the caller now owns the key and should run the request,
+-- otherwise the existing row (finished or still pending) as JSON
+CREATE OR REPLACE FUNCTION claim_idempotency_key(p_scope TEXT, p_fingerprint TEXT, p_ttl_seconds INT)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_row idempotency_keys;
+BEGIN
+  -- Keeps the table bounded, and frees keys whose first attempt died mid-request
+  DELETE FROM idempotency_keys
+  WHERE expires_at < NOW()
+     OR (scope = p_scope AND status IS NULL AND created_at < NOW() - INTERVAL '60 seconds');
+
+  LOOP
+    INSERT INTO idempotency_keys (scope, fingerprint, expires_at)
+    VALUES (p_scope, p_fingerprint, NOW() + make_interval(secs => p_ttl_seconds))
+    ON CONFLICT (scope) DO NOTHING;
+    IF FOUND THEN
+      RETURN NULL;
+    END IF;
+
+    -- The conflicting row may have been released in between; then try again
+    SELECT * INTO v_row FROM idempotency_keys WHERE scope = p_scope;
+    IF FOUND THEN
+      RETURN jsonb_build_object(
+        'fingerprint', v_row.fingerprint,
+        'status', v_row.status,
+        'body', v_row.body,
+        'headers', v_row.headers
+      );
+    END IF;
+  END LOOP;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION complete_idempotency_key(p_scope TEXT, p_status INT, p_body TEXT, p_headers JSONB)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+  UPDATE idempotency_keys
+  SET status = p_status, body = p_body, headers = p_headers
+  WHERE scope = p_scope;
+$$;
+
+-- Test:
+-- SELECT claim_idempotency_key('m1:abc', 'f1', 86400);   -- NULL (claimed)
+-- SELECT claim_idempotency_key('m1:abc', 'f1', 86400);   -- {"status": null, ...} (pending)
+-- SELECT complete_idempotency_key('m1:abc', 200, '{"success": true}', '{"Content-Type": "application/json"}');
+-- SELECT claim_idempotency_key('m1:abc', 'f1', 86400);   -- {"status": 200, ...}
+
+-- ============================================================================
+-- OUTSTANDING ISSUES REPORT
+-- Purpose: Serve GET /reports/outstanding (who holds what, and what is past
+--          its return_date) in one call, reading only the open issue lines.
+--          The partial index holds just those lines, ordered by due date, so
+--          it stays small as the history grows. It replaces the index on the
+--          returned flag alone, which had an entry for every issue ever made.
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_issues_open_return_date
+  ON issues(return_date) WHERE returned = FALSE;
+
+DROP INDEX IF EXISTS idx_issues_returned;
+
+-- One row per member / project / item (p_group_by) holding open issue lines,
+-- most overdue quantity first. issues lists the lines, soonest due first.
+CREATE OR REPLACE FUNCTION get_outstanding_issues(
+  p_group_by TEXT DEFAULT 'member',
+  p_overdue_only BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (
+  group_id TEXT,
+  group_name TEXT,
+  open_issues BIGINT,
+  outstanding_quantity BIGINT,
+  overdue_issues BIGINT,
+  overdue_quantity BIGINT,
+  next_return_date TIMESTAMPTZ,
+  issues JSONB
+)
+LANGUAGE sql
+STABLE
+AS $$
+  WITH open_lines AS (
+    -- returned = FALSE matches the partial index predicate
+    SELECT i.id, i.issue_id, i.item_no, inv.name AS item_name,
+           i.member_id, m.name AS member_name,
+           i.project_id, p.project_name,
+           i.quantity - COALESCE(i.returned_quantity, 0) AS outstanding,
+           i.issued_date, i.return_date,
+           COALESCE(i.return_date < NOW(), FALSE) AS overdue
+    FROM issues i
+    JOIN inventory inv ON inv.item_no = i.item_no
+    JOIN members m ON m.member_id = i.member_id
+    JOIN projects p ON p.project_id = i.project_id
+    WHERE i.returned = FALSE
+      AND (NOT p_overdue_only OR i.return_date < NOW())
+  ),
+  keyed AS (
+    SELECT o.*,
+           CASE p_group_by
+             WHEN 'project' THEN o.project_id::TEXT
+             WHEN 'item' THEN o.item_no
+             ELSE o.member_id::TEXT
+           END AS key,
+           CASE p_group_by
+             WHEN 'project' THEN o.project_name
+             WHEN 'item' THEN o.item_name
+             ELSE o.member_name
+           END AS label
+    FROM open_lines o
+  )
+  SELECT k.key,
+         MIN(k.label),
+         COUNT(*),
+         SUM(k.outstanding),
+         COUNT(*) FILTER (WHERE k.overdue),
+         COALESCE(SUM(k.outstanding) FILTER (WHERE k.overdue), 0),
+         MIN(k.return_date),
+         jsonb_agg(jsonb_build_object(
+           'id', k.id,
+           'issue_id', k.issue_id,
+           'item_no', k.item_no,
+           'item_name', k.item_name,
+           'member_id', k.member_id,
+           'member_name', k.member_name,
+           'project_id', k.project_id,
+           'project_name', k.project_name,
+           'quantity', k.outstanding,
+           'issued_date', k.issued_date,
+           'return_date', k.return_date,
+           'overdue', k.overdue
+         ) ORDER BY k.return_date NULLS LAST, k.issued_date)
+  FROM keyed k
+  GROUP BY k.key
+  ORDER BY 6 DESC, 4 DESC, 2;
+$$;
+
+-- Test:
+-- SELECT group_id, group_name, open_issues, overdue_quantity FROM get_outstanding_issues('member', false);
+-- EXPLAIN ANALYZE
+-- SELECT * FROM issues WHERE returned = FALSE AND return_date < NOW();   -- Index Scan using idx_issues_open_return_date